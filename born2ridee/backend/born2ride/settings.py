@@ -4,8 +4,11 @@ Django settings for born2ride project.
 Born 2 Ride - Travel Companion Startup MVP
 """
 
+import os
 from pathlib import Path
 
+import django
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -38,7 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',  # Must be first
+    'core_api.metrics.MetricsMiddleware',  # Outermost, so it times everything below
+    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,13 +75,103 @@ WSGI_APPLICATION = 'born2ride.wsgi.application'
 # Database
 # Using SQLite for simplicity (FREE)
 
-DATABASES = {
+# DB_PROFILE=sqlite (default) uses a local file tuned by core_api.database;
+# DB_PROFILE=server connects to DB_ENGINE (PostgreSQL unless set) with
+# persistent, health-checked connections.
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
+if DB_PROFILE == 'server':
+    DATABASES = {
+        'default': {
+            'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
+            'NAME': os.environ.get('DB_NAME', 'born2ride'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # Seconds a connection is reused across requests
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+elif DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds to wait for a lock before "database is locked"
+                'timeout': 20,
+            },
+        }
+    }
+    if django.VERSION >= (5, 1):
+        # Take the write lock when a transaction starts; a deferred
+        # transaction that reads first cannot wait for the lock under WAL
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+else:
+    raise ValueError(f'Unknown DB_PROFILE {DB_PROFILE!r}; use sqlite or server')
+
+# journal_mode is written into the database file, so the db.sqlite3 kept
+# in the repository stays on its rollback journal; DB_NAME databases use WAL
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal' if os.environ.get('DB_NAME') else 'delete')
+
+# Applied to every new SQLite connection by core_api.database
+SQLITE_PRAGMAS = {
+    'journal_mode': SQLITE_JOURNAL_MODE,   # under WAL readers no longer block on the writer
+    # fsync at checkpoints only, which is only safe with WAL
+    'synchronous': 'normal' if SQLITE_JOURNAL_MODE.lower() == 'wal' else 'full',
+    'busy_timeout': 20000,         # ms
+    'cache_size': -32000,          # KiB of page cache per connection
+    'mmap_size': 268435456,        # bytes of the file read through mmap
+    'temp_store': 'memory',
+}
+
+
+# Cache (per-process memory; list responses are invalidated by signals)
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'born2ride',
     }
 }
 
+RESPONSE_CACHE_TTL = 300
+
+
+# Request metrics (served at /api/metrics/)
+
+METRICS_SAMPLE_RATE = 1.0  # lower under heavy load, e.g. 0.05
+METRICS_SLOW_REQUEST_MS = 500
+# Scrapers send "Authorization: Bearer <token>"; without a token the endpoint is a 404
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+
+# Vendor availability change feed (SSE at /api/vendors/changes/, needs ASGI)
+
+CHANGE_FEED_REPLAY = 1000  # recent events kept for Last-Event-ID reconnects
+CHANGE_FEED_QUEUE_SIZE = 256  # per stream; a stream that falls further behind is reset
+CHANGE_FEED_HEARTBEAT = 15  # seconds between keep-alive comments
+
+
+# Vendor ranking for ?sort=best (see core_api/ranking.py)
+
+VENDOR_RANKING_WEIGHTS = {'distance': 0.35, 'rating': 0.25, 'price': 0.1, 'open': 0.15, 'rooms': 0.15}
+VENDOR_RANKING_CANDIDATES = 2000  # nearest vendors scored when more are in range
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core_api.metrics': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
 
 # Password validation
 
@@ -128,6 +222,7 @@ CORS_ALLOW_METHODS = [
     "POST",
     "PUT",
 ]
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
 
 
 # REST Framework Settings
@@ -136,8 +231,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',  # No auth required for MVP
     ],
+    # The browsable API is only offered while debugging
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+        'core_api.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
+    'DEFAULT_PAGINATION_CLASS': 'core_api.pagination.KeysetPagination',
 }
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Trip, Vendor, EmergencyService
+from .models import Trip, Vendor, Booking, EmergencyService
+from .search import matching, parse_terms
 
 
 @admin.register(Trip)
@@ -14,7 +15,24 @@ class TripAdmin(admin.ModelAdmin):
 class VendorAdmin(admin.ModelAdmin):
     list_display = ['id', 'name', 'vendor_type', 'rating', 'phone', 'is_open']
     list_filter = ['vendor_type', 'is_open', 'rating']
-    search_fields = ['name', 'address']
+    search_fields = ['name', 'description', 'address']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Match words through the full-text index rather than LIKE scans"""
+        terms = parse_terms(search_term)
+        if not terms:
+            return super().get_search_results(request, queryset, search_term)
+        return matching(queryset, terms), False
+
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ['id', 'customer_name', 'vendor', 'check_in', 'check_out', 'total_price', 'status', 'created_at']
+    list_filter = ['status', 'vendor__vendor_type']
+    search_fields = ['customer_name', 'phone', 'vendor__name']
+    list_select_related = ['vendor']
+    raw_id_fields = ['vendor']
+    readonly_fields = ['created_at']
 
 
 @admin.register(EmergencyService)
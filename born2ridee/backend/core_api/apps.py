@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'core_api'
+
+    def ready(self):
+        from . import database, metrics, signals  # noqa: F401
@@ -0,0 +1,195 @@
+"""
+Async read path for vendor and emergency service lookups
+
+DRF views are sync-only, so these are plain Django ``async def`` views
+mirroring ``VendorViewSet.list``/``nearby`` and the emergency list, detail
+and nearest lookups byte for byte: the same filters, keyset pagination,
+response cache and renderer. Rows are read with the async ORM. Served by
+an ASGI server (``uvicorn born2ride.asgi:application``), a request that
+is waiting on the database or on a slow client holds no worker thread.
+Under WSGI they still work, each request running in its own event loop,
+except the vendor change feed, which needs a long-lived loop to push to.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework.request import Request
+
+from . import availability, ranking, response_cache
+from .fastpath import ValuesPlan
+from .models import EmergencyService, Vendor
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .serializers import EmergencyServiceSerializer, VendorSerializer
+from .spatial import emergency_index, nearest_emergency_services, vendor_index
+from .views import (
+    EmergencyServiceViewSet, VendorViewSet, filter_emergency_services, filter_vendors,
+    parse_emergency_nearest, parse_nearby, parse_ranking,
+)
+
+
+renderer = FastJSONRenderer()
+
+
+def json_response(data, json_safe=False, status=200):
+    """What DRF's ``Response`` renders to with the configured JSON renderer"""
+    response = HttpResponse(status=status, content_type=renderer.media_type)
+    response.json_safe = json_safe
+    response.content = renderer.render(data, renderer.media_type, {'response': response})
+    return response
+
+
+def _plan(serializer_class, request, ordering=()):
+    # The DRF request gives SparseFieldsetMixin its ?fields=
+    serializer = serializer_class(context={'request': request})
+    return ValuesPlan.for_serializer(serializer, [name.lstrip('-') for name in ordering])
+
+
+async def _list(request, viewset, queryset):
+    """One keyset page of ``queryset`` as ``viewset.list`` would serve it"""
+    request = Request(request)
+
+    async def build():
+        plan = _plan(viewset.serializer_class, request, viewset.keyset_ordering)
+        paginator = KeysetPagination()
+        rows = await paginator.apaginate_queryset(queryset.values(*plan.columns), request, viewset)
+        results, safe = plan.rows(rows)
+        return {'next': paginator.get_next_link(), 'results': results}, safe
+
+    return await response_cache.acached_list(
+        request, viewset.response_cache_scope, viewset.response_cache_params, build, json_response
+    )
+
+
+async def _ranked(request):
+    """``VendorViewSet.ranked``: the k best vendors around a point"""
+    try:
+        query = parse_ranking(request.GET)
+    except ValueError as exc:
+        return json_response({'error': str(exc)}, status=400)
+    found = ranking.candidates(
+        await vendor_index.aget(), query['lat'], query['lng'], query['radius_km'], query['kinds']
+    )
+    ranked = []
+    if found:
+        queryset = filter_vendors(Vendor.objects.all(), request.GET)
+        # values_list().aiterator() would run its query on the loop's thread
+        rows = await sync_to_async(list)(ranking.candidate_rows(queryset, found))
+        ranked = ranking.top(found, rows, query['radius_km'], query['k'], query['weights'])
+
+    plan = _plan(VendorSerializer, Request(request), ('id',))
+    rows = Vendor.objects.filter(pk__in=[pk for _, _, pk in ranked]).values(*plan.columns)
+    vendors = {row['id']: row async for row in rows.aiterator()}
+    found = [(score, distance, vendors[pk]) for score, distance, pk in ranked if pk in vendors]
+    items, _ = plan.rows([row for _, _, row in found])
+    results = []
+    for (score, distance, _), item in zip(found, items):
+        item['distance_km'] = round(distance, 3)
+        item['score'] = round(score, 4)
+        results.append(item)
+    return json_response({'count': len(results), 'results': results})
+
+
+@require_GET
+async def vendor_list(request):
+    """Vendors by rating, filtered by ?type=, ?is_open= and ?source=, or the best with ?sort=best"""
+    if 'sort' in request.GET:
+        return await _ranked(request)
+    return await _list(request, VendorViewSet, filter_vendors(Vendor.objects.all(), request.GET))
+
+
+@require_GET
+async def vendor_nearby(request):
+    """The k nearest vendors to a point, closest first, or the best with ?sort=best"""
+    if 'sort' in request.GET:
+        return await _ranked(request)
+    try:
+        query = parse_nearby(request.GET)
+    except ValueError as exc:
+        return json_response({'error': str(exc)}, status=400)
+    hits = (await vendor_index.aget()).nearest(**query)
+
+    plan = _plan(VendorSerializer, Request(request), ('id',))
+    rows = Vendor.objects.filter(pk__in=[pk for _, pk, _ in hits]).values(*plan.columns)
+    vendors = {row['id']: row async for row in rows.aiterator()}
+    found = [(distance, vendors[pk]) for distance, pk, _ in hits if pk in vendors]
+    items, _ = plan.rows([row for _, row in found])
+    results = []
+    for (distance, _), item in zip(found, items):
+        item['distance_km'] = round(distance, 3)
+        results.append(item)
+    return json_response({'count': len(results), 'results': results})
+
+
+@require_GET
+async def emergency_list(request):
+    """Emergency services by type and name, filtered by ?type="""
+    return await _list(
+        request, EmergencyServiceViewSet,
+        filter_emergency_services(EmergencyService.objects.all(), request.GET)
+    )
+
+
+@require_GET
+async def emergency_detail(request, pk):
+    plan = _plan(EmergencyServiceSerializer, Request(request))
+    row = await EmergencyService.objects.filter(pk=pk).values(*plan.columns).afirst()
+    if row is None:
+        return json_response({'detail': 'No EmergencyService matches the given query.'}, status=404)
+    items, _ = plan.rows([row])
+    return json_response(items[0])
+
+
+@require_GET
+async def emergency_nearest(request):
+    """The closest service of every type (or of ?type=) to a point"""
+    try:
+        query = parse_emergency_nearest(request.GET)
+    except ValueError as exc:
+        return json_response({'error': str(exc)}, status=400)
+    index = await emergency_index.aget()
+    return json_response(nearest_emergency_services(**query, index=index))
+
+
+async def _stream(subscription, heartbeat):
+    try:
+        # Sets the client's reconnect delay and gets the headers out
+        yield b'retry: 3000\n\n'
+        queue = subscription.queue
+        while True:
+            try:
+                frames = [await asyncio.wait_for(queue.get(), heartbeat)]
+            except asyncio.TimeoutError:
+                yield b': keep-alive\n\n'
+                continue
+            # A burst goes out as one write
+            while not queue.empty():
+                frames.append(queue.get_nowait())
+            yield b''.join(frames)
+    finally:
+        availability.feed.unsubscribe(subscription)
+
+
+@require_GET
+async def vendor_changes(request):
+    """Server-Sent Events of vendor availability diffs, filtered by ?type= and ?bbox="""
+    if not isinstance(request, ASGIRequest):
+        return json_response({'error': 'The change feed needs an ASGI server'}, status=501)
+    try:
+        kinds, bbox = availability.parse_subscription(request.GET)
+    except ValueError as exc:
+        return json_response({'error': str(exc)}, status=400)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    subscription = availability.feed.subscribe(kinds, bbox, last_event_id)
+    response = StreamingHttpResponse(
+        _stream(subscription, getattr(settings, 'CHANGE_FEED_HEARTBEAT', 15)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,212 @@
+"""
+In-process change feed of vendor availability
+
+Saves of a ``Vendor`` whose ``rooms_available``, ``availability_status`` or
+``is_open`` changed, and bookings that reserve or release tonight's rooms,
+publish a compact diff (``{"id": 7, "rooms_available": 3}``) once their
+transaction commits. Subscribers are the open ``/api/vendors/changes/``
+Server-Sent Events streams of this process, each with an optional set of
+vendor types and a bounding box. The database is never polled: publishing
+encodes the event once, matches it against the subscribers of its vendor
+type and hands it to each event loop with a single thread-safe call.
+
+Events carry ``<epoch>-<seq>`` ids and the last ``CHANGE_FEED_REPLAY``
+are kept, so a client reconnecting with ``Last-Event-ID`` gets what it
+missed. A client that fell further behind, whose queue overflowed, or that
+reconnects to another process (each process has its own feed and epoch)
+gets a ``reset`` event instead and should re-fetch the vendor list.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+from . import response_cache
+from .models import Vendor
+
+
+TRACKED_FIELDS = ('rooms_available', 'availability_status', 'is_open')
+
+RESET_FRAME = b'event: reset\ndata: {}\n\n'
+
+
+def _frame(event_id, payload):
+    data = json.dumps(payload, separators=(',', ':'))
+    return f'id: {event_id}\nevent: vendor\ndata: {data}\n\n'.encode()
+
+
+def parse_subscription(params):
+    """``(kinds, bbox)`` from ?type= and ?bbox=; raises ``ValueError``"""
+    kinds = None
+    if params.get('type'):
+        kinds = set(params['type'].split(','))
+        valid = {key for key, _ in Vendor.VENDOR_TYPES}
+        unknown = sorted(kinds - valid)
+        if unknown:
+            raise ValueError(f'Unknown vendor type: {", ".join(unknown)}')
+    bbox = None
+    if params.get('bbox'):
+        try:
+            bbox = tuple(float(value) for value in params['bbox'].split(','))
+        except ValueError:
+            bbox = ()
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError('bbox must be min_lat,min_lng,max_lat,max_lng')
+    return kinds, bbox
+
+
+class Subscription:
+    """One stream's filter and its queue of encoded events, owned by an event loop"""
+
+    def __init__(self, loop, kinds, bbox, maxsize):
+        self.loop = loop
+        self.kinds = kinds
+        self.bbox = bbox
+        self.queue = asyncio.Queue(maxsize)
+
+    def matches(self, lat, lng):
+        if self.bbox is None:
+            return True
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+    def put(self, frame):
+        """Queue an event; on overflow drop the backlog and ask for a reset"""
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET_FRAME)
+
+
+def _deliver(subscriptions, frame):
+    for subscription in subscriptions:
+        subscription.put(frame)
+
+
+class ChangeFeed:
+    """Subscribers by vendor type (``None``: every type) and the recent events"""
+
+    def __init__(self, replay=None):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._recent = deque(maxlen=replay or getattr(settings, 'CHANGE_FEED_REPLAY', 1000))
+
+    def __len__(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values()))
+
+    def subscribe(self, kinds=None, bbox=None, last_event_id=None):
+        """Register a stream on the running loop, replaying what it missed"""
+        subscription = Subscription(
+            asyncio.get_running_loop(), kinds, bbox, getattr(settings, 'CHANGE_FEED_QUEUE_SIZE', 256)
+        )
+        with self._lock:
+            for kind in kinds or (None,):
+                self._subscribers.setdefault(kind, set()).add(subscription)
+            if last_event_id:
+                for frame in self._missed(subscription, last_event_id):
+                    subscription.put(frame)
+        return subscription
+
+    def _missed(self, subscription, last_event_id):
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return [RESET_FRAME]
+        seq = int(seq)
+        if self._recent and seq < self._recent[0][0] - 1:
+            return [RESET_FRAME]
+        return [
+            frame for event_seq, kind, lat, lng, frame in self._recent
+            if event_seq > seq and (subscription.kinds is None or kind in subscription.kinds)
+            and subscription.matches(lat, lng)
+        ]
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for kind in subscription.kinds or (None,):
+                subscribers = self._subscribers.get(kind)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[kind]
+
+    def publish(self, vendor_id, kind, lat, lng, changes):
+        """Send ``changes`` of one vendor to every matching subscriber; returns their number"""
+        by_loop = {}
+        with self._lock:
+            seq = next(self._seq)
+            frame = _frame(f'{self.epoch}-{seq}', {'id': vendor_id, **changes})
+            self._recent.append((seq, kind, lat, lng, frame))
+            for key in (kind, None):
+                for subscription in self._subscribers.get(key, ()):
+                    if subscription.matches(lat, lng):
+                        by_loop.setdefault(subscription.loop, []).append(subscription)
+        for loop, subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, frame)
+            except RuntimeError:
+                # The loop has closed; its streams are gone
+                pass
+        return sum(len(subscriptions) for subscriptions in by_loop.values())
+
+
+feed = ChangeFeed()
+
+
+def remember(instance):
+    """Record the tracked fields as loaded, to diff against on save"""
+    instance._availability = {
+        name: instance.__dict__[name] for name in TRACKED_FIELDS if name in instance.__dict__
+    }
+
+
+def vendor_saved(instance, created):
+    """Publish the tracked fields that this save changed, after commit"""
+    current = instance.__dict__
+    if created:
+        changes = {name: current[name] for name in TRACKED_FIELDS if name in current}
+    else:
+        # A field that was never loaded has no known previous value
+        previous = getattr(instance, '_availability', {})
+        changes = {
+            name: current[name] for name in TRACKED_FIELDS
+            if name in current and name in previous and previous[name] != current[name]
+        }
+    remember(instance)
+    if changes:
+        args = (instance.pk, instance.vendor_type, instance.latitude, instance.longitude, changes)
+        transaction.on_commit(lambda: feed.publish(*args))
+
+
+def vendor_deleted(instance):
+    args = (instance.pk, instance.vendor_type, instance.latitude, instance.longitude, {'removed': True})
+    transaction.on_commit(lambda: feed.publish(*args))
+
+
+def rooms_changed(vendor_id):
+    """
+    Publish a vendor's ``rooms_available`` and drop the cached vendor
+    responses after commit, for the queryset updates in ``reservations``
+    that send no signals
+    """
+    def publish():
+        response_cache.invalidate('vendors')
+        row = Vendor.objects.filter(pk=vendor_id).values(
+            'vendor_type', 'latitude', 'longitude', 'rooms_available'
+        ).first()
+        if row is not None:
+            feed.publish(
+                vendor_id, row['vendor_type'], row['latitude'], row['longitude'],
+                {'rooms_available': row['rooms_available']}
+            )
+
+    transaction.on_commit(publish)
@@ -0,0 +1,34 @@
+"""
+SQLite connection tuning
+
+Every new SQLite connection runs the ``SQLITE_PRAGMAS`` from settings,
+which switch the file to write-ahead logging (readers keep reading while a
+write commits) and relax fsyncs to checkpoints, except on the db.sqlite3
+kept in the repository, and size the page cache and memory map.
+``journal_mode`` is stored in the file, so it is only changed when it
+differs. The statements go straight to the sqlite3 connection, so
+they are not counted as the request's SQL. Server databases are left alone.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    raw = connection.connection
+    journal_mode = pragmas.pop('journal_mode', None)
+    if journal_mode:
+        current = raw.execute('PRAGMA journal_mode').fetchone()[0]
+        # In-memory databases only support "memory" and keep it
+        if current not in (journal_mode.lower(), 'memory'):
+            raw.execute(f'PRAGMA journal_mode = {journal_mode}')
+    for statement in pragma_statements(pragmas):
+        raw.execute(statement)
@@ -0,0 +1,329 @@
+"""
+Deterministic synthetic dataset generator
+
+Rows are clustered the way real ones are: vendors and emergency services
+sit in towns (the road graph nodes) or along the highways between them,
+trips run between towns with popularity skewed towards the big cities, and
+bookings fill hotels night by night without exceeding ``room_capacity``.
+Everything is drawn from one seeded ``random.Random``, so the same seed
+and counts produce the same rows. Rows are written with ``bulk_create`` in
+batches, one transaction per chunk.
+"""
+import math
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import Booking, EmergencyService, RoomNight, Trip, TripDailyRollup, TripRouteRollup, Vendor
+from .packs import emergency_packs
+from .reservations import ACTIVE_STATUSES, booking_nights
+from .routing import get_graph
+from .spatial import KM_PER_DEGREE, emergency_index, vendor_index
+from .views import calculate_fuel_cost
+
+
+BATCH_SIZE = 5000
+
+# Rows per transaction
+CHUNK_SIZE = 50000
+
+# Share of roadside rows placed in a town rather than along a highway
+TOWN_SHARE = 0.55
+
+# Relative weight of trips starting or ending in these towns (others weigh 1)
+TOWN_POPULARITY = {
+    'Chennai': 12, 'Bangalore': 10, 'Coimbatore': 6, 'Madurai': 6, 'Trichy': 4, 'Salem': 4,
+    'Pondicherry': 5, 'Mysore': 4, 'Ooty': 4, 'Kodaikanal': 3, 'Kanyakumari': 3, 'Rameshwaram': 3,
+    'Mahabalipuram': 3, 'Tirupati': 3, 'Vellore': 2, 'Tirunelveli': 2, 'Hosur': 2, 'Erode': 2,
+}
+
+FOOD_NAMES = (
+    ['Sri Murugan', 'Saravana', 'Anjappar', 'Amma', 'Highway', 'Annapoorna', 'Sangeetha', 'Adyar Ananda',
+     'Hotel Aryaas', 'Ponnusamy', 'Junior Kuppanna', 'Kumarasamy'],
+    ['Mess', 'Bhavan', 'Dhaba', 'Restaurant', 'Tiffin Centre', 'Biryani Hotel', 'Food Court', 'Tea Stall'],
+)
+HOTEL_NAMES = (
+    ['Sri Balaji', 'Grand', 'Hotel Tamil Nadu', 'Sea View', 'Hill Top', 'Royal', 'Green Park', 'Annamalai',
+     'Residency', 'Sathya', 'Kaveri', 'Ganga'],
+    ['Lodge', 'Residency', 'Inn', 'Comforts', 'Stay', 'Hotel', 'Resort', 'Guest House'],
+)
+WORKSHOP_NAMES = (
+    ['Murugan', 'Ganesh', 'Selvam', 'Kumar', 'Raja', 'Highway', 'Speed', 'Lakshmi', 'Sakthi', 'Vel'],
+    ['Tyre Works', 'Puncture Shop', 'Auto Garage', 'Bike Service', 'Two Wheeler Works', 'Motors'],
+)
+# What a vendor's description lists after its place, a few of each
+VENDOR_FEATURES = {
+    'food': ['filter coffee', 'idli', 'dosa', 'parotta', 'meals', 'biryani', 'tea', 'fresh juice',
+             'chettinad', 'veg', 'non-veg', 'snacks', 'family seating', 'parking'],
+    'hotel': ['AC rooms', 'parking', 'wifi', 'hot water', 'family rooms', 'restaurant', 'bike parking',
+              'lift', 'room service', '24 hour check-in'],
+    'workshop': ['puncture repair', 'tubeless tyres', 'oil change', 'chain lube', 'battery', 'brake service',
+                 'towing', 'wheel alignment', 'spare parts', 'water wash'],
+}
+VENDOR_TYPE_WEIGHTS = {'food': 5, 'hotel': 3, 'workshop': 2}
+VENDOR_NAMES = {'food': FOOD_NAMES, 'hotel': HOTEL_NAMES, 'workshop': WORKSHOP_NAMES}
+PRICE_RANGES = ['₹', '₹₹', '₹₹₹']
+EMERGENCY_NAMES = {
+    'police': 'Police Station', 'hospital': 'Government Hospital', 'ambulance': '108 Ambulance Point',
+    'fire': 'Fire & Rescue Station', 'roadside': 'Highway Patrol Assistance',
+}
+EMERGENCY_WEIGHTS = {'police': 3, 'hospital': 3, 'ambulance': 2, 'fire': 1, 'roadside': 1}
+BOOKING_STATUS_WEIGHTS = {'confirmed': 6, 'pending': 2, 'cancelled': 2}
+
+
+@contextmanager
+def _historical(*models):
+    """Let bulk_create keep the ``created_at`` values we set"""
+    fields = [model._meta.get_field('created_at') for model in models]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _chunks(total, size=CHUNK_SIZE):
+    for start in range(0, total, size):
+        yield min(size, total - start)
+
+
+class Generator:
+    """Row factories sharing one seeded random stream"""
+
+    def __init__(self, seed=42, days=365):
+        self.rng = random.Random(seed)
+        self.days = days
+        self.graph = get_graph()
+        self.towns = list(range(len(self.graph)))
+        # Highways as (u, v) node pairs, drawn in proportion to their length
+        self.roads = []
+        self.road_weights = []
+        for u, edges in enumerate(self.graph.adjacency):
+            for v, km, _, road in edges:
+                if u < v:
+                    self.roads.append((u, v, road))
+                    self.road_weights.append(km)
+        self.town_weights = [TOWN_POPULARITY.get(name, 1) for name in self.graph.names]
+        self.now = timezone.now()
+
+    def _location(self, spread_km):
+        """A point in a town or along a highway, with the place and road it belongs to"""
+        rng = self.rng
+        if rng.random() < TOWN_SHARE:
+            town = rng.choices(self.towns, self.town_weights)[0]
+            lat, lng = self.graph.coords[town]
+            road, place = None, self.graph.names[town]
+        else:
+            u, v, road = rng.choices(self.roads, self.road_weights)[0]
+            t = rng.random()
+            (lat1, lng1), (lat2, lng2) = self.graph.coords[u], self.graph.coords[v]
+            lat, lng = lat1 + (lat2 - lat1) * t, lng1 + (lng2 - lng1) * t
+            place = self.graph.names[u if t < 0.5 else v]
+        lat += rng.gauss(0, spread_km) / KM_PER_DEGREE
+        lng += rng.gauss(0, spread_km) / (KM_PER_DEGREE * math.cos(math.radians(lat)))
+        return round(lat, 6), round(lng, 6), road, place
+
+    def _phone(self):
+        return f'+91 9{self.rng.randrange(1000, 9999)} {self.rng.randrange(10000, 99999)}'
+
+    def _moment(self):
+        """A creation time within the last ``days`` days"""
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+
+    def vendors(self, count):
+        rng = self.rng
+        types = list(VENDOR_TYPE_WEIGHTS)
+        weights = list(VENDOR_TYPE_WEIGHTS.values())
+        sources = [key for key, _ in Vendor.SOURCE_CHOICES]
+        for _ in range(count):
+            vendor_type = rng.choices(types, weights)[0]
+            lat, lng, road, place = self._location(spread_km=1.5)
+            first, second = VENDOR_NAMES[vendor_type]
+            capacity = rng.choice([8, 12, 20, 30, 45, 60]) if vendor_type == 'hotel' else 0
+            yield Vendor(
+                name=f'{rng.choice(first)} {rng.choice(second)}',
+                vendor_type=vendor_type,
+                description=(
+                    f'{VENDOR_NAMES[vendor_type][1][0]} near {place}: '
+                    + ', '.join(rng.sample(VENDOR_FEATURES[vendor_type], 3))
+                ),
+                address=f'{road or "Main Road"}, {place}',
+                latitude=lat, longitude=lng,
+                rating=round(min(5.0, max(1.0, rng.gauss(4.0, 0.5))), 1),
+                phone=self._phone(),
+                is_open=rng.random() < 0.85,
+                price_range=rng.choice(PRICE_RANGES),
+                timing=rng.choice(['6:00 AM - 11:00 PM', '24 Hours', '9:00 AM - 9:00 PM']),
+                rooms_available=capacity,
+                room_capacity=capacity,
+                base_price=Decimal(rng.randrange(60, 400) * 10 if vendor_type == 'hotel' else rng.randrange(5, 50) * 10),
+                source=rng.choice(sources) if vendor_type == 'hotel' else 'direct',
+                availability_status=rng.choice(['Available', 'Available', 'Busy']),
+            )
+
+    def emergency_services(self, count):
+        rng = self.rng
+        types = list(EMERGENCY_WEIGHTS)
+        weights = list(EMERGENCY_WEIGHTS.values())
+        for _ in range(count):
+            service_type = rng.choices(types, weights)[0]
+            lat, lng, road, place = self._location(spread_km=3.0)
+            yield EmergencyService(
+                name=f'{place} {EMERGENCY_NAMES[service_type]}',
+                service_type=service_type,
+                phone=rng.choice(['100', '108', '101', '1033']) if rng.random() < 0.3 else self._phone(),
+                address=f'{road or "Main Road"}, {place}',
+                latitude=lat, longitude=lng,
+                is_24x7=service_type != 'roadside' or rng.random() < 0.5,
+            )
+
+    def _town_distances(self):
+        """Road km between every pair of towns, computed once"""
+        if not hasattr(self, '_distances'):
+            self._distances = {}
+            for u in self.towns:
+                for v in self.towns:
+                    if u < v:
+                        found = self.graph.shortest_path(u, v)
+                        km = self.graph.path_totals(found[1])[0] if found else None
+                        self._distances[u, v] = self._distances[v, u] = km
+        return self._distances
+
+    def trips(self, count):
+        rng = self.rng
+        distances = self._town_distances()
+        for _ in range(count):
+            origin, dest = rng.choices(self.towns, self.town_weights, k=2)
+            while origin == dest or distances[origin, dest] is None:
+                dest = rng.choices(self.towns, self.town_weights)[0]
+            distance = round(distances[origin, dest] * rng.uniform(1.0, 1.08), 1)
+            vehicle = 'bike' if rng.random() < 0.6 else 'car'
+            fuel = calculate_fuel_cost(distance, vehicle, round(rng.uniform(100, 108), 2))
+            (olat, olng), (dlat, dlng) = self.graph.coords[origin], self.graph.coords[dest]
+            yield Trip(
+                origin=self.graph.names[origin], destination=self.graph.names[dest],
+                origin_lat=olat, origin_lng=olng, dest_lat=dlat, dest_lng=dlng,
+                distance_km=distance, vehicle_type=vehicle,
+                fuel_cost=fuel['total_fuel_cost'], fuel_liters=fuel['fuel_liters'],
+                stops_visited=[], created_at=self._moment(),
+            )
+
+    def bookings(self, count, hotels, workshops, booked):
+        """
+        Bookings at existing vendors.
+
+        ``hotels`` maps vendor id to room capacity and ``booked`` maps
+        ``(vendor id, night)`` to rooms already taken; it is updated in place.
+        A hotel stay on a full night is generated as cancelled.
+        """
+        rng = self.rng
+        statuses = list(BOOKING_STATUS_WEIGHTS)
+        weights = list(BOOKING_STATUS_WEIGHTS.values())
+        hotel_ids = list(hotels)
+        tz = timezone.get_current_timezone()
+        for _ in range(count):
+            created_at = self._moment()
+            status = rng.choices(statuses, weights)[0]
+            if hotel_ids and (not workshops or rng.random() < 0.8):
+                vendor_id = rng.choice(hotel_ids)
+                day = timezone.localdate(created_at) + timedelta(days=rng.randrange(0, 60))
+                check_in = datetime.combine(day, time(14), tzinfo=tz)
+                check_out = check_in + timedelta(days=rng.choice([1, 1, 1, 2, 2, 3]), hours=-3)
+                nights = booking_nights(check_in, check_out)
+                if status in ACTIVE_STATUSES:
+                    if all(booked.get((vendor_id, night), 0) < hotels[vendor_id] for night in nights):
+                        for night in nights:
+                            booked[vendor_id, night] = booked.get((vendor_id, night), 0) + 1
+                    else:
+                        status = 'cancelled'
+                price = Decimal(rng.randrange(80, 400) * 10 * len(nights))
+            else:
+                vendor_id = rng.choice(workshops)
+                check_in = created_at + timedelta(hours=rng.randrange(1, 48))
+                check_out = check_in + timedelta(hours=2)
+                price = Decimal(rng.randrange(10, 150) * 10)
+            yield Booking(
+                vendor_id=vendor_id, customer_name=f'Rider {rng.randrange(1, 10 ** 6)}', phone=self._phone(),
+                check_in=check_in, check_out=check_out, total_price=price, status=status,
+                created_at=created_at,
+            )
+
+
+def _write(model, rows, total, label, log):
+    """bulk_create ``total`` rows from an iterator, one transaction per chunk"""
+    written = []
+    for size in _chunks(total):
+        batch = [next(rows) for _ in range(size)]
+        with transaction.atomic():
+            written.extend(obj.pk for obj in model.objects.bulk_create(batch, batch_size=BATCH_SIZE))
+        log(f'{label}: {len(written)}/{total}')
+    return written
+
+
+def clear():
+    """Delete generated tables with plain DELETEs (no per-row signals or cascades)"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model in (RoomNight, Booking, TripDailyRollup, TripRouteRollup, Trip, Vendor, EmergencyService):
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+
+
+def generate(vendors=0, emergency=0, trips=0, bookings=0, seed=42, days=365, append=False, log=None):
+    """Generate rows (replacing existing ones unless ``append``); returns counts"""
+    log = log or (lambda message: None)
+    generator = Generator(seed=seed, days=days)
+    if not append:
+        clear()
+
+    vendor_ids = _write(Vendor, generator.vendors(vendors), vendors, 'vendors', log)
+    _write(EmergencyService, generator.emergency_services(emergency), emergency, 'emergency services', log)
+    with _historical(Trip, Booking):
+        _write(Trip, generator.trips(trips), trips, 'trips', log)
+
+        if bookings:
+            # Book the new vendors (ids are consecutive), or the existing ones
+            # when appending only bookings
+            candidates = Vendor.objects.filter(pk__gte=vendor_ids[0]) if vendor_ids else Vendor.objects.all()
+            hotels = dict(candidates.filter(vendor_type='hotel', room_capacity__gt=0).values_list('id', 'room_capacity'))
+            workshops = list(candidates.filter(vendor_type='workshop').values_list('id', flat=True))
+            if not hotels and not workshops:
+                log('bookings: skipped, no hotels or workshops to book')
+                bookings = 0
+            existing = RoomNight.objects.none() if vendor_ids else RoomNight.objects.all()
+            booked = {
+                (vendor_id, night): rooms for vendor_id, night, rooms
+                in existing.values_list('vendor_id', 'night', 'rooms_booked').iterator()
+            }
+            _write(Booking, generator.bookings(bookings, hotels, workshops, booked), bookings, 'bookings', log)
+            _write_room_nights(booked, hotels, log)
+
+    if trips or not append:
+        log('trip rollups: rebuilding')
+        rollups.rebuild()
+    vendor_index.invalidate()
+    emergency_index.invalidate()
+    emergency_packs.invalidate()
+    return {'vendors': vendors, 'emergency': emergency, 'trips': trips, 'bookings': bookings}
+
+
+def _write_room_nights(booked, hotels, log):
+    """Store per-night totals and refresh tonight's ``rooms_available``"""
+    rows = [RoomNight(vendor_id=vendor_id, night=night, rooms_booked=count) for (vendor_id, night), count in booked.items()]
+    with transaction.atomic():
+        RoomNight.objects.bulk_create(
+            rows, batch_size=BATCH_SIZE,
+            update_conflicts=True, unique_fields=['vendor', 'night'], update_fields=['rooms_booked'],
+        )
+        today = timezone.localdate()
+        tonight = [
+            Vendor(pk=vendor_id, rooms_available=hotels[vendor_id] - count)
+            for (vendor_id, night), count in booked.items() if night == today and vendor_id in hotels
+        ]
+        Vendor.objects.bulk_update(tonight, ['rooms_available'], batch_size=BATCH_SIZE)
+    log(f'room nights: {len(rows)}')
@@ -0,0 +1,227 @@
+"""
+Fast list path for plain model serializers
+
+Instead of building model instances and running every DRF field, list
+pages are read with ``.values()`` and converted column by column with
+converters derived once from the serializer's own fields: plain columns
+are copied, ``get_FOO_display`` sources become dictionary lookups, and
+anything else (decimals, datetimes) still goes through the DRF field's
+``to_representation``. The output is the same as the serializer's, key for
+key. Foreign keys are read as their ``_id`` column and sources through
+non-null foreign keys (``vendor.name``) as joined columns, so a page is one
+query. Serializers with other related or computed fields fall back to the
+normal path.
+"""
+import math
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def _identity(value):
+    return value
+
+
+# DRF field types whose to_representation leaves database values unchanged,
+# or reduces to a builtin constructor
+_CONVERTERS = {
+    serializers.CharField: _identity,
+    serializers.ChoiceField: _identity,
+    serializers.URLField: _identity,
+    serializers.EmailField: _identity,
+    serializers.IntegerField: int,
+    serializers.FloatField: float,
+    serializers.BooleanField: bool,
+}
+
+
+def _datetime_converter(field):
+    """
+    ``DateTimeField.to_representation`` for ISO 8601 output, with the
+    timezone looked up once per plan instead of once per row.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.utcoffset() is None:
+            return field.to_representation(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    return convert
+
+
+def _float_safe(value):
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def floats_safe(values):
+    """
+    True when the fast JSON encoder writes every float exactly as ``json.dumps``.
+
+    The two differ only for non-finite floats and for floats that Python
+    prints in exponent notation.
+    """
+    magnitudes = [abs(value) for value in values if value]
+    if not magnitudes:
+        return True
+    return math.isfinite(sum(magnitudes)) and min(magnitudes) >= 1e-4 and max(magnitudes) < 1e16
+
+
+def json_safe(value):
+    """``floats_safe`` for every float nested in a decoded JSON value"""
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        kind = type(item)
+        if kind is float:
+            if not _float_safe(item):
+                return False
+        elif kind is dict:
+            stack.extend(item.values())
+        elif kind is list:
+            stack.extend(item)
+    return True
+
+
+def _resolve_column(model, attrs):
+    """
+    ``(model field, values() column)`` for a serializer source, or ``None``.
+
+    Dotted sources may follow non-null forward foreign keys (``vendor.name``
+    reads ``vendor__name`` in the same query); a nullable hop would make DRF
+    drop the key instead of writing ``null``. The last attribute may itself
+    be a foreign key, read as its ``_id`` column.
+    """
+    if not attrs:
+        return None
+    path = []
+    for attr in attrs[:-1]:
+        try:
+            hop = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not hop.many_to_one or hop.null:
+            return None
+        path.append(hop.name)
+        model = hop.related_model
+    try:
+        model_field = model._meta.get_field(attrs[-1])
+    except FieldDoesNotExist:
+        return None
+    if model_field.is_relation and not (model_field.many_to_one and not path):
+        return None
+    if not model_field.concrete:
+        return None
+    column = model_field.attname if not path else '__'.join(path + [model_field.name])
+    return model_field, column
+
+
+class ValuesPlan:
+    """Columns to read and per-field converters for one serializer's output"""
+
+    def __init__(self, columns, outputs, float_columns, json_columns):
+        # Converters capture the current timezone, so plans are built per request
+        self.columns = columns
+        # [(output key, column, converter)]
+        self.outputs = outputs
+        self.float_columns = float_columns
+        self.json_columns = json_columns
+
+    @classmethod
+    def for_serializer(cls, serializer, extra_columns=()):
+        """Build a plan, or return ``None`` when a field needs the full serializer"""
+        model = serializer.Meta.model
+        columns = list(extra_columns)
+        outputs = []
+        float_columns = []
+        json_columns = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            attrs = field.source_attrs
+            attr = attrs[-1] if attrs else None
+            if len(attrs) == 1 and attr.startswith('get_') and attr.endswith('_display'):
+                try:
+                    model_field = model._meta.get_field(attr[4:-8])
+                except FieldDoesNotExist:
+                    return None
+                if not model_field.choices:
+                    return None
+                labels = {key: str(label) for key, label in model_field.flatchoices}
+                column = model_field.attname
+                convert = labels.get
+                converter = lambda value, convert=convert: convert(value, value)
+            else:
+                resolved = _resolve_column(model, attrs)
+                if resolved is None:
+                    return None
+                model_field, column = resolved
+                if model_field.is_relation:
+                    if type(field) is not serializers.PrimaryKeyRelatedField or field.pk_field is not None:
+                        return None
+                    converter = _identity
+                elif isinstance(field, serializers.JSONField) and not field.binary:
+                    converter = _identity
+                    json_columns.append(column)
+                elif type(field) is serializers.DateTimeField:
+                    converter = _datetime_converter(field)
+                else:
+                    converter = _CONVERTERS.get(type(field), field.to_representation)
+                    if isinstance(field, serializers.FloatField):
+                        float_columns.append(column)
+            if column not in columns:
+                columns.append(column)
+            outputs.append((name, column, converter))
+        return cls(columns, outputs, float_columns, json_columns)
+
+    def rows(self, values):
+        """Convert ``.values()`` dicts; returns ``(rows, json_safe)``"""
+        outputs = self.outputs
+        rows = [
+            {
+                key: None if row[column] is None else convert(row[column])
+                for key, column, convert in outputs
+            }
+            for row in values
+        ]
+        safe = all(
+            floats_safe([row[column] for row in values]) for column in self.float_columns
+        ) and all(
+            json_safe([row[column] for row in values]) for column in self.json_columns
+        )
+        return rows, safe
+
+
+class FastListMixin:
+    """
+    Serve ``list()`` through a ``ValuesPlan`` when the serializer allows it.
+
+    The keyset ordering columns are always read so pagination can build its
+    cursor from the dict rows. Responses that the fast JSON encoder renders
+    exactly are flagged with ``json_safe`` for ``FastJSONRenderer``.
+    """
+
+    def get_values_plan(self):
+        serializer = self.get_serializer()
+        ordering = getattr(self, 'keyset_ordering', ())
+        return ValuesPlan.for_serializer(serializer, [name.lstrip('-') for name in ordering])
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_values_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(*plan.columns)
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows, safe = plan.rows(list(queryset))
+            response = Response(rows)
+        else:
+            rows, safe = plan.rows(page)
+            response = self.get_paginated_response(rows)
+        response.json_safe = safe
+        return response
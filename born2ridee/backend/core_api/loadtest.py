@@ -0,0 +1,585 @@
+"""
+HTTP load-testing harness used by ``manage.py loadtest``
+
+Every named route in ``core_api/urls.py`` has a request builder here; a mix
+assigns weights to route names. Worker threads pick routes by weight and
+send them over keep-alive connections, either to an external server or to
+an in-process server started against a scratch database: Django's
+threaded WSGI server, a WSGI server with a fixed worker pool (like a
+pre-forked sync deployment), or uvicorn for the ASGI application.
+``SlowClient`` threads model mobile clients that hold a connection while
+trickling their request in.
+"""
+import copy
+import http.client
+import json
+import math
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, WSGIServer
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import override_settings
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+
+from . import urls
+
+
+# Coordinates requests are drawn around (towns on the bundled road graph)
+PLACES = [
+    (13.0827, 80.2707), (12.9716, 77.5946), (11.9416, 79.8083), (12.2958, 76.6394),
+    (11.4102, 76.6950), (9.9252, 78.1198), (11.0168, 76.9558), (10.7905, 78.7047),
+    (8.0883, 77.5385), (11.6643, 78.1460), (12.9165, 79.1325), (9.2876, 79.3129),
+]
+PLACE_PREFIXES = ['ch', 'ban', 'pon', 'mys', 'oo', 'mad', 'coi', 'tri', 'kan', 'sal', 'vel', 'ram', 'k', 'ma']
+SEARCH_QUERIES = ['filter coffee', 'puncture', 'trichy', 'biryani', 'madurai lodge', 'tyre', 'punc', 'salem mess', 'wifi']
+
+
+def _point(rng, jitter=0.2):
+    lat, lng = rng.choice(PLACES)
+    return round(lat + rng.uniform(-jitter, jitter), 4), round(lng + rng.uniform(-jitter, jitter), 4)
+
+
+def _get(name, params=None, **kwargs):
+    path = reverse(name, kwargs=kwargs or None)
+    return 'GET', path + ('?' + urlencode(params) if params else ''), None
+
+
+def _post(name, body, **kwargs):
+    return 'POST', reverse(name, kwargs=kwargs or None), body
+
+
+def _trip_body(rng):
+    (olat, olng), (dlat, dlng) = _point(rng), _point(rng)
+    return {
+        'origin': 'Load test origin', 'destination': 'Load test destination',
+        'origin_lat': olat, 'origin_lng': olng, 'dest_lat': dlat, 'dest_lng': dlng,
+        'distance_km': round(rng.uniform(20, 600), 1), 'vehicle_type': rng.choice(['bike', 'car']),
+    }
+
+
+def _booking_body(rng, ids):
+    check_in = timezone.now() + timedelta(days=rng.randrange(1, 60))
+    return {
+        'vendor': rng.choice(ids['hotels']), 'customer_name': 'Load Test', 'phone': '0',
+        'total_price': '1500.00', 'status': 'confirmed',
+        'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=1)).isoformat(),
+    }
+
+
+def _nearest(rng, ids):
+    lat, lng = _point(rng)
+    return _get('emergency-nearest', {'lat': lat, 'lng': lng})
+
+
+def _corridor(rng, ids):
+    (olat, olng), (dlat, dlng) = _point(rng, 0), _point(rng, 0)
+    return _get('vendor-corridor', {'origin_lat': olat, 'origin_lng': olng, 'dest_lat': dlat, 'dest_lng': dlng})
+
+
+# Route name -> builder(rng, ids) returning (method, path, JSON body or None)
+ROUTES = {
+    'api-overview': lambda rng, ids: _get('api-overview'),
+    'trip-list': lambda rng, ids: _get('trip-list', {'page_size': 50}),
+    'trip-detail': lambda rng, ids: _get('trip-detail', pk=rng.choice(ids['trips'])),
+    'trip-create': lambda rng, ids: _post('trip-list', _trip_body(rng)),
+    'trip-bulk': lambda rng, ids: _post('trip-bulk', [_trip_body(rng) for _ in range(20)]),
+    'trip-export': lambda rng, ids: _get('trip-export', {'from': timezone.localdate().isoformat()}),
+    'trip-analytics': lambda rng, ids: _get('trip-analytics', {'group': rng.choice(['day', 'vehicle', 'route'])}),
+    'vendor-list': lambda rng, ids: _get('vendor-list', {'type': rng.choice(['food', 'hotel', 'workshop'])}),
+    'vendor-detail': lambda rng, ids: _get('vendor-detail', pk=rng.choice(ids['vendors'])),
+    'vendor-nearby': lambda rng, ids: _get('vendor-nearby', dict(zip(('lat', 'lng'), _point(rng)), k=20)),
+    'vendor-best': lambda rng, ids: _get('vendor-list', dict(zip(('lat', 'lng'), _point(rng)), sort='best', k=20)),
+    'vendor-corridor': _corridor,
+    'vendor-search': lambda rng, ids: _get('vendor-search', {'q': rng.choice(SEARCH_QUERIES)}),
+    'booking-list': lambda rng, ids: _get('booking-list', {'page_size': 50}),
+    'booking-detail': lambda rng, ids: _get('booking-detail', pk=rng.choice(ids['bookings'])),
+    'booking-create': lambda rng, ids: _post('booking-list', _booking_body(rng, ids)),
+    'booking-cancel': lambda rng, ids: _post('booking-cancel', {}, pk=rng.choice(ids['bookings'])),
+    'booking-export': lambda rng, ids: _get('booking-export', {'from': timezone.localdate().isoformat()}),
+    'emergency-list': lambda rng, ids: _get('emergency-list'),
+    'emergency-detail': lambda rng, ids: _get('emergency-detail', pk=rng.choice(ids['emergency'])),
+    'emergency-nearest': _nearest,
+    'emergency-pack': lambda rng, ids: _get('emergency-pack', {'lat_min': 10, 'lat_max': 12, 'lng_min': 77, 'lng_max': 80}),
+    'calculate-fuel': lambda rng, ids: _post('calculate-fuel', {
+        'distance_km': rng.uniform(10, 800), 'vehicle_type': rng.choice(['bike', 'car'])
+    }),
+    'calculate-fuel-batch': lambda rng, ids: _post('calculate-fuel-batch', {
+        'distance_km': [rng.uniform(10, 800) for _ in range(100)], 'vehicle_type': 'bike'
+    }),
+    'route': lambda rng, ids: _get('route', dict(zip(
+        ('origin_lat', 'origin_lng', 'dest_lat', 'dest_lng'), _point(rng) + _point(rng)
+    ))),
+    'distance-matrix': lambda rng, ids: _post('distance-matrix', {
+        'origins': [_point(rng, 0.01) for _ in range(3)], 'destinations': [_point(rng, 0.01) for _ in range(5)]
+    }),
+    'distance-matrix-stats': lambda rng, ids: _get('distance-matrix-stats'),
+    'place-autocomplete': lambda rng, ids: _get('place-autocomplete', {'q': rng.choice(PLACE_PREFIXES)}),
+    'metrics': lambda rng, ids: _get('metrics'),
+    'async-vendor-list': lambda rng, ids: _get('async-vendor-list', {'type': rng.choice(['food', 'hotel', 'workshop'])}),
+    'async-vendor-nearby': lambda rng, ids: _get('async-vendor-nearby', dict(zip(('lat', 'lng'), _point(rng)), k=20)),
+    'async-emergency-list': lambda rng, ids: _get('async-emergency-list'),
+    'async-emergency-detail': lambda rng, ids: _get('async-emergency-detail', pk=rng.choice(ids['emergency'])),
+    'async-emergency-nearest': lambda rng, ids: _get('async-emergency-nearest', dict(zip(('lat', 'lng'), _point(rng)))),
+}
+
+# URL names deliberately not driven: the router's root view is shadowed by api-overview
+# vendor-changes is an endless event stream, not a request/response route
+IGNORED_URL_NAMES = {'api-root', 'vendor-changes'}
+
+MIXES = {
+    'all': dict.fromkeys(ROUTES, 1),
+    'rider-planning': {
+        'place-autocomplete': 30, 'route': 10, 'distance-matrix': 5, 'vendor-corridor': 10,
+        'vendor-nearby': 10, 'vendor-best': 6, 'vendor-list': 8, 'vendor-detail': 8, 'calculate-fuel': 8,
+        'trip-create': 4, 'trip-list': 3, 'booking-create': 2, 'emergency-list': 2,
+    },
+    'sos-spike': {
+        'emergency-nearest': 60, 'emergency-pack': 10, 'emergency-list': 10, 'emergency-detail': 5,
+        'route': 5, 'vendor-nearby': 10,
+    },
+    # Database-bound: about a third of the requests write trips or bookings
+    'read-write': {
+        'trip-list': 20, 'trip-detail': 15, 'trip-analytics': 5, 'booking-list': 10,
+        'booking-detail': 10, 'vendor-detail': 10,
+        'trip-create': 15, 'booking-create': 10, 'booking-cancel': 5,
+    },
+    # Vendor and emergency reads, and the same lookups through the async views
+    'lookups': {
+        'vendor-list': 20, 'vendor-nearby': 30, 'emergency-list': 10, 'emergency-detail': 10,
+        'emergency-nearest': 30,
+    },
+    'async-lookups': {
+        'async-vendor-list': 20, 'async-vendor-nearby': 30, 'async-emergency-list': 10,
+        'async-emergency-detail': 10, 'async-emergency-nearest': 30,
+    },
+}
+
+WRITE_ROUTES = {'trip-create', 'trip-bulk', 'booking-create', 'booking-cancel', 'distance-matrix'}
+
+
+def url_names():
+    """Every route name in ``core_api/urls.py``"""
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(pattern.url_patterns)
+            elif pattern.name:
+                yield pattern.name
+    return set(walk(urls.urlpatterns))
+
+
+def uncovered_routes():
+    """URL names that no request builder targets"""
+    # trip-create and booking-create POST to the list routes
+    covered = set(ROUTES) | {'trip-list', 'booking-list'}
+    return sorted(url_names() - covered - IGNORED_URL_NAMES)
+
+
+def parse_mix(spec):
+    """A named mix, or ``route=weight,route=weight``"""
+    if spec in MIXES:
+        return MIXES[spec]
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ROUTES:
+            raise ValueError(f'Unknown route {name!r}; choose from {", ".join(sorted(ROUTES))}')
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(1, math.ceil(fraction * len(sorted_values))) - 1]
+
+
+def summarize(latencies, statuses, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'throughput_rps': round(count / elapsed, 1) if elapsed else None,
+        'errors': sum(n for code, n in statuses.items() if code == 'error' or int(code) >= 500),
+        'client_errors': sum(n for code, n in statuses.items() if code != 'error' and 400 <= int(code) < 500),
+        'status': dict(sorted(statuses.items())),
+        'mean_ms': round(sum(latencies) / count * 1000, 2) if count else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2) if count else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if count else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if count else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if count else None,
+    }
+
+
+class QuietHandler(WSGIRequestHandler):
+    # Headers and body are written separately; with Nagle on, keep-alive
+    # requests stall ~40 ms on the client's delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class InProcessServer:
+    """Django's threaded development server on a free local port"""
+
+    def __init__(self, application, host='127.0.0.1'):
+        self.httpd = ThreadedWSGIServer((host, 0), QuietHandler, allow_reuse_address=True)
+        self.httpd.daemon_threads = True
+        self.httpd.set_app(application)
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGI server handling connections on a fixed pool of threads.
+
+    Not being a ``ThreadingMixIn`` server, Django answers with
+    ``Connection: close``, so each request holds a pool thread from its
+    first byte to its last, as a sync worker would.
+    """
+    request_queue_size = 1024
+
+    def __init__(self, *args, threads=8, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PooledServer(InProcessServer):
+    """:class:`PooledWSGIServer` on a free local port"""
+
+    def __init__(self, application, threads=8, host='127.0.0.1'):
+        self.httpd = PooledWSGIServer((host, 0), QuietHandler, threads=threads, allow_reuse_address=True)
+        self.httpd.set_app(application)
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+
+class UvicornServer:
+    """uvicorn (an optional dependency) serving an ASGI application from a background thread"""
+
+    def __init__(self, application, host='127.0.0.1'):
+        import uvicorn
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((host, 0))
+        self.url = f'http://{host}:{self.socket.getsockname()[1]}'
+        config = uvicorn.Config(application, lifespan='off', access_log=False, log_config=None, backlog=1024)
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, kwargs={'sockets': [self.socket]}, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError('uvicorn failed to start')
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+        self.socket.close()
+
+
+class SlowClient(threading.Thread):
+    """
+    Sends requests a few bytes at a time over ``send_seconds`` each, then
+    reads the response, until the deadline; counts completed and failed
+    requests.
+    """
+
+    def __init__(self, base_url, path, send_seconds, deadline, pieces=8):
+        super().__init__(daemon=True)
+        parts = urlsplit(base_url)
+        self.address = (parts.hostname, parts.port or 80)
+        self.request = (
+            f'GET {parts.path.rstrip("/")}{path} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+            'Accept: application/json\r\nConnection: close\r\n\r\n'
+        ).encode()
+        self.send_seconds, self.deadline, self.pieces = send_seconds, deadline, pieces
+        self.completed = self.failed = 0
+
+    def _exchange(self):
+        with socket.create_connection(self.address, timeout=60) as sock:
+            step = math.ceil(len(self.request) / self.pieces)
+            for start in range(0, len(self.request), step):
+                sock.sendall(self.request[start:start + step])
+                time.sleep(self.send_seconds / self.pieces)
+            response = b''
+            while chunk := sock.recv(65536):
+                response += chunk
+        return response.startswith(b'HTTP/1.1 200')
+
+    def run(self):
+        while time.monotonic() < self.deadline:
+            try:
+                ok = self._exchange()
+            except OSError:
+                ok = False
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+
+def _reload_connections():
+    """Detach this thread's connections and make the handler re-read ``DATABASES``"""
+    detached = {conn.alias: conn for conn in connections.all(initialized_only=True)}
+    for alias in detached:
+        del connections[alias]
+    connections.__dict__.pop('settings', None)
+    connections._settings = None
+    return detached
+
+
+@contextmanager
+def using_database(settings_dict):
+    """
+    Point the default alias at ``settings_dict`` for the block, yielding its
+    connection. ``DATABASES`` is overridden and the connection handler made
+    to re-read it, so every thread connects to the new database while the
+    configured settings are left untouched; this thread's own connections
+    are put back afterwards.
+    """
+    override = override_settings(DATABASES={**settings.DATABASES, DEFAULT_DB_ALIAS: settings_dict})
+    with warnings.catch_warnings():
+        # The warning is about connections keeping the old settings, which
+        # _reload_connections() deals with
+        warnings.filterwarnings('ignore', message='Overriding setting DATABASES')
+        override.enable()
+    saved = _reload_connections()
+    try:
+        yield connections[DEFAULT_DB_ALIAS]
+    finally:
+        for connection in _reload_connections().values():
+            connection.close()
+        override.disable()
+        _reload_connections()
+        for alias, connection in saved.items():
+            connections[alias] = connection
+
+
+@contextmanager
+def scratch_database(connection, untuned=False):
+    """
+    Create and migrate a test database next to the configured one for a
+    benchmark, optionally with the connection tuning switched off (SQLite:
+    rollback journal and no pragmas; server: a new connection per request),
+    and yield a connection to it. Other threads reach it as the default
+    database until the block ends.
+    """
+    settings_dict = copy.deepcopy(connection.settings_dict)
+    directory = None
+    overrides = {}
+    if connection.vendor == 'sqlite':
+        # A file, not the in-memory default, so threads share it as in production
+        directory = tempfile.mkdtemp(prefix='born2ride-bench-')
+        settings_dict['TEST'] = dict(settings_dict['TEST'], NAME=f'{directory}/bench.sqlite3')
+        if untuned:
+            settings_dict['OPTIONS'] = {}
+            overrides['SQLITE_PRAGMAS'] = {}
+    elif untuned:
+        settings_dict['CONN_MAX_AGE'] = 0
+        settings_dict['CONN_HEALTH_CHECKS'] = False
+
+    original_name = settings_dict['NAME']
+    try:
+        with override_settings(**overrides), using_database(settings_dict) as scratch:
+            scratch.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                yield scratch
+            finally:
+                connections.close_all()
+                scratch.creation.destroy_test_db(original_name, verbosity=0)
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class Worker(threading.Thread):
+    """Sends weighted random requests until the deadline or request budget runs out"""
+
+    def __init__(self, base_url, routes, weights, ids, seed, deadline, budget):
+        super().__init__(daemon=True)
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.routes, self.weights, self.ids = routes, weights, ids
+        self.rng = random.Random(seed)
+        self.deadline, self.budget = deadline, budget
+        self.latencies = {name: [] for name in routes}
+        self.statuses = {name: {} for name in routes}
+        self.connection = None
+        # The scrape endpoint is a 404 or 401 without the configured token
+        self.metrics_path = reverse('metrics')
+        self.metrics_token = getattr(settings, 'METRICS_TOKEN', '')
+
+    def _send(self, method, path, body):
+        headers = {'Accept': 'application/json'}
+        if path == self.metrics_path and self.metrics_token:
+            headers['Authorization'] = f'Bearer {self.metrics_token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+                self.connection.connect()
+                self.connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.connection.close()
+                    self.connection = None
+                return response.status
+            except (http.client.HTTPException, OSError):
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+
+    def run(self):
+        while time.monotonic() < self.deadline and self.budget.take():
+            name = self.rng.choices(self.routes, self.weights)[0]
+            method, path, body = ROUTES[name](self.rng, self.ids)
+            start = time.perf_counter()
+            try:
+                code = str(self._send(method, path, body))
+            except (http.client.HTTPException, OSError):
+                code = 'error'
+            self.latencies[name].append(time.perf_counter() - start)
+            self.statuses[name][code] = self.statuses[name].get(code, 0) + 1
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Budget:
+    """Thread-safe request counter; ``None`` means unlimited"""
+
+    def __init__(self, total):
+        self.remaining = total
+        self.lock = threading.Lock()
+
+    def take(self):
+        if self.remaining is None:
+            return True
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+
+def fetch_ids(base_url):
+    """Sample primary keys for detail routes from the running server"""
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    prefix = parts.path.rstrip('/')
+    ids = {}
+    sources = {
+        'vendors': reverse('vendor-list') + '?page_size=500&fields=id',
+        'hotels': reverse('vendor-list') + '?type=hotel&page_size=500&fields=id',
+        'trips': reverse('trip-list') + '?page_size=500&fields=id',
+        'bookings': reverse('booking-list') + '?page_size=500&fields=id',
+        'emergency': reverse('emergency-list') + '?page_size=500&fields=id',
+    }
+    try:
+        for key, path in sources.items():
+            connection.request('GET', prefix + path, headers={'Accept': 'application/json'})
+            response = connection.getresponse()
+            body = json.loads(response.read())
+            ids[key] = [row['id'] for row in body.get('results', [])] or [0]
+    finally:
+        connection.close()
+    return ids
+
+
+def run(base_url, weights, concurrency, duration, requests, seed, groups=None):
+    """
+    Drive load and return a summary per route and overall, plus one per
+    group when ``groups`` maps group names to sets of route names.
+    """
+    routes = [name for name, weight in weights.items() if weight > 0]
+    route_weights = [weights[name] for name in routes]
+    ids = fetch_ids(base_url)
+    deadline = time.monotonic() + duration if duration else float('inf')
+    budget = Budget(requests)
+    workers = [
+        Worker(base_url, routes, route_weights, ids, seed + n, deadline, budget)
+        for n in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    per_route = {}
+    all_latencies, all_statuses = [], {}
+    grouped = {group: ([], {}) for group in groups or {}}
+    for name in routes:
+        latencies = [value for worker in workers for value in worker.latencies[name]]
+        statuses = {}
+        for worker in workers:
+            for code, count in worker.statuses[name].items():
+                statuses[code] = statuses.get(code, 0) + count
+                all_statuses[code] = all_statuses.get(code, 0) + count
+        all_latencies.extend(latencies)
+        for group, members in (groups or {}).items():
+            if name in members:
+                grouped[group][0].extend(latencies)
+                for code, count in statuses.items():
+                    grouped[group][1][code] = grouped[group][1].get(code, 0) + count
+        if latencies:
+            per_route[name] = summarize(latencies, statuses, elapsed)
+    result = {
+        'elapsed_s': round(elapsed, 3),
+        'overall': summarize(all_latencies, all_statuses, elapsed),
+        'routes': per_route,
+    }
+    if groups:
+        result['groups'] = {group: summarize(*values, elapsed) for group, values in grouped.items()}
+    return result
@@ -0,0 +1,14 @@
+"""
+Helpers shared by the benchmark management commands
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def rolled_back(using=None):
+    """Run the block in a transaction that is rolled back at the end, so seeded rows never persist"""
+    with transaction.atomic(using=using):
+        yield
+        transaction.set_rollback(True, using=using)
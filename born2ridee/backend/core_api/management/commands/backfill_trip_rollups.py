@@ -0,0 +1,15 @@
+"""
+Management command to rebuild the trip analytics rollups from raw trips
+"""
+from django.core.management.base import BaseCommand
+
+from core_api import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes TripDailyRollup and TripRouteRollup from the Trip table'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding trip rollups...')
+        daily, routes = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {daily} daily and {routes} route rollups'))
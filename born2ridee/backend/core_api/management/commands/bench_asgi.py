@@ -0,0 +1,109 @@
+"""
+Management command comparing the WSGI and ASGI deployments under slow clients
+"""
+import json
+import logging
+import time
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.urls import reverse
+
+from core_api import datagen, loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Serves the vendor and emergency lookups from a fixed pool of WSGI threads (sync views) '
+        'and from uvicorn (async views) in this process, on a scratch database, while slow '
+        'clients hold connections open; reports fast-client throughput and tail latency and '
+        'how many slow requests each server completed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads')
+        parser.add_argument(
+            '--slow-clients', default='0,16,64',
+            help='Comma-separated numbers of slow connections to hold open, one run each'
+        )
+        parser.add_argument('--slow-seconds', type=float, default=3.0, help='Time a slow client takes to send a request')
+        parser.add_argument('--concurrency', type=int, default=8, help='Fast client threads')
+        parser.add_argument('--duration', type=float, default=8.0, help='Seconds per run')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--vendors', type=int, default=5000, help='Scratch dataset size')
+        parser.add_argument('--emergency', type=int, default=1000)
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            slow_counts = [int(count) for count in options['slow_clients'].split(',')]
+        except ValueError:
+            raise CommandError('--slow-clients takes comma-separated integers')
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('uvicorn is not installed (pip install uvicorn)')
+
+        wsgi_application, asgi_application = get_wsgi_application(), get_asgi_application()
+        # After the applications: their setup re-applies LOGGING
+        logging.getLogger('core_api.metrics').setLevel(logging.ERROR)
+        deployments = [
+            ('wsgi', 'lookups', lambda: loadtest.PooledServer(wsgi_application, threads=options['threads'])),
+            ('asgi', 'async-lookups', lambda: loadtest.UvicornServer(asgi_application)),
+        ]
+        results = []
+        with loadtest.scratch_database(connections['default']):
+            dataset = datagen.generate(
+                vendors=options['vendors'], emergency=options['emergency'], seed=options['seed']
+            )
+            self.stdout.write('Dataset: ' + ', '.join(f'{count} {name}' for name, count in dataset.items()))
+            connections.close_all()
+            for name, mix, server_factory in deployments:
+                weights = loadtest.MIXES[mix]
+                slow_path = reverse('async-vendor-list' if name == 'asgi' else 'vendor-list')
+                for slow in slow_counts:
+                    self.stdout.write(f'{name}: {slow} slow clients, {options["duration"]:.0f} s...')
+                    with server_factory() as server:
+                        results.append(self._run(name, server.url, weights, slow, slow_path, options))
+
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'threads': options['threads'], 'dataset': dataset, 'runs': results}, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def _run(self, name, url, weights, slow, slow_path, options):
+        deadline = time.monotonic() + options['duration']
+        slow_clients = [
+            loadtest.SlowClient(url, slow_path, options['slow_seconds'], deadline) for _ in range(slow)
+        ]
+        for client in slow_clients:
+            client.start()
+        # Let the slow connections open before measuring
+        time.sleep(min(0.5, options['slow_seconds'] / 4) if slow else 0)
+        result = loadtest.run(url, weights, options['concurrency'], deadline - time.monotonic(), None, options['seed'])
+        for client in slow_clients:
+            client.join()
+        return {
+            'server': name,
+            'slow_clients': slow,
+            'slow_completed': sum(client.completed for client in slow_clients),
+            'slow_failed': sum(client.failed for client in slow_clients),
+            **result,
+        }
+
+    def _report(self, results):
+        self.stdout.write(
+            f'{"server":<6} {"slow":>5} {"slow ok":>8} {"reqs":>7} {"rps":>8} {"p50 ms":>8} '
+            f'{"p95 ms":>8} {"p99 ms":>8} {"max ms":>8} {"err":>5}'
+        )
+        for result in results:
+            stats = result['overall']
+            self.stdout.write(
+                f'{result["server"]:<6} {result["slow_clients"]:>5} '
+                f'{result["slow_completed"]:>4}/{result["slow_completed"] + result["slow_failed"]:<3} '
+                f'{stats["requests"]:>7} {stats["throughput_rps"]:>8} {stats["p50_ms"]:>8} {stats["p95_ms"]:>8} '
+                f'{stats["p99_ms"]:>8} {stats["max_ms"]:>8} {stats["errors"]:>5}'
+            )
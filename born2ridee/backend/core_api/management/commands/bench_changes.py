@@ -0,0 +1,202 @@
+"""
+Management command measuring fan-out of the vendor availability change feed
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from urllib.parse import urlencode, urlsplit
+
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.urls import reverse
+
+from core_api import availability, datagen, loadtest
+from core_api.models import Vendor
+
+
+KINDS = [None, {'food'}, {'hotel'}, {'workshop'}, {'hotel', 'workshop'}]
+
+
+def _rss_mb():
+    with open('/proc/self/statm') as fh:
+        return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Serves the app from uvicorn in this process on a scratch database, opens many '
+        '/api/vendors/changes/ streams with random type and bounding-box filters, then saves '
+        'vendors at a fixed rate; reports delivery latency from save to client, missed or '
+        'stray events, CPU used while the streams sit idle and memory per stream.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=2000, help='Open event streams')
+        parser.add_argument('--events', type=int, default=300, help='Vendor saves to publish')
+        parser.add_argument('--rate', type=float, default=50.0, help='Saves per second')
+        parser.add_argument('--idle', type=float, default=3.0, help='Seconds to measure idle CPU for')
+        parser.add_argument('--vendors', type=int, default=5000, help='Scratch dataset size')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn  # noqa: F401
+        except ImportError:
+            raise CommandError('uvicorn is not installed (pip install uvicorn)')
+
+        application = get_asgi_application()
+        # After the application: its setup re-applies LOGGING
+        logging.getLogger('core_api.metrics').setLevel(logging.ERROR)
+        with loadtest.scratch_database(connections['default']):
+            datagen.generate(vendors=options['vendors'], emergency=0, seed=options['seed'])
+            vendors = list(Vendor.objects.values_list('id', 'vendor_type', 'latitude', 'longitude'))
+            connections.close_all()
+            with loadtest.UvicornServer(application) as server:
+                result = asyncio.run(self._run(server.url, vendors, options))
+
+        self._report(result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(result, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    async def _run(self, url, vendors, options):
+        rng = random.Random(options['seed'])
+        subscribers = []
+        for _ in range(options['subscribers']):
+            _, _, lat, lng = rng.choice(vendors)
+            half = rng.uniform(0.5, 3.0)
+            # Rounded as sent, so the expected matches agree with the server's
+            bbox = tuple(round(value, 5) for value in (lat - half, lng - half, lat + half, lng + half))
+            if rng.random() < 0.2:
+                bbox = None
+            subscribers.append((rng.choice(KINDS), bbox))
+
+        self.stdout.write(f'Opening {len(subscribers)} streams...')
+        rss_before = _rss_mb()
+        streams = []
+        for start in range(0, len(subscribers), 200):
+            streams += await asyncio.gather(*(self._open(url, *sub) for sub in subscribers[start:start + 200]))
+        rss_per_stream = (_rss_mb() - rss_before) * 1024 / len(streams)
+
+        received, resets = [], []
+        readers = [
+            asyncio.create_task(self._read(reader, index, received, resets)) for index, (reader, _) in enumerate(streams)
+        ]
+
+        self.stdout.write(f'Idle for {options["idle"]:.0f} s...')
+        cpu = time.process_time()
+        await asyncio.sleep(options['idle'])
+        idle_cpu = (time.process_time() - cpu) / options['idle']
+
+        self.stdout.write(f'Publishing {options["events"]} saves at {options["rate"]:.0f}/s...')
+        sent = await asyncio.to_thread(self._publish, vendors, options, rng)
+        expected = {
+            value: [
+                index for index, (kinds, bbox) in enumerate(subscribers)
+                if (kinds is None or kind in kinds)
+                and (bbox is None or (bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]))
+            ]
+            for value, (_, kind, lat, lng) in sent.items()
+        }
+        total = sum(len(indexes) for indexes in expected.values())
+        deadline = time.monotonic() + 10
+        while len(received) < total and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        delivered = {(value, index) for _, index, value in received}
+        wanted = {(value, index) for value, indexes in expected.items() for index in indexes}
+        latencies = sorted((at - sent[value][0]) * 1000 for at, _, value in received if value in sent)
+
+        for reader in readers:
+            reader.cancel()
+        for _, writer in streams:
+            writer.close()
+        deadline = time.monotonic() + 10
+        while len(availability.feed) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return {
+            'subscribers': len(streams),
+            'events': len(sent),
+            'deliveries': len(received),
+            'expected': total,
+            'missed': len(wanted - delivered),
+            'unexpected': len(delivered - wanted),
+            'resets': len(resets),
+            'p50_ms': loadtest.percentile(latencies, 0.50),
+            'p95_ms': loadtest.percentile(latencies, 0.95),
+            'p99_ms': loadtest.percentile(latencies, 0.99),
+            'max_ms': latencies[-1] if latencies else None,
+            'idle_cpu': round(idle_cpu, 4),
+            'rss_kb_per_stream': round(rss_per_stream, 1),
+            'left_subscribed': len(availability.feed),
+        }
+
+    async def _open(self, url, kinds, bbox):
+        parts = urlsplit(url)
+        params = {}
+        if kinds:
+            params['type'] = ','.join(sorted(kinds))
+        if bbox:
+            params['bbox'] = ','.join(map(str, bbox))
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+        # HTTP/1.0, so the stream comes back unchunked
+        writer.write((
+            f'GET {reverse("vendor-changes")}?{urlencode(params)} HTTP/1.0\r\n'
+            f'Host: {parts.netloc}\r\nAccept: text/event-stream\r\n\r\n'
+        ).encode())
+        headers = await reader.readuntil(b'\r\n\r\n')
+        if b' 200 ' not in headers.split(b'\r\n', 1)[0]:
+            raise CommandError(f'Subscribing failed: {headers.decode(errors="replace")}')
+        await reader.readuntil(b'\n\n')
+        return reader, writer
+
+    async def _read(self, reader, index, received, resets):
+        while True:
+            event = await reader.readuntil(b'\n\n')
+            if event.startswith(b'event: reset'):
+                # The stream fell behind and its backlog was dropped
+                resets.append(index)
+                continue
+            for line in event.split(b'\n'):
+                if line.startswith(b'data: '):
+                    received.append((time.perf_counter(), index, json.loads(line[6:]).get('rooms_available')))
+
+    def _publish(self, vendors, options, rng):
+        """Save random vendors with a unique rooms_available each, returning when each was sent"""
+        sent = {}
+        start = time.perf_counter()
+        try:
+            for number in range(options['events']):
+                delay = start + number / options['rate'] - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                row = rng.choice(vendors)
+                vendor = Vendor.objects.get(pk=row[0])
+                vendor.rooms_available = 100000 + number
+                sent[vendor.rooms_available] = (time.perf_counter(), *row[1:])
+                vendor.save(update_fields=['rooms_available'])
+        finally:
+            connections.close_all()
+        return sent
+
+    def _report(self, result):
+        self.stdout.write(
+            f'{result["subscribers"]} streams, {result["events"]} events: {result["deliveries"]} deliveries '
+            f'of {result["expected"]} expected, {result["missed"]} missed, {result["unexpected"]} unexpected, '
+            f'{result["resets"]} resets'
+        )
+        self.stdout.write(
+            f'Save to client latency ms: p50 {result["p50_ms"]:.1f}, p95 {result["p95_ms"]:.1f}, '
+            f'p99 {result["p99_ms"]:.1f}, max {result["max_ms"]:.1f}'
+        )
+        self.stdout.write(
+            f'Idle CPU with every stream open: {result["idle_cpu"] * 100:.2f}% of a core; '
+            f'memory per stream (server and client): {result["rss_kb_per_stream"]} KB; '
+            f'streams still subscribed after the clients left: {result["left_subscribed"]}'
+        )
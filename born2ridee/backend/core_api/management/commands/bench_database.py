@@ -0,0 +1,87 @@
+"""
+Management command benchmarking concurrent reads and writes per database profile
+"""
+import json
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+from core_api import datagen, loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Serves the app in-process on a scratch copy of the configured database and drives '
+        'a mixed read/write load at it, once with the profile from settings and once with '
+        'its untuned baseline (SQLite: rollback journal and no pragmas; server: a new '
+        'connection per request). Run under DB_PROFILE=sqlite and DB_PROFILE=server to '
+        'compare the two profiles.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mix', default='read-write', help='A loadtest mix or route=weight,...')
+        parser.add_argument('--concurrency', type=int, default=16, help='Client threads')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--vendors', type=int, default=2000, help='Scratch dataset size')
+        parser.add_argument('--trips', type=int, default=20000)
+        parser.add_argument('--bookings', type=int, default=2000)
+        parser.add_argument('--tuned-only', action='store_true', help='Skip the untuned baseline')
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            weights = loadtest.parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        connection = connections['default']
+        profile = 'sqlite' if connection.vendor == 'sqlite' else 'server'
+        variants = [(profile, False)] + ([] if options['tuned_only'] else [(f'{profile} untuned', True)])
+        groups = {
+            'reads': {name for name in weights if name not in loadtest.WRITE_ROUTES},
+            'writes': {name for name in weights if name in loadtest.WRITE_ROUTES},
+        }
+
+        application = get_wsgi_application()
+        # Contended writes are slow by design here; keep the slow-request log
+        # quiet (after the application, whose setup re-applies LOGGING)
+        logging.getLogger('core_api.metrics').setLevel(logging.ERROR)
+        results = {}
+        for name, untuned in variants:
+            self.stdout.write(f'{name}: seeding and running for {options["duration"]:.0f} s...')
+            with loadtest.scratch_database(connection, untuned):
+                dataset = datagen.generate(
+                    vendors=options['vendors'], emergency=100, trips=options['trips'],
+                    bookings=options['bookings'], seed=options['seed'],
+                )
+                connections.close_all()
+                with loadtest.InProcessServer(application) as server:
+                    result = loadtest.run(
+                        server.url, weights, options['concurrency'], options['duration'], None,
+                        options['seed'], groups=groups,
+                    )
+            result['dataset'] = dataset
+            results[name] = result
+
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'concurrency': options['concurrency'], 'mix': options['mix'], 'runs': results}, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def _report(self, results):
+        self.stdout.write(
+            f'{"profile":<18} {"group":<7} {"reqs":>7} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"p99 ms":>8} {"5xx":>5}'
+        )
+        for name, result in results.items():
+            rows = list(result['groups'].items()) + [('all', result['overall'])]
+            for group, stats in rows:
+                if not stats['requests']:
+                    continue
+                self.stdout.write(
+                    f'{name:<18} {group:<7} {stats["requests"]:>7} {stats["throughput_rps"]:>8} '
+                    f'{stats["p50_ms"]:>8} {stats["p95_ms"]:>8} {stats["p99_ms"]:>8} {stats["errors"]:>5}'
+                )
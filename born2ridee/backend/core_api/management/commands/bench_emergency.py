@@ -0,0 +1,92 @@
+"""
+Management command to benchmark the nearest-emergency-service lookup
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from core_api.models import EmergencyService
+from core_api.spatial import GridIndex, emergency_index, nearest_emergency_services
+from core_api.views import EmergencyServiceViewSet
+
+
+# Bounding box of Tamil Nadu and its borders (lat_lo, lat_hi, lng_lo, lng_hi)
+REGION = (8.0, 13.6, 76.2, 80.4)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks /api/emergency/nearest/ lookups and checks them against a p99 target'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=10000, help='Number of random lookups')
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Benchmark against N synthetic services instead of the database')
+        parser.add_argument('--target-ms', type=float, default=1.0, help='p99 lookup latency target')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if options['synthetic']:
+            emergency_index.use(self._synthetic_index(options['synthetic'], rng))
+        index = emergency_index.get()
+        if not index.size:
+            raise CommandError('No emergency services to query; seed data or pass --synthetic N')
+
+        points = [(rng.uniform(*REGION[:2]), rng.uniform(*REGION[2:])) for _ in range(options['queries'])]
+
+        lookup = self._time(points, lambda lat, lng: nearest_emergency_services(lat, lng))
+        factory = RequestFactory()
+        view = EmergencyServiceViewSet.as_view({'get': 'nearest'})
+        endpoint = self._time(
+            points[:min(len(points), 2000)],
+            lambda lat, lng: view(factory.get('/api/emergency/nearest/', {'lat': lat, 'lng': lng})).render()
+        )
+
+        self.stdout.write(f'Services indexed: {index.size}')
+        self._report('lookup', lookup)
+        self._report('endpoint', endpoint)
+
+        p99 = percentile(lookup, 99)
+        if p99 > options['target_ms']:
+            raise CommandError(f"p99 lookup {p99:.3f} ms exceeds target {options['target_ms']:.3f} ms")
+        self.stdout.write(self.style.SUCCESS(f"p99 lookup within {options['target_ms']:.3f} ms target"))
+
+    def _synthetic_index(self, count, rng):
+        index = GridIndex(emergency_index.cell_deg)
+        index.payloads = {}
+        labels = dict(EmergencyService.SERVICE_TYPES)
+        service_types = list(labels)
+        for pk in range(1, count + 1):
+            lat, lng = rng.uniform(*REGION[:2]), rng.uniform(*REGION[2:])
+            service_type = rng.choice(service_types)
+            index.add(pk, lat, lng, service_type)
+            index.payloads[pk] = {
+                'id': pk, 'service_type_display': labels[service_type], 'name': f'Service {pk}', 'service_type': service_type,
+                'phone': '100', 'address': '', 'latitude': lat, 'longitude': lng, 'is_24x7': True,
+            }
+        return index
+
+    def _time(self, points, fn):
+        timings = []
+        for lat, lng in points:
+            start = time.perf_counter()
+            fn(lat, lng)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return timings
+
+    def _report(self, label, timings):
+        self.stdout.write(
+            f'{label:>9}: n={len(timings)} mean={statistics.fmean(timings):.3f} ms '
+            f'p50={percentile(timings, 50):.3f} ms p95={percentile(timings, 95):.3f} ms '
+            f'p99={percentile(timings, 99):.3f} ms'
+        )
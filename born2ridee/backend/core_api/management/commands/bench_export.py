@@ -0,0 +1,90 @@
+"""
+Management command measuring trip export speed, memory and stops_visited cost
+"""
+import json
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from core_api import exports
+from core_api.management.benchmarks import rolled_back
+from core_api.models import Trip
+from core_api.serializers import TripSerializer
+from core_api.views import TRIP_EXPORT_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Compares streaming trip export against TripSerializer and isolates stops_visited cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=50000, help='Synthetic trips to export')
+        parser.add_argument('--stops', type=int, default=4, help='Stops per trip')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        with rolled_back():
+            self._seed(options['trips'], options['stops'], random.Random(options['seed']))
+            self._run(options['trips'])
+
+    def _seed(self, count, stops, rng):
+        trips = [
+            Trip(
+                origin='Chennai', destination='Madurai', distance_km=460, vehicle_type=rng.choice(['bike', 'car']),
+                fuel_cost=1000, fuel_liters=10,
+                stops_visited=[
+                    {'id': rng.randrange(1, 10000), 'name': f'Stop {n}', 'type': 'food',
+                     'addedAt': '2026-01-01T10:00:00Z'}
+                    for n in range(stops)
+                ],
+            )
+            for _ in range(count)
+        ]
+        Trip.objects.bulk_create(trips, batch_size=2000)
+
+    def _run(self, count):
+        without_stops = {k: v for k, v in TRIP_EXPORT_FIELDS.items() if k != 'stops_visited'}
+        queryset = Trip.objects.order_by('id')
+
+        def serializer():
+            return [json.dumps(TripSerializer(queryset, many=True).data)]
+
+        def decoded_stops():
+            # What the export would cost if stops_visited were parsed and re-encoded
+            rows = queryset.values_list(*TRIP_EXPORT_FIELDS.values()).iterator(chunk_size=exports.EXPORT_CHUNK_SIZE)
+            return exports.iter_ndjson(rows, list(TRIP_EXPORT_FIELDS))
+
+        def raw_stops():
+            return exports.export_rows(queryset, TRIP_EXPORT_FIELDS, 'ndjson', json_columns={'stops_visited'})
+
+        def no_stops():
+            return exports.export_rows(queryset, without_stops, 'ndjson')
+
+        def csv_raw():
+            return exports.export_rows(queryset, TRIP_EXPORT_FIELDS, 'csv', json_columns={'stops_visited'})
+
+        self.stdout.write(f'{count} trips')
+        for label, build in [
+            ('TripSerializer list', serializer),
+            ('NDJSON, stops decoded', decoded_stops),
+            ('NDJSON, stops raw', raw_stops),
+            ('NDJSON, no stops', no_stops),
+            ('CSV, stops raw', csv_raw),
+        ]:
+            elapsed, size = self._consume(build)
+            # Memory is measured in a second pass; tracing slows everything down
+            tracemalloc.start()
+            self._consume(build)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self.stdout.write(
+                f'{label:<24} {elapsed:>7.2f} s {count / elapsed:>9.0f} rows/s '
+                f'{size / 1e6:>8.1f} MB out, peak {peak / 1e6:>7.1f} MB'
+            )
+
+    def _consume(self, build):
+        start = time.perf_counter()
+        result = build()
+        chunks = getattr(result, 'streaming_content', result)
+        size = sum(len(chunk) for chunk in chunks)
+        return time.perf_counter() - start, size
@@ -0,0 +1,68 @@
+"""
+Management command comparing batch and per-request fuel cost calculation
+"""
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from core_api.views import (
+    CalculateFuelBatchView, CalculateFuelView, calculate_fuel_cost, calculate_fuel_costs
+)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks /api/calculate-fuel/batch/ against one /api/calculate-fuel/ request per item'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100000, help='Items in the batch')
+        parser.add_argument('--requests', type=int, default=2000, help='Single-item requests to time')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['items']
+        distances = [round(rng.uniform(1, 1500), rng.choice([0, 1, 2, 3])) for _ in range(count)]
+        vehicles = [rng.choice(['bike', 'car']) for _ in range(count)]
+        prices = [round(rng.uniform(90, 115), 2) for _ in range(count)]
+
+        start = time.perf_counter()
+        batch = calculate_fuel_costs(distances, vehicles, prices)
+        batch_fn = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scalar = [calculate_fuel_cost(d, v, p) for d, v, p in zip(distances, vehicles, prices)]
+        scalar_fn = time.perf_counter() - start
+
+        for i, expected in enumerate(scalar):
+            for key, value in expected.items():
+                if batch[key][i] != value:
+                    raise CommandError(f'Mismatch at {i} for {key}: {batch[key][i]!r} != {value!r}')
+
+        factory = RequestFactory()
+        single_view = CalculateFuelView.as_view()
+        batch_view = CalculateFuelBatchView.as_view()
+
+        requests = min(options['requests'], count)
+        start = time.perf_counter()
+        for d, v, p in zip(distances[:requests], vehicles[:requests], prices[:requests]):
+            body = json.dumps({'distance_km': d, 'vehicle_type': v, 'fuel_price': p})
+            single_view(factory.post('/api/calculate-fuel/', body, content_type='application/json')).render()
+        single_http = time.perf_counter() - start
+
+        body = json.dumps({'distance_km': distances, 'vehicle_type': vehicles, 'fuel_price': prices})
+        start = time.perf_counter()
+        response = batch_view(factory.post('/api/calculate-fuel/batch/', body, content_type='application/json'))
+        response.render()
+        batch_http = time.perf_counter() - start
+        if response.status_code != 200:
+            raise CommandError(f'Batch request failed: {response.data}')
+
+        self.stdout.write(f'All {count} batch results match calculate_fuel_cost exactly')
+        self.stdout.write(f'{"calculate_fuel_cost loop":<28}{scalar_fn / count * 1e6:>10.3f} us/item')
+        self.stdout.write(f'{"calculate_fuel_costs":<28}{batch_fn / count * 1e6:>10.3f} us/item')
+        self.stdout.write(f'{"POST /calculate-fuel/":<28}{single_http / requests * 1e6:>10.3f} us/item ({requests} requests)')
+        self.stdout.write(f'{"POST /calculate-fuel/batch/":<28}{batch_http / count * 1e6:>10.3f} us/item (1 request)')
+        self.stdout.write(f'Batch endpoint speedup per item: {(single_http / requests) / (batch_http / count):.0f}x')
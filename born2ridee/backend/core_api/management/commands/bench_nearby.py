@@ -0,0 +1,76 @@
+"""
+Management command to benchmark the nearest-vendor lookup at scale
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core_api import datagen
+from core_api.spatial import GridIndex, vendor_index
+
+
+# Bounding box of Tamil Nadu and its borders (lat_lo, lat_hi, lng_lo, lng_hi)
+REGION = (8.0, 13.6, 76.2, 80.4)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds an in-memory vendor index over --vendors synthetic vendors, clustered in towns '
+        'and along highways as the data generator places them, then times /api/vendors/nearby/ '
+        'lookups from riders on the road and from anywhere in the region against a p99 target'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=1000000, help='Synthetic vendors to index')
+        parser.add_argument('--queries', type=int, default=5000, help='Lookups per rider placement')
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--radius-km', type=float, default=25.0)
+        parser.add_argument('--cell-deg', type=float, help='Cell size; by default sized like the vendor index')
+        parser.add_argument('--target-ms', type=float, default=10.0, help='p99 lookup latency target')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        generator = datagen.Generator(seed=options['seed'])
+        cell_deg = options['cell_deg'] or vendor_index.cell_deg_for(options['vendors'])
+        index = GridIndex(cell_deg)
+        start = time.perf_counter()
+        for pk, vendor in enumerate(generator.vendors(options['vendors']), 1):
+            index.add(pk, vendor.latitude, vendor.longitude, vendor.vendor_type)
+        self.stdout.write(
+            f'Indexed {index.size} vendors in {len(index.cells)} cells of {cell_deg:.4f} deg '
+            f'in {time.perf_counter() - start:.1f} s'
+        )
+
+        rng = random.Random(options['seed'])
+        placements = {
+            'on road': [(v.latitude, v.longitude) for v in generator.vendors(options['queries'])],
+            'anywhere': [
+                (rng.uniform(*REGION[:2]), rng.uniform(*REGION[2:])) for _ in range(options['queries'])
+            ],
+        }
+        worst = 0.0
+        for label, points in placements.items():
+            timings = []
+            for lat, lng in points:
+                begin = time.perf_counter()
+                index.nearest(lat, lng, k=options['k'], radius_km=options['radius_km'])
+                timings.append((time.perf_counter() - begin) * 1000)
+            timings.sort()
+            worst = max(worst, percentile(timings, 99))
+            self.stdout.write(
+                f'{label:>9}: n={len(timings)} mean={statistics.fmean(timings):.3f} ms '
+                f'p50={percentile(timings, 50):.3f} ms p95={percentile(timings, 95):.3f} ms '
+                f'p99={percentile(timings, 99):.3f} ms max={timings[-1]:.3f} ms'
+            )
+
+        if worst > options['target_ms']:
+            raise CommandError(f"p99 lookup {worst:.3f} ms exceeds target {options['target_ms']:.3f} ms")
+        self.stdout.write(self.style.SUCCESS(f"p99 lookup within {options['target_ms']:.3f} ms target"))
@@ -0,0 +1,129 @@
+"""
+Management command timing ?sort=best vendor ranking on a large dataset
+"""
+import json
+import logging
+import random
+import time
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from core_api import datagen, loadtest, ranking
+from core_api.models import Vendor
+from core_api.spatial import haversine_km, vendor_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills a scratch database with --vendors vendors, then for riders at random points near '
+        'the seeded places times /api/vendors/?sort=best served in-process at each --radius and '
+        '--candidates cap, with the candidate lookup, the scoring query, batch scoring with a heap '
+        'and the same scoring followed by a full sort timed separately. Also reports how far away '
+        'the top results are compared with the plain by-rating list.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=1000000, help='Scratch dataset size')
+        parser.add_argument('--requests', type=int, default=50, help='Timed requests per setting')
+        parser.add_argument('--radius', type=float, nargs='+', default=[10, 25, 50], help='radius_km values')
+        parser.add_argument('--candidates', type=int, nargs='+', default=[2000, 10000], help='Candidate caps')
+        parser.add_argument('--k', type=int, default=20, help='Results per request')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        # After the application: its setup re-applies LOGGING
+        logging.getLogger('core_api.metrics').setLevel(logging.ERROR)
+        rng = random.Random(options['seed'])
+        points = [
+            (lat + rng.uniform(-0.2, 0.2), lng + rng.uniform(-0.2, 0.2))
+            for lat, lng in (rng.choice(loadtest.PLACES) for _ in range(options['requests']))
+        ]
+        results = []
+        with loadtest.scratch_database(connections['default']):
+            datagen.generate(vendors=options['vendors'], seed=options['seed'], log=self.stdout.write)
+            start = time.perf_counter()
+            vendor_index.get()
+            self.stdout.write(f'Spatial index built in {time.perf_counter() - start:.1f} s')
+            by_rating = self._by_rating_distance(points[:10], options['k'])
+
+            with loadtest.InProcessServer(application) as server:
+                for radius_km in options['radius']:
+                    for limit in options['candidates']:
+                        with override_settings(VENDOR_RANKING_CANDIDATES=limit):
+                            results.append(self._measure(server.url, points, radius_km, limit, options['k']))
+
+        self._report(results, by_rating)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'vendors': options['vendors'], 'by_rating_km': by_rating, 'runs': results}, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def _by_rating_distance(self, points, k):
+        """Median distance of the first page of the by-rating list from each rider"""
+        top = list(Vendor.objects.values_list('latitude', 'longitude')[:k])
+        distances = sorted(
+            haversine_km(lat, lng, vlat, vlng) for lat, lng in points for vlat, vlng in top
+        )
+        return round(loadtest.percentile(distances, 0.5), 1)
+
+    def _measure(self, base_url, points, radius_km, limit, k):
+        timings, stages, in_range, scored, distances = [], [], [], [], []
+        weights = ranking.parse_weights()
+        index = vendor_index.get()
+        queryset = Vendor.objects.all()
+        for lat, lng in points:
+            query = urlencode({'sort': 'best', 'lat': lat, 'lng': lng, 'radius_km': radius_km, 'k': k})
+            start = time.perf_counter()
+            with urlopen(f'{base_url}{reverse("vendor-list")}?{query}') as response:
+                body = json.loads(response.read())
+            timings.append((time.perf_counter() - start) * 1000)
+            distances += [item['distance_km'] for item in body['results']]
+
+            marks = [time.perf_counter()]
+            found = ranking.candidates(index, lat, lng, radius_km)
+            marks.append(time.perf_counter())
+            rows = list(ranking.candidate_rows(queryset, found))
+            marks.append(time.perf_counter())
+            ranking.top(found, rows, radius_km, k, weights)
+            marks.append(time.perf_counter())
+            ranking.top(found, rows, radius_km, len(rows), weights)[:k]
+            marks.append(time.perf_counter())
+            stages.append([(b - a) * 1000 for a, b in zip(marks, marks[1:])])
+            in_range.append(len(index.within(lat, lng, radius_km)))
+            scored.append(len(rows))
+
+        timings.sort()
+        distances.sort()
+        median = [round(loadtest.percentile(sorted(column), 0.5), 2) for column in zip(*stages)]
+        return {
+            'radius_km': radius_km, 'candidates': limit,
+            'in_range': round(sum(in_range) / len(in_range)), 'scored': round(sum(scored) / len(scored)),
+            'p50_ms': round(loadtest.percentile(timings, 0.50), 2),
+            'p95_ms': round(loadtest.percentile(timings, 0.95), 2),
+            'lookup_ms': median[0], 'rows_ms': median[1], 'heap_ms': median[2], 'sort_ms': median[3],
+            'result_km': round(loadtest.percentile(distances, 0.5), 2) if distances else None,
+        }
+
+    def _report(self, results, by_rating):
+        self.stdout.write(
+            f'{"radius":>6} {"cap":>6} {"in range":>9} {"scored":>7} {"p50 ms":>8} {"p95 ms":>8} '
+            f'{"lookup":>7} {"rows":>7} {"heap":>7} {"sort":>7} {"km":>6}'
+        )
+        for r in results:
+            self.stdout.write(
+                f'{r["radius_km"]:>6} {r["candidates"]:>6} {r["in_range"]:>9} {r["scored"]:>7} '
+                f'{r["p50_ms"]:>8} {r["p95_ms"]:>8} {r["lookup_ms"]:>7} {r["rows_ms"]:>7} '
+                f'{r["heap_ms"]:>7} {r["sort_ms"]:>7} {r["result_km"]:>6}'
+            )
+        self.stdout.write(
+            'Stage columns are medians in ms; km is the median distance of the returned vendors. '
+            f'The first page of the by-rating list is a median {by_rating} km from the same riders.'
+        )
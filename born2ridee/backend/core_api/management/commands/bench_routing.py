@@ -0,0 +1,51 @@
+"""
+Management command to benchmark road routing over random city pairs
+"""
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core_api.routing import get_graph
+
+
+class Command(BaseCommand):
+    help = 'Times bidirectional A* against Dijkstra on random node pairs of the road graph'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', type=int, default=2000, help='Random origin/destination pairs')
+        parser.add_argument('--metric', choices=['distance', 'time'], default='distance')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        graph = get_graph()
+        load_ms = (time.perf_counter() - start) * 1000
+
+        rng = random.Random(options['seed'])
+        metric = options['metric']
+        pairs = [(rng.randrange(len(graph)), rng.randrange(len(graph))) for _ in range(options['pairs'])]
+
+        astar, dijkstra = [], []
+        for source, target in pairs:
+            start = time.perf_counter()
+            found = graph.shortest_path(source, target, metric)
+            astar.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            reference = graph.dijkstra(source, target, metric)
+            dijkstra.append((time.perf_counter() - start) * 1000)
+
+            cost = found[0] if found else None
+            if (cost is None) != (reference is None) or (cost is not None and abs(cost - reference) > 1e-6):
+                raise CommandError(f'{graph.names[source]} -> {graph.names[target]}: A* {cost} != Dijkstra {reference}')
+
+        self.stdout.write(f'Graph: {len(graph)} nodes, loaded in {load_ms:.1f} ms')
+        self.stdout.write(f'All {len(pairs)} bidirectional A* costs match Dijkstra ({metric})')
+        for label, timings in [('bidirectional A*', astar), ('Dijkstra', dijkstra)]:
+            timings.sort()
+            self.stdout.write(
+                f'{label:<17} mean {statistics.fmean(timings):.3f} ms, '
+                f'p50 {timings[len(timings) // 2]:.3f} ms, p99 {timings[int(len(timings) * 0.99) - 1]:.3f} ms'
+            )
@@ -0,0 +1,122 @@
+"""
+Management command timing full-text vendor search on a large dataset
+"""
+import json
+import logging
+import time
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.urls import reverse
+
+from core_api import datagen, loadtest
+from core_api.models import Vendor
+from core_api.search import FTS_TABLE, contains_all, match_expression, parse_terms, top_matches
+from core_api.views import filter_vendors
+
+
+# (q, list filters)
+QUERIES = [
+    ('filter coffee', {}),
+    ('puncture', {}),
+    ('trichy', {}),
+    ('punc', {}),
+    ('madurai lodge', {}),
+    ('trichy lodge', {'type': 'hotel', 'is_open': 'true'}),
+    ('biryani', {'type': 'food', 'is_open': 'true'}),
+    ('chennai wifi', {'type': 'hotel', 'source': 'goibibo'}),
+    ('kodaikanal towing', {}),
+    ('zanzibar', {}),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Fills a scratch database with --vendors vendors (the search index is kept up by its '
+        'triggers as they are inserted), then times /api/vendors/search/ served in-process for a '
+        'set of queries, each uncached and then from the response cache, next to the substring scan the admin search runs for the same words.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendors', type=int, default=1000000, help='Scratch dataset size')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per query')
+        parser.add_argument('--scan-repeat', type=int, default=3, help='Timed substring scans per query')
+        parser.add_argument('--k', type=int, default=20, help='Results per search')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write results to this JSON file')
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        # After the application: its setup re-applies LOGGING
+        logging.getLogger('core_api.metrics').setLevel(logging.ERROR)
+        with loadtest.scratch_database(connections['default']) as connection:
+            start = time.perf_counter()
+            datagen.generate(vendors=options['vendors'], seed=options['seed'], log=self.stdout.write)
+            build_seconds = time.perf_counter() - start
+            self.stdout.write(f'{options["vendors"]} vendors written and indexed in {build_seconds:.1f} s')
+
+            results = []
+            with loadtest.InProcessServer(application) as server:
+                for q, filters in QUERIES:
+                    results.append(self._measure(connection, server.url, q, filters, options))
+
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump({'vendors': options['vendors'], 'build_seconds': build_seconds, 'queries': results}, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def _measure(self, connection, base_url, q, filters, options):
+        terms = parse_terms(q)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match_expression(terms)])
+            matches = cursor.fetchone()[0]
+
+        url = f'{base_url}{reverse("vendor-search")}?{urlencode({"q": q, "k": options["k"], **filters})}'
+        urlopen(url).read()
+        timings = []
+        for _ in range(options['repeat']):
+            cache.clear()
+            start = time.perf_counter()
+            with urlopen(url) as response:
+                returned = json.loads(response.read())['count']
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        cached = self._time(lambda: urlopen(url).read(), options['repeat'])
+
+        vendors = filter_vendors(Vendor.objects.all(), filters)
+        queries = self._time(lambda: top_matches(vendors, terms, options['k']), options['repeat'])
+        scan = contains_all(vendors, terms).order_by('-rating')[:options['k']]
+        scans = self._time(lambda: list(scan.all()), options['scan_repeat'])
+        return {
+            'q': q, 'filters': filters, 'matches': matches, 'returned': returned,
+            'p50_ms': round(loadtest.percentile(timings, 0.50), 2),
+            'p95_ms': round(loadtest.percentile(timings, 0.95), 2),
+            'max_ms': round(timings[-1], 2),
+            'cached_p50_ms': round(loadtest.percentile(cached, 0.50), 2),
+            'sql_p50_ms': round(loadtest.percentile(queries, 0.50), 2),
+            'scan_p50_ms': round(loadtest.percentile(scans, 0.50), 2),
+        }
+
+    def _time(self, query, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - start) * 1000)
+        return sorted(timings)
+
+    def _report(self, results):
+        self.stdout.write(
+            f'{"query":<42} {"matches":>8} {"ret":>4} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8} {"cached":>7} {"SQL ms":>8} {"LIKE ms":>9}'
+        )
+        for result in results:
+            label = ' '.join([result['q'], *(f'{key}={value}' for key, value in result['filters'].items())])
+            self.stdout.write(
+                f'{label:<42} {result["matches"]:>8} {result["returned"]:>4} {result["p50_ms"]:>8} '
+                f'{result["p95_ms"]:>8} {result["max_ms"]:>8} {result["cached_p50_ms"]:>7} {result["sql_p50_ms"]:>8} {result["scan_p50_ms"]:>9}'
+            )
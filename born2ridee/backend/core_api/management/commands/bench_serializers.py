@@ -0,0 +1,97 @@
+"""
+Management command comparing list serialization through DRF serializers
+with the .values() fast path, and checking both produce the same bytes
+"""
+import random
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core_api.fastpath import ValuesPlan
+from core_api.management.benchmarks import rolled_back
+from core_api.models import EmergencyService, Trip, Vendor
+from core_api.renderers import FastJSONRenderer, orjson
+from core_api.serializers import EmergencyServiceSerializer, TripSerializer, VendorSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks VendorSerializer/EmergencyServiceSerializer/TripSerializer against the fast list path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000], help='Row counts to test')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write('orjson is not installed; the fast path uses the standard JSON encoder')
+        for count in options['rows']:
+            with rolled_back():
+                self._seed(count, random.Random(options['seed']))
+                self._run(count)
+
+    def _seed(self, count, rng):
+        vendor_types = [key for key, _ in Vendor.VENDOR_TYPES]
+        sources = [key for key, _ in Vendor.SOURCE_CHOICES]
+        Vendor.objects.bulk_create([
+            Vendor(
+                name=f'Sri Murugan Mess {n}', vendor_type=rng.choice(vendor_types), description='Idli, dosa — 24 hrs',
+                address=f'{n} NH 44, Krishnagiri', latitude=rng.uniform(8, 14), longitude=rng.uniform(76, 81),
+                rating=round(rng.uniform(3, 5), 1), phone='9876543210', is_open=rng.random() < 0.8,
+                rooms_available=rng.randrange(20), room_capacity=20, source=rng.choice(sources),
+                base_price=Decimal(rng.randrange(50000, 500000)) / 100,
+            )
+            for n in range(count)
+        ], batch_size=2000)
+        service_types = [key for key, _ in EmergencyService.SERVICE_TYPES]
+        EmergencyService.objects.bulk_create([
+            EmergencyService(
+                name=f'Service {n}', service_type=rng.choice(service_types), phone='108',
+                address=f'{n} Main Road', latitude=rng.uniform(8, 14), longitude=rng.uniform(76, 81),
+                is_24x7=rng.random() < 0.5,
+            )
+            for n in range(count)
+        ], batch_size=2000)
+        Trip.objects.bulk_create([
+            Trip(
+                origin='Chennai', destination='Madurai', origin_lat=13.0827, origin_lng=80.2707,
+                dest_lat=9.9252, dest_lng=78.1198, distance_km=round(rng.uniform(50, 700), 1),
+                vehicle_type=rng.choice(['bike', 'car']), fuel_cost=round(rng.uniform(100, 5000), 2),
+                fuel_liters=round(rng.uniform(1, 50), 2),
+                stops_visited=[{'id': rng.randrange(10000), 'name': 'Tea stall', 'lat': 11.2}],
+            )
+            for _ in range(count)
+        ], batch_size=2000)
+
+    def _run(self, count):
+        self.stdout.write(f'{count} rows')
+        for label, model, serializer_class in [
+            ('vendors', Vendor, VendorSerializer),
+            ('emergency', EmergencyService, EmergencyServiceSerializer),
+            ('trips', Trip, TripSerializer),
+        ]:
+            queryset = model.objects.order_by('-id')[:count]
+
+            def full():
+                return JSONRenderer().render(serializer_class(queryset, many=True).data)
+
+            def fast():
+                plan = ValuesPlan.for_serializer(serializer_class())
+                rows, safe = plan.rows(list(queryset.values(*plan.columns)))
+                return FastJSONRenderer().render(rows, renderer_context={'response': SimpleNamespace(json_safe=safe)})
+
+            full_time, full_body = self._time(full)
+            fast_time, fast_body = self._time(fast)
+            if full_body != fast_body:
+                raise CommandError(f'{label}: fast path output differs from the serializer')
+            self.stdout.write(
+                f'  {label:<10} serializer {full_time:>6.2f} s   fast path {fast_time:>6.2f} s   '
+                f'{full_time / fast_time:>5.1f}x   {len(full_body) / 1e6:>6.1f} MB, identical'
+            )
+
+    def _time(self, build):
+        start = time.perf_counter()
+        body = build()
+        return time.perf_counter() - start, body
@@ -0,0 +1,79 @@
+"""
+Management command comparing bulk trip ingestion with one-by-one creates
+"""
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from core_api.management.benchmarks import rolled_back
+from core_api.views import TripViewSet
+
+
+CITIES = [
+    ('Chennai', 13.0827, 80.2707), ('Bangalore', 12.9716, 77.5946),
+    ('Pondicherry', 11.9416, 79.8083), ('Madurai', 9.9252, 78.1198),
+    ('Coimbatore', 11.0168, 76.9558), ('Trichy', 10.7905, 78.7047),
+    ('Kanyakumari', 8.0883, 77.5385), ('Salem', 11.6643, 78.1460),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks /api/trips/bulk/ (JSON and NDJSON) against single POST /api/trips/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trips', type=int, default=5000, help='Trips per run')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        trips = [self._trip(rng) for _ in range(options['trips'])]
+        factory = RequestFactory()
+        create = TripViewSet.as_view({'post': 'create'})
+        bulk = TripViewSet.as_view({'post': 'bulk'}, **TripViewSet.bulk.kwargs)
+
+        def check(response, created):
+            if response.status_code != 201 or (created and response.data['created'] != created):
+                raise CommandError(f'Unexpected response {response.status_code}: {response.data}')
+
+        def single():
+            for trip in trips:
+                check(create(factory.post('/api/trips/', json.dumps(trip), content_type='application/json')), 0)
+
+        def bulk_json():
+            body = json.dumps(trips)
+            check(bulk(factory.post('/api/trips/bulk/', body, content_type='application/json')), len(trips))
+
+        def bulk_ndjson():
+            body = '\n'.join(json.dumps(trip) for trip in trips)
+            check(bulk(factory.post('/api/trips/bulk/', body, content_type='application/x-ndjson')), len(trips))
+
+        count = len(trips)
+        baseline = None
+        for label, run in [('single POST', single), ('bulk JSON', bulk_json), ('bulk NDJSON', bulk_ndjson)]:
+            elapsed = self._timed_rollback(run)
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f'{label:<12} {count} trips in {elapsed:.2f} s: {count / elapsed:>9.0f} trips/s, '
+                f'{elapsed / count * 1e6:>7.1f} us/trip, {baseline / elapsed:>5.1f}x'
+            )
+
+    def _timed_rollback(self, run):
+        """Time ``run`` inside a transaction that is rolled back afterwards"""
+        start = time.perf_counter()
+        with rolled_back():
+            run()
+            elapsed = time.perf_counter() - start
+        return elapsed
+
+    def _trip(self, rng):
+        (origin, olat, olng), (dest, dlat, dlng) = rng.sample(CITIES, 2)
+        return {
+            'origin': origin, 'destination': dest,
+            'origin_lat': olat, 'origin_lng': olng, 'dest_lat': dlat, 'dest_lng': dlng,
+            'distance_km': round(rng.uniform(50, 700), 1),
+            'vehicle_type': rng.choice(['bike', 'car']),
+            'stops_visited': [],
+        }
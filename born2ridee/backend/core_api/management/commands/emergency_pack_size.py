@@ -0,0 +1,59 @@
+"""
+Management command comparing offline pack size with the JSON API payload
+"""
+import gzip
+import json
+import random
+
+from django.core.management.base import BaseCommand
+
+from core_api.models import EmergencyService
+from core_api.packs import decode_pack, encode_pack
+from core_api.serializers import EmergencyServiceSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compares the emergency services pack against EmergencyServiceSerializer JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic', type=int, default=0,
+                            help='Compare N synthetic (unsaved) services instead of the database rows')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['synthetic']:
+            services = self._synthetic(options['synthetic'], random.Random(options['seed']))
+        else:
+            services = list(EmergencyService.objects.all())
+
+        as_json = json.dumps(EmergencyServiceSerializer(services, many=True).data).encode('utf-8')
+        pack = encode_pack(services)
+        assert len(decode_pack(pack)) == len(services)
+
+        rows = [
+            ('JSON (EmergencyServiceSerializer)', len(as_json)),
+            ('JSON, gzip', len(gzip.compress(as_json))),
+            ('pack v1', len(pack)),
+            ('pack v1, gzip', len(gzip.compress(pack))),
+        ]
+        self.stdout.write(f'Services: {len(services)}')
+        for label, size in rows:
+            ratio = size / len(as_json) * 100 if as_json else 0
+            self.stdout.write(f'{label:<36}{size:>12,} bytes {ratio:>7.1f}%')
+
+    def _synthetic(self, count, rng):
+        service_types = [key for key, _ in EmergencyService.SERVICE_TYPES]
+        towns = ['Chennai', 'Vellore', 'Salem', 'Trichy', 'Madurai', 'Tirunelveli', 'Coimbatore']
+        return [
+            EmergencyService(
+                id=pk,
+                name=f'{rng.choice(towns)} {rng.choice(service_types).title()} {pk}',
+                service_type=rng.choice(service_types),
+                phone=f'+91 {rng.randrange(10**9, 10**10)}',
+                address=f'NH-{rng.choice([44, 32, 38, 544])}, Km {rng.randrange(1, 700)}',
+                latitude=round(rng.uniform(8.0, 13.6), 6),
+                longitude=round(rng.uniform(76.2, 80.4), 6),
+                is_24x7=rng.random() < 0.8,
+            )
+            for pk in range(1, count + 1)
+        ]
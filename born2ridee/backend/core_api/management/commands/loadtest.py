@@ -0,0 +1,128 @@
+"""
+Management command driving weighted concurrent HTTP load at the API
+"""
+import json
+import subprocess
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.utils import timezone
+
+from core_api import datagen, loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a weighted request mix against every API route and reports throughput and '
+        'p50/p95/p99 latency. Without --url, starts the app in-process on a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Base URL of a running server (e.g. http://127.0.0.1:8000)')
+        parser.add_argument(
+            '--mix', default='all',
+            help=f'{", ".join(loadtest.MIXES)}, or route=weight,route=weight'
+        )
+        parser.add_argument('--concurrency', type=int, default=8, help='Client threads')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (0 for no limit)')
+        parser.add_argument('--requests', type=int, help='Stop after this many requests')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--vendors', type=int, default=2000, help='Scratch dataset size')
+        parser.add_argument('--emergency', type=int, default=500)
+        parser.add_argument('--trips', type=int, default=5000)
+        parser.add_argument('--bookings', type=int, default=1000)
+        parser.add_argument('--output', help='Write results to this JSON file')
+        parser.add_argument('--compare', help='Print changes against an earlier results file')
+        parser.add_argument('--list-routes', action='store_true', help='List routes and mixes, then exit')
+
+    def handle(self, *args, **options):
+        if options['list_routes']:
+            for name in sorted(loadtest.ROUTES):
+                self.stdout.write(name)
+            for name, weights in loadtest.MIXES.items():
+                self.stdout.write(f'{name}: ' + ', '.join(f'{route}={weight}' for route, weight in weights.items()))
+            return
+        missing = loadtest.uncovered_routes()
+        if missing:
+            self.stderr.write(f'Routes without a request builder: {", ".join(missing)}')
+        try:
+            weights = loadtest.parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if not options['duration'] and not options['requests']:
+            raise CommandError('Give --duration or --requests')
+
+        if options['url']:
+            result = self._drive(options['url'], weights, options)
+        else:
+            result = self._run_in_process(weights, options)
+
+        result.update({
+            'mix': options['mix'],
+            'weights': weights,
+            'concurrency': options['concurrency'],
+            'target': options['url'] or 'in-process',
+            'commit': self._commit(),
+            'finished_at': timezone.now().isoformat(),
+        })
+        self._report(result)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as fh:
+                self._compare(json.load(fh), result)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as fh:
+                json.dump(result, fh, indent=2)
+            self.stdout.write(f'Results written to {options["output"]}')
+
+    def _drive(self, url, weights, options):
+        duration = options['duration'] or None
+        return loadtest.run(url, weights, options['concurrency'], duration, options['requests'], options['seed'])
+
+    def _run_in_process(self, weights, options):
+        """Migrate and seed a scratch SQLite file, then serve it on a local port"""
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError('The in-process server needs SQLite; use --url for other databases')
+        with loadtest.scratch_database(connection):
+            dataset = datagen.generate(
+                vendors=options['vendors'], emergency=options['emergency'], trips=options['trips'],
+                bookings=options['bookings'], seed=options['seed'],
+            )
+            self.stdout.write('Dataset: ' + ', '.join(f'{count} {name}' for name, count in dataset.items()))
+            connections.close_all()
+            with loadtest.InProcessServer(get_wsgi_application()) as server:
+                result = self._drive(server.url, weights, options)
+        result['dataset'] = dataset
+        return result
+
+    def _commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def _report(self, result):
+        self.stdout.write(
+            f'{"route":<24} {"reqs":>7} {"rps":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"4xx":>5} {"err":>5}'
+        )
+        rows = sorted(result['routes'].items()) + [('overall', result['overall'])]
+        for name, stats in rows:
+            self.stdout.write(
+                f'{name:<24} {stats["requests"]:>7} {stats["throughput_rps"]:>8} {stats["p50_ms"]:>8} '
+                f'{stats["p95_ms"]:>8} {stats["p99_ms"]:>8} {stats["client_errors"]:>5} {stats["errors"]:>5}'
+            )
+
+    def _compare(self, before, after):
+        self.stdout.write(f'Compared with {before.get("commit") or "earlier run"} ({before.get("mix")} mix):')
+        names = sorted(set(before['routes']) & set(after['routes'])) + ['overall']
+        for name in names:
+            old = before['overall'] if name == 'overall' else before['routes'][name]
+            new = after['overall'] if name == 'overall' else after['routes'][name]
+            changes = []
+            for key in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                if old.get(key) and new.get(key) is not None:
+                    changes.append(f'{key} {(new[key] - old[key]) / old[key]:+.0%}')
+            self.stdout.write(f'  {name:<24} ' + '  '.join(changes))
@@ -0,0 +1,101 @@
+"""
+Management command to load-test concurrent hotel bookings
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.test import Client
+from django.utils import timezone
+
+from core_api.models import Booking, RoomNight, Vendor
+
+
+class Command(BaseCommand):
+    help = 'Books one hotel from many threads at once and checks that nothing is overbooked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100, help='Concurrent client threads')
+        parser.add_argument('--requests', type=int, default=10, help='Booking attempts per client')
+        parser.add_argument('--capacity', type=int, default=250, help='Rooms per night at the test hotel')
+        parser.add_argument('--nights', type=int, default=2, help='Nights per booking')
+
+    def handle(self, *args, **options):
+        clients, per_client = options['clients'], options['requests']
+        capacity, nights = options['capacity'], options['nights']
+
+        hotel = Vendor.objects.create(
+            name='Load Test Hotel', vendor_type='hotel', address='Load test',
+            latitude=11.0, longitude=78.0, phone='0',
+            room_capacity=capacity, rooms_available=capacity,
+        )
+        check_in = timezone.now() + timedelta(days=30)
+        payload = {
+            'vendor': hotel.pk, 'customer_name': 'Load Test', 'phone': '0',
+            'total_price': '1000.00', 'status': 'confirmed',
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=nights)).isoformat(),
+        }
+        outcomes = {'created': 0, 'sold_out': 0, 'error': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(clients)
+
+        def client_thread():
+            client = Client()
+            local = {'created': 0, 'sold_out': 0, 'error': 0}
+            barrier.wait()
+            try:
+                for _ in range(per_client):
+                    try:
+                        response = client.post('/api/bookings/', payload, content_type='application/json')
+                    except OperationalError:
+                        # e.g. SQLite giving up on a lock after its busy timeout
+                        local['error'] += 1
+                        continue
+                    if response.status_code == 201:
+                        local['created'] += 1
+                    elif response.status_code == 400:
+                        local['sold_out'] += 1
+                    else:
+                        local['error'] += 1
+            finally:
+                connection.close()
+            with lock:
+                for key, value in local.items():
+                    outcomes[key] += value
+
+        try:
+            threads = [threading.Thread(target=client_thread) for _ in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            booked = Booking.objects.filter(vendor=hotel, status='confirmed').count()
+            per_night = list(RoomNight.objects.filter(vendor=hotel).values_list('rooms_booked', flat=True))
+        finally:
+            hotel.delete()
+
+        attempts = clients * per_client
+        self.stdout.write(f'Attempts: {attempts} from {clients} clients in {elapsed:.2f} s')
+        self.stdout.write(f"Created: {outcomes['created']}  sold out: {outcomes['sold_out']}  errors: {outcomes['error']}")
+        self.stdout.write(f'Throughput: {attempts / elapsed:.1f} requests/s, {outcomes["created"] / elapsed:.1f} bookings/s')
+        self.stdout.write(f'Rooms booked per night: {per_night}')
+
+        consistent = (
+            booked == outcomes['created']
+            and booked <= capacity
+            and all(n == booked for n in per_night)
+        )
+        if not outcomes['error']:
+            consistent = consistent and booked == min(attempts, capacity)
+        if not consistent:
+            raise CommandError(
+                f"Inconsistent counts: {outcomes['created']} created, {booked} stored, "
+                f'{per_night} booked per night, capacity {capacity}'
+            )
+        self.stdout.write(self.style.SUCCESS('Counts are consistent; no overbooking'))
@@ -0,0 +1,268 @@
+"""
+Per-endpoint request metrics
+
+``MetricsMiddleware`` records, per resolved URL name and HTTP method, the
+wall time, number of SQL queries, total SQL time and response size into
+in-process histograms, served in Prometheus text format at
+``/api/metrics/`` to scrapers presenting ``METRICS_TOKEN``. Only a ``METRICS_SAMPLE_RATE`` fraction of requests is
+measured (unsampled requests cost one ``random()`` call), and measured
+requests slower than ``METRICS_SLOW_REQUEST_MS`` are logged to
+``core_api.metrics`` with their SQL. SQL is attributed through a context
+variable read by a wrapper installed on every connection, so queries run
+by the async ORM in worker threads count towards their request too. For
+streamed responses the size is recorded when the stream is exhausted, and
+SQL run while streaming is not counted. Metrics are per process.
+"""
+import bisect
+import hmac
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+
+from .route_cache import route_cache
+
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# SQL statements kept per request for the slow-request log
+MAX_LOGGED_QUERIES = 50
+
+# (name, help, bucket upper bounds)
+HISTOGRAMS = (
+    ('http_request_duration_seconds', 'Wall time from the first middleware to the response',
+     (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)),
+    ('http_request_sql_queries', 'SQL queries run per request',
+     (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)),
+    ('http_request_sql_duration_seconds', 'Total SQL time per request',
+     (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)),
+    ('http_response_size_bytes', 'Response body size',
+     (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)),
+)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+    __slots__ = ('bounds', 'counts', 'total', 'count')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Histograms keyed by ``(url name, method)``"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, values):
+        """``values`` is one number per entry of ``HISTOGRAMS``, ``None`` to skip"""
+        key = (view, method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [Histogram(bounds) for _, _, bounds in HISTOGRAMS]
+            for histogram, value in zip(series, values):
+                if value is not None:
+                    histogram.observe(value)
+
+    def observe_size(self, view, method, size):
+        self.observe(view, method, (None, None, None, size))
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """Prometheus text exposition of every series"""
+        with self._lock:
+            series = {key: [(h.counts[:], h.total, h.count) for h in histograms]
+                      for key, histograms in self._series.items()}
+        lines = []
+        for index, (name, help_text, bounds) in enumerate(HISTOGRAMS):
+            metric = f'born2ride_{name}'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} histogram')
+            for (view, method), values in sorted(series.items()):
+                counts, total, count = values[index]
+                labels = f'view="{_escape(view)}",method="{method}"'
+                cumulative = 0
+                for bound, bucket in zip(bounds, counts):
+                    cumulative += bucket
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'{metric}_sum{{{labels}}} {total:.6f}')
+                lines.append(f'{metric}_count{{{labels}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class QueryRecorder:
+    """``execute_wrapper`` counting SQL statements and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.statements) < MAX_LOGGED_QUERIES:
+                self.statements.append((elapsed, sql))
+
+
+# QueryRecorder of the request being measured in this context, if any
+_recorder = ContextVar('metrics_query_recorder', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def _counting(chunks, view, method):
+    """Pass streamed chunks through, recording their total size at the end"""
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        yield chunk
+    registry.observe_size(view, method, size)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        self.slow_seconds = getattr(settings, 'METRICS_SLOW_REQUEST_MS', 500) / 1000
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._observe(request, response, time.perf_counter() - start, recorder)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        token = _recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._observe(request, response, time.perf_counter() - start, recorder)
+
+    def _observe(self, request, response, elapsed, recorder):
+        match = request.resolver_match
+        view = (match.view_name if match else None) or 'unmatched'
+        method = request.method
+        if response.streaming:
+            size = None
+            if not response.is_async:
+                response.streaming_content = _counting(response.streaming_content, view, method)
+        else:
+            size = len(response.content)
+        registry.observe(view, method, (elapsed, recorder.count, recorder.seconds, size))
+
+        if elapsed >= self.slow_seconds:
+            logger.warning(
+                'Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms SQL\n%s',
+                method, request.get_full_path(), view, elapsed * 1000, recorder.count, recorder.seconds * 1000,
+                '\n'.join(f'  {seconds * 1000:8.1f} ms  {sql}' for seconds, sql in recorder.statements),
+            )
+        return response
+
+
+def route_cache_lines():
+    stats = route_cache.snapshot()
+    lines = [
+        '# HELP born2ride_route_cache_lookups_total Distance matrix route lookups by the tier that answered',
+        '# TYPE born2ride_route_cache_lookups_total counter',
+    ]
+    for tier, key in (('memory', 'memory_hits'), ('database', 'db_hits'), ('computed', 'misses')):
+        lines.append(f'born2ride_route_cache_lookups_total{{tier="{tier}"}} {stats[key]}')
+    lines += [
+        '# HELP born2ride_route_cache_hit_ratio Share of route lookups answered from a cache tier',
+        '# TYPE born2ride_route_cache_hit_ratio gauge',
+        f'born2ride_route_cache_hit_ratio {stats["hit_rate"]}',
+        '# HELP born2ride_route_cache_memory_entries Routes held in the in-process LRU',
+        '# TYPE born2ride_route_cache_memory_entries gauge',
+        f'born2ride_route_cache_memory_entries {stats["memory_entries"]}',
+    ]
+    return lines
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, a 404 unless ``METRICS_TOKEN`` is set and a 401 without it"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        raise Http404
+    supplied = request.headers.get('Authorization', '').encode()
+    if not hmac.compare_digest(supplied, f'Bearer {token}'.encode()):
+        response = HttpResponse('Unauthorized\n', status=401, content_type='text/plain; charset=utf-8')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+    lines = [
+        '# HELP born2ride_metrics_sample_rate Fraction of requests recorded in the HTTP histograms',
+        '# TYPE born2ride_metrics_sample_rate gauge',
+        f'born2ride_metrics_sample_rate {sample_rate}',
+    ]
+    lines += registry.render()
+    lines += route_cache_lines()
+    return HttpResponse('\n'.join(lines) + '\n', content_type=PROMETHEUS_CONTENT_TYPE)
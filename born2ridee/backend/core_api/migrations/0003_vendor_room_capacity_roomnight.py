@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_rooms_to_capacity(apps, schema_editor):
+    Vendor = apps.get_model('core_api', 'Vendor')
+    Vendor.objects.update(room_capacity=models.F('rooms_available'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_api', '0002_vendor_availability_status_vendor_base_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='room_capacity',
+            field=models.IntegerField(default=0, help_text='Rooms that can be booked per night (for hotels)'),
+        ),
+        migrations.RunPython(copy_rooms_to_capacity, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('rooms_booked', models.IntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_nights', to='core_api.vendor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('vendor', 'night'), name='unique_room_night'), models.CheckConstraint(condition=models.Q(('rooms_booked__gte', 0)), name='room_night_non_negative')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_api', '0003_vendor_room_capacity_roomnight'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('vehicle_type', models.CharField(choices=[('bike', 'Bike'), ('car', 'Car')], max_length=20)),
+                ('trips', models.IntegerField(default=0)),
+                ('distance_km', models.FloatField(default=0.0)),
+                ('fuel_liters', models.FloatField(default=0.0)),
+                ('fuel_cost', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['day', 'vehicle_type'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'vehicle_type'), name='unique_trip_daily_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TripRouteRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(max_length=255)),
+                ('destination', models.CharField(max_length=255)),
+                ('vehicle_type', models.CharField(choices=[('bike', 'Bike'), ('car', 'Car')], max_length=20)),
+                ('trips', models.IntegerField(default=0)),
+                ('distance_km', models.FloatField(default=0.0)),
+                ('fuel_liters', models.FloatField(default=0.0)),
+                ('fuel_cost', models.FloatField(default=0.0)),
+            ],
+            options={
+                'ordering': ['-trips'],
+                'constraints': [models.UniqueConstraint(fields=('origin', 'destination', 'vehicle_type'), name='unique_trip_route_rollup')],
+            },
+        ),
+    ]
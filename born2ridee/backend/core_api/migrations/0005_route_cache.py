@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_api', '0004_trip_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Rounded origin|destination coordinates', max_length=64, unique=True)),
+                ('distance_km', models.FloatField(help_text='Empty when no route exists', null=True)),
+                ('duration_min', models.FloatField(null=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from core_api import search
+
+
+def create_search_index(apps, schema_editor):
+    search.install(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_api', '0006_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -23,11 +23,64 @@ class Trip(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='trip_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.origin} → {self.destination} ({self.vehicle_type})"
 
 
+class TripDailyRollup(models.Model):
+    """Trip totals per day and vehicle type, maintained as trips are created"""
+    day = models.DateField()
+    vehicle_type = models.CharField(max_length=20, choices=Trip.VEHICLE_CHOICES)
+    trips = models.IntegerField(default=0)
+    distance_km = models.FloatField(default=0.0)
+    fuel_liters = models.FloatField(default=0.0)
+    fuel_cost = models.FloatField(default=0.0)
+    
+    class Meta:
+        ordering = ['day', 'vehicle_type']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'vehicle_type'], name='unique_trip_daily_rollup'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.vehicle_type}: {self.trips} trips"
+
+
+class TripRouteRollup(models.Model):
+    """Trip totals per origin/destination pair and vehicle type"""
+    origin = models.CharField(max_length=255)
+    destination = models.CharField(max_length=255)
+    vehicle_type = models.CharField(max_length=20, choices=Trip.VEHICLE_CHOICES)
+    trips = models.IntegerField(default=0)
+    distance_km = models.FloatField(default=0.0)
+    fuel_liters = models.FloatField(default=0.0)
+    fuel_cost = models.FloatField(default=0.0)
+    
+    class Meta:
+        ordering = ['-trips']
+        constraints = [
+            models.UniqueConstraint(fields=['origin', 'destination', 'vehicle_type'], name='unique_trip_route_rollup'),
+        ]
+    
+    def __str__(self):
+        return f"{self.origin} → {self.destination} ({self.vehicle_type}): {self.trips} trips"
+
+
+class RouteCacheEntry(models.Model):
+    """Persisted road route between two rounded coordinates"""
+    key = models.CharField(max_length=64, unique=True, help_text="Rounded origin|destination coordinates")
+    distance_km = models.FloatField(null=True, help_text="Empty when no route exists")
+    duration_min = models.FloatField(null=True)
+    created_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"{self.key}: {self.distance_km} km"
+
+
 class Vendor(models.Model):
     """Model for food vendors, hotels, and workshops"""
     VENDOR_TYPES = [
@@ -59,12 +112,20 @@ class Vendor(models.Model):
     # New fields for enhanced functionality
     timing = models.CharField(max_length=100, default="9:00 AM - 9:00 PM", help_text="Opening and closing hours")
     rooms_available = models.IntegerField(default=0, help_text="Number of rooms available (for hotels)")
+    room_capacity = models.IntegerField(default=0, help_text="Rooms that can be booked per night (for hotels)")
     base_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, help_text="Base price for room or service")
     source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default='direct')
     availability_status = models.CharField(max_length=20, default="Available", help_text="Status for workshops (Available/Busy)")
     
     class Meta:
         ordering = ['-rating']
+        # Match the list ordering (-rating, -id) alone and after each filter
+        indexes = [
+            models.Index(fields=['-rating', '-id'], name='vendor_rating_idx'),
+            models.Index(fields=['vendor_type', '-rating', '-id'], name='vendor_type_rating_idx'),
+            models.Index(fields=['is_open', '-rating', '-id'], name='vendor_open_rating_idx'),
+            models.Index(fields=['source', '-rating', '-id'], name='vendor_source_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.get_vendor_type_display()})"
@@ -87,10 +148,34 @@ class Booking(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        # Export filters, in id and created_at order
+        indexes = [
+            models.Index(fields=['status', 'id'], name='booking_status_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='booking_status_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='booking_created_idx'),
+        ]
+    
     def __str__(self):
         return f"Booking for {self.customer_name} at {self.vendor.name}"
 
 
+class RoomNight(models.Model):
+    """Rooms booked at a hotel for a single night"""
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='room_nights')
+    night = models.DateField()
+    rooms_booked = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'night'], name='unique_room_night'),
+            models.CheckConstraint(condition=models.Q(rooms_booked__gte=0), name='room_night_non_negative'),
+        ]
+    
+    def __str__(self):
+        return f"{self.vendor_id} on {self.night}: {self.rooms_booked} booked"
+
+
 class EmergencyService(models.Model):
     """Model for emergency services like police, hospitals, ambulance"""
     SERVICE_TYPES = [
@@ -112,6 +197,9 @@ class EmergencyService(models.Model):
     class Meta:
         ordering = ['service_type', 'name']
         verbose_name_plural = "Emergency Services"
+        indexes = [
+            models.Index(fields=['service_type', 'name', 'id'], name='emergency_type_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.phone}"
@@ -0,0 +1,216 @@
+"""
+Compact offline packs of emergency services
+
+Pack layout, version 1 (all integers little-endian):
+
+    magic            4 bytes  b'B2RE'
+    version          u8
+    type count       u8, then per type: u8 length + UTF-8 service_type code
+    record count     varint
+    records, sorted by (latitude, longitude, id):
+        id           zigzag varint, delta from previous record
+        latitude     zigzag varint of round(lat * 1e5), delta from previous
+        longitude    zigzag varint of round(lng * 1e5), delta from previous
+        type index   u8 into the type table
+        flags        u8, bit 0 = is_24x7
+        name, phone, address   varint length + UTF-8 bytes each
+
+Coordinates are stored to 1e-5 degrees (about 1.1 m), which is finer than
+the precision riders need to find a service.
+"""
+import hashlib
+import math
+import struct
+import threading
+from collections import OrderedDict
+
+from .models import EmergencyService
+
+
+PACK_MAGIC = b'B2RE'
+PACK_VERSION = 1
+COORD_SCALE = 100000
+
+# Number of distinct regions whose packs are kept in memory
+PACK_CACHE_SIZE = 64
+
+# Requested regions are widened to multiples of 1 / REGION_STEPS degrees so
+# nearby requests share one cached pack
+REGION_STEPS = 100
+
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _write_text(out, text):
+    raw = text.encode('utf-8')
+    _write_varint(out, len(raw))
+    out.extend(raw)
+
+
+def _widen(value, up):
+    step = math.ceil(value * REGION_STEPS) if up else math.floor(value * REGION_STEPS)
+    widened = step / REGION_STEPS
+    # The product can round across a whole step
+    if (widened < value) if up else (widened > value):
+        widened = (step + (1 if up else -1)) / REGION_STEPS
+    return widened
+
+
+def pack_region(lat_min, lat_max, lng_min, lng_max):
+    """The cached region covering the requested bounds, never a smaller one"""
+    return (_widen(lat_min, False), _widen(lat_max, True), _widen(lng_min, False), _widen(lng_max, True))
+
+
+def encode_pack(services):
+    """Encode an iterable of ``EmergencyService`` rows into pack bytes"""
+    type_codes = [key for key, _ in EmergencyService.SERVICE_TYPES]
+    type_index = {code: i for i, code in enumerate(type_codes)}
+    rows = sorted(
+        ((round(s.latitude * COORD_SCALE), round(s.longitude * COORD_SCALE), s.pk, s) for s in services),
+        key=lambda row: row[:3]
+    )
+
+    out = bytearray(PACK_MAGIC)
+    out.extend(struct.pack('<BB', PACK_VERSION, len(type_codes)))
+    for code in type_codes:
+        raw = code.encode('utf-8')
+        out.append(len(raw))
+        out.extend(raw)
+    _write_varint(out, len(rows))
+
+    prev_id = prev_lat = prev_lng = 0
+    for lat, lng, pk, service in rows:
+        _write_varint(out, _zigzag(pk - prev_id))
+        _write_varint(out, _zigzag(lat - prev_lat))
+        _write_varint(out, _zigzag(lng - prev_lng))
+        out.append(type_index[service.service_type])
+        out.append(1 if service.is_24x7 else 0)
+        _write_text(out, service.name)
+        _write_text(out, service.phone)
+        _write_text(out, service.address)
+        prev_id, prev_lat, prev_lng = pk, lat, lng
+    return bytes(out)
+
+
+def decode_pack(data):
+    """Decode pack bytes into a list of dicts shaped like the JSON API"""
+    if data[:4] != PACK_MAGIC:
+        raise ValueError('Not an emergency services pack')
+    version, type_count = struct.unpack_from('<BB', data, 4)
+    if version != PACK_VERSION:
+        raise ValueError(f'Unsupported pack version {version}')
+    pos = 6
+    type_codes = []
+    for _ in range(type_count):
+        length = data[pos]
+        type_codes.append(data[pos + 1:pos + 1 + length].decode('utf-8'))
+        pos += 1 + length
+    count, pos = _read_varint(data, pos)
+
+    services = []
+    prev_id = prev_lat = prev_lng = 0
+    for _ in range(count):
+        fields = []
+        for _ in range(3):
+            value, pos = _read_varint(data, pos)
+            fields.append(_unzigzag(value))
+        prev_id += fields[0]
+        prev_lat += fields[1]
+        prev_lng += fields[2]
+        service_type, flags = data[pos], data[pos + 1]
+        pos += 2
+        texts = []
+        for _ in range(3):
+            length, pos = _read_varint(data, pos)
+            texts.append(data[pos:pos + length].decode('utf-8'))
+            pos += length
+        services.append({
+            'id': prev_id,
+            'name': texts[0],
+            'service_type': type_codes[service_type],
+            'phone': texts[1],
+            'address': texts[2],
+            'latitude': prev_lat / COORD_SCALE,
+            'longitude': prev_lng / COORD_SCALE,
+            'is_24x7': bool(flags & 1),
+        })
+    return services
+
+
+class Pack:
+    """An encoded pack together with its content hash"""
+
+    def __init__(self, data):
+        self.data = data
+        self.sha256 = hashlib.sha256(data).hexdigest()
+        self.etag = f'"v{PACK_VERSION}-{self.sha256[:32]}"'
+
+
+class PackCache:
+    """
+    Packs keyed by region, built on first request and reused until
+    :meth:`invalidate` is called by the EmergencyService signal handlers.
+    """
+
+    def __init__(self, max_size=PACK_CACHE_SIZE):
+        self.max_size = max_size
+        self._packs = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, **kwargs):
+        with self._lock:
+            self._generation += 1
+            self._packs.clear()
+
+    def get(self, region):
+        """Return the :class:`Pack` for ``(lat_min, lat_max, lng_min, lng_max)`` or ``None`` for everything"""
+        with self._lock:
+            pack = self._packs.get(region)
+            if pack is not None:
+                self._packs.move_to_end(region)
+                return pack
+            generation = self._generation
+
+        queryset = EmergencyService.objects.all()
+        if region is not None:
+            lat_min, lat_max, lng_min, lng_max = region
+            queryset = queryset.filter(
+                latitude__gte=lat_min, latitude__lte=lat_max,
+                longitude__gte=lng_min, longitude__lte=lng_max,
+            )
+        pack = Pack(encode_pack(queryset.iterator(chunk_size=10000)))
+
+        with self._lock:
+            if generation == self._generation:
+                self._packs[region] = pack
+                while len(self._packs) > self.max_size:
+                    self._packs.popitem(last=False)
+        return pack
+
+
+emergency_packs = PackCache()
@@ -0,0 +1,33 @@
+"""
+Request parsers for streaming uploads
+"""
+import json
+
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parses newline-delimited JSON lazily.
+
+    ``parse`` returns a generator of ``(line_number, value, error)`` tuples so
+    a view can validate and store items while the body is still being read.
+    Lines that are not valid JSON yield ``value=None`` and an error message.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return self._iter_lines(stream, encoding)
+
+    def _iter_lines(self, stream, encoding):
+        if stream is None:
+            return
+        for number, raw in enumerate(stream, start=1):
+            line = raw.decode(encoding).strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line), None
+            except ValueError as exc:
+                yield number, None, f'Invalid JSON: {exc}'
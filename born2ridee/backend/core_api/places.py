@@ -0,0 +1,143 @@
+"""
+Offline place autocomplete
+
+The gazetteer (``PLACES_PATH`` setting, defaulting to the bundled
+``data/places.json``) lists towns, highway junctions and landmarks as
+``[name, lat, lng, kind, aliases?]``. Every word-start of every name and
+alias goes into one sorted key array, so a prefix lookup is a bisect
+followed by a short scan. Matches are ranked by how often the place was a
+trip origin or destination, read from ``TripRouteRollup`` and refreshed
+every ``PLACE_POPULARITY_TTL`` seconds.
+"""
+import bisect
+import heapq
+import json
+import re
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Sum
+
+from .models import TripRouteRollup
+
+
+DEFAULT_PLACES_PATH = Path(__file__).resolve().parent / 'data' / 'places.json'
+
+PLACE_KINDS = ('town', 'junction', 'landmark')
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(text):
+    """Lowercase and collapse punctuation/whitespace to single spaces"""
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def place_name(text):
+    """Normalized place part of free text such as "Madurai, Tamil Nadu" """
+    return normalize(text.split(',')[0])
+
+
+class PlaceIndex:
+    """Sorted prefix index over gazetteer names and aliases"""
+
+    def __init__(self, places):
+        self.places = []
+        self.names = {}
+        entries = []
+        for pk, row in enumerate(places):
+            name, lat, lng, kind = row[:4]
+            aliases = row[4] if len(row) > 4 else []
+            self.places.append({'name': name, 'lat': lat, 'lng': lng, 'kind': kind})
+            for label in [name, *aliases]:
+                words = normalize(label).split(' ')
+                self.names.setdefault(' '.join(words), pk)
+                for start in range(len(words)):
+                    entries.append((' '.join(words[start:]), pk))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.ids = [pk for _, pk in entries]
+        self.popularity = [0] * len(self.places)
+        self.popularity_loaded_at = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as fh:
+            return cls(json.load(fh)['places'])
+
+    def __len__(self):
+        return len(self.places)
+
+    def set_popularity(self, counts):
+        """Replace popularity from ``{free-text place: trips}``"""
+        popularity = [0] * len(self.places)
+        for text, trips in counts.items():
+            pk = self.names.get(place_name(text))
+            if pk is not None:
+                popularity[pk] += trips
+        self.popularity = popularity
+
+    def refresh_popularity(self, max_age):
+        """Reload trip counts from the route rollup when older than ``max_age`` seconds"""
+        now = time.monotonic()
+        if self.popularity_loaded_at is not None and now - self.popularity_loaded_at < max_age:
+            return
+        with self._lock:
+            if self.popularity_loaded_at is not None and now - self.popularity_loaded_at < max_age:
+                return
+            counts = {}
+            for field in ('origin', 'destination'):
+                rows = TripRouteRollup.objects.order_by().values(field).annotate(total=Sum('trips'))
+                for row in rows:
+                    counts[row[field]] = counts.get(row[field], 0) + row['total']
+            self.set_popularity(counts)
+            self.popularity_loaded_at = now
+
+    def search(self, query, k=10, kinds=None):
+        """Return up to ``k`` places matching ``query``, most popular first"""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        matches = set()
+        start = bisect.bisect_left(self.keys, prefix)
+        for position in range(start, len(self.keys)):
+            if not self.keys[position].startswith(prefix):
+                break
+            matches.add(self.ids[position])
+        if kinds:
+            matches = {pk for pk in matches if self.places[pk]['kind'] in kinds}
+
+        places, popularity = self.places, self.popularity
+
+        def rank(pk):
+            name = normalize(places[pk]['name'])
+            return -popularity[pk], not name.startswith(prefix), len(name), name
+
+        return [
+            {**places[pk], 'popularity': popularity[pk]}
+            for pk in heapq.nsmallest(k, matches, key=rank)
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_place_index():
+    """Load the configured gazetteer once per process"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = PlaceIndex.load(getattr(settings, 'PLACES_PATH', DEFAULT_PLACES_PATH))
+    return _index
+
+
+def autocomplete(query, k=10, kinds=None):
+    """Top-``k`` gazetteer suggestions for a typed prefix"""
+    index = get_place_index()
+    index.refresh_popularity(getattr(settings, 'PLACE_POPULARITY_TTL', 300))
+    return index.search(query, k, kinds)
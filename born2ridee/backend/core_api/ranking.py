@@ -0,0 +1,116 @@
+"""
+Best-first vendor ranking around a rider
+
+``?sort=best`` on the vendor list and nearby endpoints orders vendors by a
+weighted score instead of by rating or by distance alone, so a well rated
+lodge at the next exit beats a slightly better one 200 km away. Every
+component is scaled to 0..1, higher being better:
+
+- ``distance``: 1 at the rider, falling linearly to 0 at ``radius_km``
+- ``rating``: ``rating`` out of 5
+- ``price``: by ``base_price``, 1 for the cheapest candidate of the same
+  vendor type and 0 for the dearest; by ``price_range`` when unpriced
+- ``open``: 1 when ``is_open``
+- ``rooms``: tonight's ``rooms_available`` for hotels, full at
+  ``FULL_ROOMS``; other vendor types always score 1
+
+The score is the mean of the components weighted by
+``VENDOR_RANKING_WEIGHTS``, which a request can override with
+``?weights=rating:2,price:0``.
+
+Candidates come from the in-memory spatial index: every vendor within
+``radius_km``, or the nearest ``VENDOR_RANKING_CANDIDATES`` of them. Their
+scoring columns are read in one query that also applies the list filters,
+since availability changes through queryset updates that the index never
+sees. All candidates are scored in one pass and the best ``k`` taken with
+a heap, without sorting the rest.
+"""
+import heapq
+import math
+
+from django.conf import settings
+
+from .spatial import vendor_index
+
+
+DEFAULT_WEIGHTS = {'distance': 0.35, 'rating': 0.25, 'price': 0.1, 'open': 0.15, 'rooms': 0.15}
+
+MAX_RATING = 5.0
+
+# Free rooms at which a hotel gets the whole rooms score
+FULL_ROOMS = 5
+
+# Price score of vendors without a base_price
+PRICE_RANGE_SCORES = {'₹': 1.0, '₹₹': 0.5, '₹₹₹': 0.0}
+
+SCORE_COLUMNS = ('id', 'vendor_type', 'rating', 'base_price', 'price_range', 'is_open', 'rooms_available')
+
+
+def parse_weights(value=None):
+    """The configured weights with ``name:number,...`` applied; raises ``ValueError``"""
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'VENDOR_RANKING_WEIGHTS', {})}
+    for item in filter(None, (value or '').split(',')):
+        name, _, number = item.partition(':')
+        if name not in DEFAULT_WEIGHTS:
+            raise ValueError(f'Unknown ranking weight: {name}; use {", ".join(DEFAULT_WEIGHTS)}')
+        try:
+            weights[name] = float(number)
+        except ValueError:
+            weights[name] = -1.0
+        if not (math.isfinite(weights[name]) and weights[name] >= 0):
+            raise ValueError('weights must be name:number pairs with numbers of 0 or more')
+    if not any(weights.values()):
+        raise ValueError('weights must not all be 0')
+    return weights
+
+
+def candidates(index, lat, lng, radius_km, kinds=None):
+    """``(distance_km, pk, kind)`` of the vendors within ``radius_km``, at most the nearest cap"""
+    return index.within(lat, lng, radius_km, kinds=kinds, limit=getattr(settings, 'VENDOR_RANKING_CANDIDATES', 2000))
+
+
+def candidate_rows(queryset, found):
+    """Query for the ``SCORE_COLUMNS`` of the candidates that pass ``queryset``'s filters"""
+    return queryset.filter(pk__in=[pk for _, pk, _ in found]).order_by().values_list(*SCORE_COLUMNS)
+
+
+def top(found, rows, radius_km, k, weights):
+    """
+    Score the candidate ``rows`` and return the ``k`` best as
+    ``(score, distance_km, pk)``, best first; ties go to the nearer vendor,
+    then to the lower id
+    """
+    distances = {pk: distance for distance, pk, _ in found}
+    prices = {}
+    for _, kind, _, base_price, _, _, _ in rows:
+        if base_price:
+            low, high = prices.get(kind, (base_price, base_price))
+            prices[kind] = (min(low, base_price), max(high, base_price))
+
+    total = sum(weights.values())
+    w_distance, w_rating, w_price, w_open, w_rooms = (weights[name] / total for name in DEFAULT_WEIGHTS)
+    scored = []
+    for pk, kind, rating, base_price, price_range, is_open, rooms in rows:
+        distance = distances[pk]
+        if base_price:
+            low, high = prices[kind]
+            price = float((high - base_price) / (high - low)) if high > low else 1.0
+        else:
+            price = PRICE_RANGE_SCORES.get(price_range, 0.5)
+        score = (
+            w_distance * (1.0 - distance / radius_km if radius_km > 0 else 1.0)
+            + w_rating * min(rating, MAX_RATING) / MAX_RATING
+            + w_price * price
+            + w_open * is_open
+            + w_rooms * (min(rooms, FULL_ROOMS) / FULL_ROOMS if kind == 'hotel' else 1.0)
+        )
+        scored.append((score, -distance, -pk))
+    return [(score, -distance, -pk) for score, distance, pk in heapq.nlargest(k, scored)]
+
+
+def best_vendors(queryset, lat, lng, radius_km, k, kinds=None, weights=None):
+    """The ``k`` best vendors of ``queryset`` around a point, as ``top`` returns them"""
+    found = candidates(vendor_index.get(), lat, lng, radius_km, kinds)
+    if not found:
+        return []
+    return top(found, list(candidate_rows(queryset, found)), radius_km, k, weights or parse_weights())
@@ -0,0 +1,36 @@
+"""
+JSON renderer with an optional fast encoder
+
+When ``orjson`` is installed, responses flagged ``json_safe`` by the fast
+list path are encoded with it; everything else, and every response when
+``orjson`` is missing, goes through DRF's ``JSONRenderer`` unchanged.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` producing identical bytes, faster for flagged responses"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        renderer_context = renderer_context or {}
+        response = renderer_context.get('response')
+        if (
+            orjson is None or data is None or not getattr(response, 'json_safe', False)
+            or not self.compact or self.ensure_ascii
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except (TypeError, orjson.JSONEncodeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, for embedding in JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
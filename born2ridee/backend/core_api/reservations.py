@@ -0,0 +1,142 @@
+"""
+Atomic hotel room reservations with per-night capacity
+
+Every hotel night is a ``RoomNight`` row. A booking locks the hotel's
+``Vendor`` row, then reserves all of its nights with one conditional
+UPDATE that only increments rows still below the ``room_capacity`` read
+under that lock; if fewer rows than nights were updated the transaction
+is rolled back. Concurrent bookings for a hotel queue on its row, so they
+can never overbook, and the UPDATE compares each night against a plain
+number instead of a join that a server database may evaluate against a
+snapshot taken before another booking committed.
+
+``Vendor.rooms_available`` is kept as the number of rooms left for tonight
+so existing clients can keep showing it; changes to it go out on the
+availability change feed.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import availability
+from .models import Booking, RoomNight, Vendor
+
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+
+class RoomsUnavailable(Exception):
+    """Raised when at least one requested night is fully booked"""
+
+
+def booking_nights(check_in, check_out):
+    """
+    Nights covered by a stay, as dates.
+
+    A booking without dates is a single night starting today; a missing or
+    non-positive check-out also means a single night.
+    """
+    start = timezone.localdate(check_in) if check_in else timezone.localdate()
+    end = timezone.localdate(check_out) if check_out else None
+    if end is None or end <= start:
+        end = start + timedelta(days=1)
+    return [start + timedelta(days=n) for n in range((end - start).days)]
+
+
+def _tracks_rooms(vendor):
+    return vendor.vendor_type == 'hotel'
+
+
+def reserve_nights(vendor_id, nights):
+    """Book one room on each night, or raise :class:`RoomsUnavailable`"""
+    with transaction.atomic():
+        # SQLite transactions already hold the write lock (transaction_mode IMMEDIATE)
+        capacity = Vendor.objects.select_for_update().values_list('room_capacity', flat=True).get(pk=vendor_id)
+        RoomNight.objects.bulk_create(
+            [RoomNight(vendor_id=vendor_id, night=night) for night in nights],
+            ignore_conflicts=True
+        )
+        updated = RoomNight.objects.filter(
+            vendor_id=vendor_id,
+            night__in=nights,
+            rooms_booked__lt=capacity,
+        ).update(rooms_booked=F('rooms_booked') + 1)
+        if updated != len(nights):
+            raise RoomsUnavailable()
+        if timezone.localdate() in nights:
+            if Vendor.objects.filter(pk=vendor_id, rooms_available__gt=0).update(
+                rooms_available=F('rooms_available') - 1
+            ):
+                availability.rooms_changed(vendor_id)
+
+
+def release_nights(vendor_id, nights):
+    """Give back one room on each night"""
+    RoomNight.objects.filter(
+        vendor_id=vendor_id, night__in=nights, rooms_booked__gt=0
+    ).update(rooms_booked=F('rooms_booked') - 1)
+    if timezone.localdate() in nights:
+        if Vendor.objects.filter(pk=vendor_id, rooms_available__lt=F('room_capacity')).update(
+            rooms_available=F('rooms_available') + 1
+        ):
+            availability.rooms_changed(vendor_id)
+
+
+def create_booking(serializer):
+    """Save a validated ``BookingSerializer``, reserving rooms for hotels"""
+    data = serializer.validated_data
+    vendor = data['vendor']
+    with transaction.atomic():
+        if _tracks_rooms(vendor) and data.get('status', 'pending') in ACTIVE_STATUSES:
+            if not data.get('check_in'):
+                # Record the night being reserved so a later cancel releases the same one
+                data['check_in'] = timezone.now()
+            reserve_nights(vendor.pk, booking_nights(data.get('check_in'), data.get('check_out')))
+        return serializer.save()
+
+
+def _lock_booking(pk):
+    """
+    Lock a booking row for the rest of the transaction and return it fresh.
+
+    The no-op UPDATE comes first so SQLite takes its write lock before the
+    read and server databases hold the row lock until commit.
+    """
+    Booking.objects.filter(pk=pk).update(status=F('status'))
+    return Booking.objects.select_related('vendor').get(pk=pk)
+
+
+def update_booking(serializer):
+    """
+    Save changes to a booking, moving its reservation when the vendor or
+    dates change and releasing it when the booking is cancelled.
+    """
+    data = serializer.validated_data
+    with transaction.atomic():
+        current = _lock_booking(serializer.instance.pk)
+        vendor = data.get('vendor', current.vendor)
+        status = data.get('status', current.status)
+        nights = booking_nights(
+            data.get('check_in', current.check_in),
+            data.get('check_out', current.check_out)
+        )
+        if current.status in ACTIVE_STATUSES and _tracks_rooms(current.vendor):
+            release_nights(current.vendor_id, booking_nights(current.check_in, current.check_out))
+        if status in ACTIVE_STATUSES and _tracks_rooms(vendor):
+            reserve_nights(vendor.pk, nights)
+        return serializer.save()
+
+
+def cancel_booking(booking):
+    """Cancel a booking once, releasing its rooms; returns False if it was not active"""
+    with transaction.atomic():
+        current = _lock_booking(booking.pk)
+        if current.status not in ACTIVE_STATUSES:
+            return False
+        Booking.objects.filter(pk=booking.pk).update(status='cancelled')
+        if _tracks_rooms(current.vendor):
+            release_nights(current.vendor_id, booking_nights(current.check_in, current.check_out))
+    booking.status = 'cancelled'
+    return True
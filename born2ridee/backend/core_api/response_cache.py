@@ -0,0 +1,162 @@
+"""
+Cached list responses with conditional GET
+
+List pages of slowly changing models are stored in Django's cache under
+the normalized query parameters, together with an ETag (a hash of the
+page) and a Last-Modified time. Each scope has a generation token that
+the ``post_save``/``post_delete`` handlers in ``signals.py`` replace, as
+``availability.rooms_changed`` does for bookings, which orphans every
+cached page of that scope at once. Entries also expire
+after ``RESPONSE_CACHE_TTL`` seconds, which bounds staleness for writes
+made by other processes. ``cached_response`` serves other read actions
+(vendor search) the same way and ``acached_list`` is the list cache for
+the async views.
+"""
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+
+KEY_PREFIX = 'response-cache'
+
+
+def _ttl():
+    return getattr(settings, 'RESPONSE_CACHE_TTL', 300)
+
+
+def _generation_key(scope):
+    return f'{KEY_PREFIX}:{scope}:generation'
+
+
+def generation(scope):
+    """Return ``(token, modified_at)`` for a scope, starting one if needed"""
+    current = cache.get(_generation_key(scope))
+    if current is None:
+        current = (uuid.uuid4().hex, int(time.time()))
+        if not cache.add(_generation_key(scope), current, timeout=None):
+            current = cache.get(_generation_key(scope), current)
+    return current
+
+
+async def ageneration(scope):
+    current = await cache.aget(_generation_key(scope))
+    if current is None:
+        current = (uuid.uuid4().hex, int(time.time()))
+        if not await cache.aadd(_generation_key(scope), current, timeout=None):
+            current = await cache.aget(_generation_key(scope), current)
+    return current
+
+
+def invalidate(scope):
+    """Orphan every cached response of a scope"""
+    cache.set(_generation_key(scope), (uuid.uuid4().hex, int(time.time())), timeout=None)
+
+
+def normalize_params(params, names):
+    """Canonical string of the parameters in ``names``, in a fixed order"""
+    parts = []
+    for name in names:
+        value = params.get(name)
+        if value in (None, ''):
+            continue
+        if name == 'is_open':
+            value = str(value.lower() == 'true').lower()
+        elif name == 'q':
+            value = ' '.join(value.lower().split())
+        elif name == 'fields':
+            value = ','.join(sorted({field.strip() for field in value.split(',') if field.strip()}))
+        parts.append(f'{name}={value}')
+    return '&'.join(parts)
+
+
+def page_key(scope, token, request, names):
+    # Host and path are part of the key because pagination links are absolute
+    params = normalize_params(request.GET, names)
+    url = f'{request.get_host()}{request.path}?{params}'
+    return f'{KEY_PREFIX}:{scope}:{token}:' + hashlib.sha1(url.encode()).hexdigest()
+
+
+def make_entry(data, json_safe):
+    body = json.dumps(data, cls=JSONEncoder, sort_keys=True).encode()
+    return {
+        'data': data,
+        'etag': '"%s"' % hashlib.sha256(body).hexdigest()[:32],
+        'json_safe': json_safe,
+    }
+
+
+def _not_modified(request, etag, modified_at):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and modified_at <= since
+
+
+def _with_validators(response, etag, modified_at):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified_at)
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+class CachedListMixin:
+    """
+    Serve ``list()`` from the response cache.
+
+    Views set ``response_cache_scope`` (invalidated by signals) and
+    ``response_cache_params``, the query parameters that change the output.
+    """
+    response_cache_scope = None
+    response_cache_params = ()
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(
+            request, self.response_cache_scope, self.response_cache_params,
+            lambda: super(CachedListMixin, self).list(request, *args, **kwargs)
+        )
+
+
+def cached_response(request, scope, names, build):
+    """
+    Serve the ``Response`` that ``build()`` returns through the cache,
+    keyed by the query parameters in ``names``
+    """
+    token, modified_at = generation(scope)
+    key = page_key(scope, token, request, names)
+    entry = cache.get(key)
+    if entry is None:
+        response = build()
+        entry = make_entry(response.data, getattr(response, 'json_safe', False))
+        cache.set(key, entry, timeout=_ttl())
+
+    if _not_modified(request, entry['etag'], modified_at):
+        return _with_validators(HttpResponseNotModified(), entry['etag'], modified_at)
+    response = Response(entry['data'])
+    response.json_safe = entry['json_safe']
+    return _with_validators(response, entry['etag'], modified_at)
+
+
+async def acached_list(request, scope, names, build, render):
+    """
+    ``CachedListMixin.list`` for async views. ``build()`` is awaited on a
+    miss and returns ``(data, json_safe)``; ``render(data, json_safe)``
+    turns a cached page into a response.
+    """
+    token, modified_at = await ageneration(scope)
+    key = page_key(scope, token, request, names)
+    entry = await cache.aget(key)
+    if entry is None:
+        entry = make_entry(*await build())
+        await cache.aset(key, entry, timeout=_ttl())
+    if _not_modified(request, entry['etag'], modified_at):
+        return _with_validators(HttpResponseNotModified(), entry['etag'], modified_at)
+    return _with_validators(render(entry['data'], entry['json_safe']), entry['etag'], modified_at)
@@ -0,0 +1,129 @@
+"""
+Incrementally maintained trip analytics
+
+Each created, changed or deleted trip adds or subtracts its totals from
+``TripDailyRollup`` and ``TripRouteRollup`` with F-expression UPDATEs, so
+dashboards read a table whose size depends on days and routes, not on the
+number of raw trips. ``manage.py backfill_trip_rollups`` rebuilds both
+tables from scratch.
+
+The app's signal handlers apply the totals for every ``Trip.save()`` and
+``delete()``, so the API, the admin and scripts all stay in step: the
+rolled-up fields are recorded when a trip is loaded and the old totals
+subtracted when a save changes them. ``bulk_create()`` and queryset
+``update()`` send no signals, so callers record those trips themselves
+with :func:`record_trips`, or :func:`rebuild` afterwards.
+"""
+from collections import defaultdict
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Trip, TripDailyRollup, TripRouteRollup
+
+
+MEASURES = ('trips', 'distance_km', 'fuel_liters', 'fuel_cost')
+
+# Trip fields the rollup keys and totals are computed from
+FIELDS = ('created_at', 'vehicle_type', 'origin', 'destination', 'distance_km', 'fuel_liters', 'fuel_cost')
+
+
+def _daily_key(trip):
+    return {'day': timezone.localdate(trip.created_at), 'vehicle_type': trip.vehicle_type}
+
+
+def _route_key(trip):
+    return {'origin': trip.origin, 'destination': trip.destination, 'vehicle_type': trip.vehicle_type}
+
+
+def _collect(trips, key_fn, sign):
+    totals = defaultdict(lambda: dict.fromkeys(MEASURES, 0))
+    for trip in trips:
+        key = tuple(sorted(key_fn(trip).items()))
+        row = totals[key]
+        row['trips'] += sign
+        row['distance_km'] += sign * trip.distance_km
+        row['fuel_liters'] += sign * trip.fuel_liters
+        row['fuel_cost'] += sign * trip.fuel_cost
+    return totals
+
+
+def _apply(model, totals):
+    model.objects.bulk_create([model(**dict(key)) for key in totals], ignore_conflicts=True)
+    for key, row in totals.items():
+        model.objects.filter(**dict(key)).update(**{
+            measure: F(measure) + delta for measure, delta in row.items()
+        })
+        # A day or route whose last trip went away is dropped, not left at zero
+        if row['trips'] < 0:
+            model.objects.filter(**dict(key), trips__lte=0).delete()
+
+
+def record_trips(trips, sign=1):
+    """Add (``sign=1``) or subtract (``sign=-1``) saved trips from the rollups"""
+    trips = list(trips)
+    if not trips:
+        return
+    with transaction.atomic():
+        _apply(TripDailyRollup, _collect(trips, _daily_key, sign))
+        _apply(TripRouteRollup, _collect(trips, _route_key, sign))
+
+
+def remember(trip):
+    """Record the rolled-up fields as loaded, to subtract them on save or delete"""
+    trip._rollup = {name: trip.__dict__[name] for name in FIELDS if name in trip.__dict__}
+
+
+def load_stored(trip):
+    """Complete the recorded fields from the stored row, before a save or delete"""
+    stored = getattr(trip, '_rollup', {})
+    missing = [name for name in FIELDS if name not in stored]
+    if missing and not trip._state.adding:
+        row = Trip.objects.filter(pk=trip.pk).values(*missing).first()
+        trip._rollup = {**stored, **(row or {})}
+
+
+def trip_saved(trip, created):
+    """Move a saved trip's totals to its new day and route"""
+    if created:
+        record_trips([trip])
+    else:
+        stored = getattr(trip, '_rollup', {})
+        current = {name: trip.__dict__.get(name, stored.get(name)) for name in FIELDS}
+        if current != stored:
+            with transaction.atomic():
+                record_trips([SimpleNamespace(**stored)], sign=-1)
+                record_trips([trip])
+    remember(trip)
+
+
+def trip_deleted(trip):
+    stored = getattr(trip, '_rollup', {})
+    # A row that was already gone has nothing to subtract
+    if len(stored) == len(FIELDS):
+        record_trips([SimpleNamespace(**stored)], sign=-1)
+
+
+def rebuild():
+    """Recompute both rollup tables from the Trip table"""
+    sums = {
+        'trips': Count('id'),
+        'distance_km': Sum('distance_km'),
+        'fuel_liters': Sum('fuel_liters'),
+        'fuel_cost': Sum('fuel_cost'),
+    }
+    daily = (
+        Trip.objects.order_by()
+        .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+        .values('day', 'vehicle_type').annotate(**sums)
+    )
+    routes = Trip.objects.order_by().values('origin', 'destination', 'vehicle_type').annotate(**sums)
+    with transaction.atomic():
+        TripDailyRollup.objects.all().delete()
+        TripRouteRollup.objects.all().delete()
+        TripDailyRollup.objects.bulk_create([TripDailyRollup(**row) for row in daily], batch_size=1000)
+        TripRouteRollup.objects.bulk_create([TripRouteRollup(**row) for row in routes], batch_size=1000)
+    return TripDailyRollup.objects.count(), TripRouteRollup.objects.count()
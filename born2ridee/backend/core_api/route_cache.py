@@ -0,0 +1,162 @@
+"""
+Two-tier cache of road routes between rounded coordinates
+
+Lookups go to an in-process LRU first, then to the ``RouteCacheEntry``
+table, and only then to the routing engine. Both tiers expire entries
+after ``ROUTE_CACHE_TTL`` seconds; the LRU holds ``ROUTE_CACHE_LRU_SIZE``
+entries and the table is trimmed back to ``ROUTE_CACHE_MAX_ROWS`` rows
+(oldest first) every ``ROUTE_CACHE_TRIM_EVERY`` inserts.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import RouteCacheEntry
+from .routing import get_graph
+
+
+# Decimal places kept from coordinates (3 places is about 110 m)
+COORD_PRECISION = 3
+
+# Keys per IN (...) query, kept under SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+
+def route_key(origin, dest):
+    """Cache key for a route between two ``(lat, lng)`` points"""
+    return '|'.join(f'{round(lat, COORD_PRECISION)},{round(lng, COORD_PRECISION)}' for lat, lng in (origin, dest))
+
+
+def _parse_key(key):
+    origin, dest = key.split('|')
+    return [float(v) for v in origin.split(',')], [float(v) for v in dest.split(',')]
+
+
+class RouteCache:
+    """LRU in front of the persistent route table, with hit/miss counters"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'ROUTE_CACHE_TTL', 7 * 24 * 3600)
+        self.lru_size = getattr(settings, 'ROUTE_CACHE_LRU_SIZE', 10000)
+        self.max_rows = getattr(settings, 'ROUTE_CACHE_MAX_ROWS', 200000)
+        self.trim_every = getattr(settings, 'ROUTE_CACHE_TRIM_EVERY', 1000)
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._inserts_since_trim = 0
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+
+    def hit_rate(self):
+        total = sum(self.stats.values())
+        return (self.stats['memory_hits'] + self.stats['db_hits']) / total if total else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['memory_entries'] = len(self._lru)
+        stats['hit_rate'] = round(self.hit_rate(), 4)
+        return stats
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+
+    def _remember(self, key, value, stored_at):
+        self._lru[key] = (value, stored_at)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, pairs):
+        """
+        Look up ``(origin, dest)`` pairs.
+
+        Returns ``({key: route or None}, counts)``, where a route is
+        ``{'distance_km', 'duration_min'}`` and ``counts`` gives this call's
+        memory hits, database hits and misses.
+        """
+        keys = {route_key(origin, dest) for origin, dest in pairs}
+        found = {}
+        now = time.time()
+
+        with self._lock:
+            for key in keys:
+                entry = self._lru.get(key)
+                if entry is not None and now - entry[1] < self.ttl:
+                    self._lru.move_to_end(key)
+                    found[key] = entry[0]
+            memory_hits = len(found)
+            self.stats['memory_hits'] += memory_hits
+
+        pending = [key for key in keys if key not in found]
+        fresh_after = timezone.now() - timedelta(seconds=self.ttl)
+        from_db = {}
+        for start in range(0, len(pending), LOOKUP_BATCH):
+            rows = RouteCacheEntry.objects.filter(
+                key__in=pending[start:start + LOOKUP_BATCH], created_at__gte=fresh_after
+            ).values_list('key', 'distance_km', 'duration_min', 'created_at')
+            for key, distance_km, duration_min, created_at in rows:
+                value = None if distance_km is None else {'distance_km': distance_km, 'duration_min': duration_min}
+                from_db[key] = (value, created_at.timestamp())
+
+        missing = [key for key in pending if key not in from_db]
+        computed = {}
+        if missing:
+            graph = get_graph()
+            for key in missing:
+                origin, dest = _parse_key(key)
+                route = graph.route(*origin, *dest)
+                computed[key] = None if route is None else {
+                    'distance_km': route['distance_km'], 'duration_min': route['duration_min']
+                }
+            self._store(computed)
+
+        with self._lock:
+            self.stats['db_hits'] += len(from_db)
+            self.stats['misses'] += len(computed)
+            for key, (value, stored_at) in from_db.items():
+                self._remember(key, value, stored_at)
+                found[key] = value
+            for key, value in computed.items():
+                self._remember(key, value, now)
+                found[key] = value
+        return found, {'memory_hits': memory_hits, 'db_hits': len(from_db), 'misses': len(computed)}
+
+    def _store(self, computed):
+        created_at = timezone.now()
+        RouteCacheEntry.objects.bulk_create(
+            [
+                RouteCacheEntry(
+                    key=key, created_at=created_at,
+                    distance_km=value and value['distance_km'],
+                    duration_min=value and value['duration_min'],
+                )
+                for key, value in computed.items()
+            ],
+            update_conflicts=True, unique_fields=['key'],
+            update_fields=['distance_km', 'duration_min', 'created_at'],
+            batch_size=LOOKUP_BATCH,
+        )
+        self._inserts_since_trim += len(computed)
+        if self._inserts_since_trim >= self.trim_every:
+            self._inserts_since_trim = 0
+            self.trim()
+
+    def trim(self):
+        """Delete expired rows, then the oldest rows beyond ``max_rows``"""
+        RouteCacheEntry.objects.filter(created_at__lt=timezone.now() - timedelta(seconds=self.ttl)).delete()
+        cutoff = (
+            RouteCacheEntry.objects.order_by('-created_at', '-id')
+            .values_list('created_at', 'id')[self.max_rows:self.max_rows + 1]
+        )
+        for created_at, pk in cutoff:
+            RouteCacheEntry.objects.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk)
+            ).delete()
+
+
+route_cache = RouteCache()
@@ -0,0 +1,223 @@
+"""
+Offline road routing over a bundled highway graph
+
+The graph file (``ROAD_GRAPH_PATH`` setting, defaulting to the bundled
+``data/south_india_roads.json``) lists nodes as ``[name, lat, lng]`` and
+undirected edges as ``[from, to, km, speed_kmph, road]``. Queries snap the
+two endpoints to their nearest nodes and run a bidirectional A* search.
+"""
+import heapq
+import json
+import math
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+from .spatial import GridIndex, haversine_km
+
+
+DEFAULT_GRAPH_PATH = Path(__file__).resolve().parent / 'data' / 'south_india_roads.json'
+
+# Furthest an endpoint may be from the road graph and still be routed
+MAX_SNAP_KM = 60.0
+
+# Legs between an endpoint and its snapped node use a straight line scaled
+# by this factor, driven at ACCESS_SPEED_KMPH
+ACCESS_ROAD_FACTOR = 1.25
+ACCESS_SPEED_KMPH = 40.0
+
+METRICS = ('distance', 'time')
+
+# A road distance above this factor times the straight-line distance, plus
+# DETOUR_SLACK_KM, means an endpoint snapped to the wrong side of a gap in
+# the graph rather than a real detour
+MAX_DETOUR_FACTOR = 3.0
+DETOUR_SLACK_KM = 20.0
+
+
+def plausible(distance_km, origin_lat, origin_lng, dest_lat, dest_lng):
+    """Whether a routed distance is believable for the straight line between the ends"""
+    straight_km = haversine_km(origin_lat, origin_lng, dest_lat, dest_lng)
+    return distance_km <= straight_km * MAX_DETOUR_FACTOR + DETOUR_SLACK_KM
+
+
+class RoadGraph:
+    """Adjacency-list road graph with a grid index over its nodes for snapping"""
+
+    def __init__(self, nodes, edges):
+        self.names = [name for name, _, _ in nodes]
+        self.coords = [(lat, lng) for _, lat, lng in nodes]
+        # adjacency[u] = [(v, km, minutes, road), ...]
+        self.adjacency = [[] for _ in nodes]
+        self.max_speed_kmph = 1.0
+        for u, v, km, speed, road in edges:
+            minutes = km / speed * 60
+            self.adjacency[u].append((v, km, minutes, road))
+            self.adjacency[v].append((u, km, minutes, road))
+            self.max_speed_kmph = max(self.max_speed_kmph, speed)
+        self.index = GridIndex(cell_deg=0.25)
+        for node, (lat, lng) in enumerate(self.coords):
+            self.index.add(node, lat, lng)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as fh:
+            data = json.load(fh)
+        return cls(data['nodes'], data['edges'])
+
+    def __len__(self):
+        return len(self.names)
+
+    def snap(self, lat, lng, max_km=MAX_SNAP_KM):
+        """Return ``(distance_km, node)`` for the closest node, or ``None``"""
+        hits = self.index.nearest(lat, lng, k=1, radius_km=max_km)
+        if not hits:
+            return None
+        distance, node, _ = hits[0]
+        return distance, node
+
+    def _weight_index(self, metric):
+        return 1 if metric == 'distance' else 2
+
+    def _heuristic(self, metric):
+        """Admissible, consistent lower bound on the cost between two nodes"""
+        coords = self.coords
+        scale = 1.0 if metric == 'distance' else 60.0 / self.max_speed_kmph
+
+        def h(a, b):
+            (lat1, lng1), (lat2, lng2) = coords[a], coords[b]
+            return haversine_km(lat1, lng1, lat2, lng2) * scale
+        return h
+
+    def shortest_path(self, source, target, metric='distance'):
+        """
+        Bidirectional A* between two nodes.
+
+        Both searches use the average potential ``p(v) = (h(v, t) - h(s, v)) / 2``
+        (forward) and ``-p(v)`` (backward), which keeps reduced edge costs
+        consistent in both directions, so the search can stop as soon as the
+        two smallest queue keys add up to the best meeting cost found.
+
+        Returns ``(cost, [nodes])`` or ``None`` when unreachable.
+        """
+        if source == target:
+            return 0.0, [source]
+        weight = self._weight_index(metric)
+        h = self._heuristic(metric)
+        potential_cache = {}
+
+        def potential(v):
+            p = potential_cache.get(v)
+            if p is None:
+                p = potential_cache[v] = (h(v, target) - h(source, v)) / 2
+            return p
+
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: None}, {target: None})
+        settled = (set(), set())
+        queues = ([(potential(source), source)], [(-potential(target), target)])
+        signs = (1, -1)
+        best, meeting = math.inf, None
+
+        while queues[0] and queues[1]:
+            if queues[0][0][0] + queues[1][0][0] >= best:
+                break
+            side = 0 if queues[0][0][0] <= queues[1][0][0] else 1
+            _, u = heapq.heappop(queues[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            other = 1 - side
+            du = dist[side][u]
+            for edge in self.adjacency[u]:
+                v = edge[0]
+                dv = du + edge[weight]
+                if dv < dist[side].get(v, math.inf):
+                    dist[side][v] = dv
+                    parent[side][v] = u
+                    heapq.heappush(queues[side], (dv + signs[side] * potential(v), v))
+                if v in dist[other] and dv + dist[other][v] < best:
+                    best = dv + dist[other][v]
+                    meeting = v
+
+        if meeting is None:
+            return None
+        path = []
+        node = meeting
+        while node is not None:
+            path.append(node)
+            node = parent[0][node]
+        path.reverse()
+        node = parent[1][meeting]
+        while node is not None:
+            path.append(node)
+            node = parent[1][node]
+        return best, path
+
+    def dijkstra(self, source, target, metric='distance'):
+        """Plain Dijkstra, kept as a reference for tests and benchmarks"""
+        weight = self._weight_index(metric)
+        dist = {source: 0.0}
+        queue = [(0.0, source)]
+        while queue:
+            d, u = heapq.heappop(queue)
+            if u == target:
+                return d
+            if d > dist[u]:
+                continue
+            for edge in self.adjacency[u]:
+                nd = d + edge[weight]
+                if nd < dist.get(edge[0], math.inf):
+                    dist[edge[0]] = nd
+                    heapq.heappush(queue, (nd, edge[0]))
+        return None
+
+    def path_totals(self, path):
+        """Sum ``(km, minutes)`` along a node path, taking the best edge between each pair"""
+        km = minutes = 0.0
+        for u, v in zip(path, path[1:]):
+            edge = min((e for e in self.adjacency[u] if e[0] == v), key=lambda e: e[1])
+            km += edge[1]
+            minutes += edge[2]
+        return km, minutes
+
+    def route(self, origin_lat, origin_lng, dest_lat, dest_lng, metric='distance'):
+        """
+        Route between two coordinates.
+
+        Returns a dict with ``distance_km``, ``duration_min`` and the list of
+        graph nodes passed through, or ``None`` when either end is too far
+        from the road graph or the ends are not connected.
+        """
+        start = self.snap(origin_lat, origin_lng)
+        end = self.snap(dest_lat, dest_lng)
+        if start is None or end is None:
+            return None
+        found = self.shortest_path(start[1], end[1], metric)
+        if found is None:
+            return None
+        _, path = found
+        km, minutes = self.path_totals(path)
+        access_km = (start[0] + end[0]) * ACCESS_ROAD_FACTOR
+        km += access_km
+        minutes += access_km / ACCESS_SPEED_KMPH * 60
+        return {
+            'distance_km': round(km, 1),
+            'duration_min': round(minutes),
+            'via': [self.names[node] for node in path],
+        }
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph():
+    """Load the configured road graph once per process"""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = RoadGraph.load(getattr(settings, 'ROAD_GRAPH_PATH', DEFAULT_GRAPH_PATH))
+    return _graph
@@ -0,0 +1,150 @@
+"""
+Full-text vendor search
+
+On SQLite, ``core_api_vendor_fts`` is an FTS5 index over the name,
+description and address of every vendor. It stores no copy of the text
+(``content=`` points at the vendor table) and triggers keep it in step
+with every insert, update and delete, including ``bulk_create`` and
+queryset updates that send no signals. Queries are ANDed terms, the last
+one a prefix, ranked by BM25 with the name weighted above the address and
+the address above the description; the usual list filters are applied in
+the same query.
+
+Other databases get the same endpoint without an index: a
+case-insensitive substring match, ordered by rating.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+
+FTS_TABLE = 'core_api_vendor_fts'
+
+# BM25 column weights, in index column order
+SEARCH_WEIGHTS = {'name': 5.0, 'description': 1.0, 'address': 2.0}
+
+# Terms beyond this are ignored
+MAX_SEARCH_TERMS = 8
+
+# Shorter last terms are matched whole; one-letter prefixes expand to too many tokens
+MIN_PREFIX_LENGTH = 2
+
+_TERM = re.compile(r'\w+')
+
+_COLUMNS = ', '.join(SEARCH_WEIGHTS)
+_NEW = ', '.join(f'new.{column}' for column in SEARCH_WEIGHTS)
+_OLD = ', '.join(f'old.{column}' for column in SEARCH_WEIGHTS)
+
+INDEX_SQL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_COLUMNS}, content='core_api_vendor', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON core_api_vendor BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON core_api_vendor BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF {_COLUMNS} ON core_api_vendor BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW});
+    END""",
+]
+
+DROP_SQL = [
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+TRIGGER_NAMES = {f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update'}
+
+
+def install(connection):
+    """
+    Create the index and its triggers where missing, rebuilding the index
+    if anything had to be created. SQLite's table remake (how Django alters
+    a column) drops the triggers, so this also runs after every migrate.
+    """
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, *sorted(TRIGGER_NAMES)]
+        )
+        if len(cursor.fetchall()) == len(TRIGGER_NAMES) + 1:
+            return False
+        for statement in INDEX_SQL:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def uninstall(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in DROP_SQL:
+            cursor.execute(statement)
+
+
+def parse_terms(text):
+    """Lowercased word terms of free text, at most ``MAX_SEARCH_TERMS``"""
+    return _TERM.findall(text.lower())[:MAX_SEARCH_TERMS]
+
+
+def match_expression(terms):
+    """FTS5 query: every term quoted (so none is syntax), the last one a prefix"""
+    quoted = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= MIN_PREFIX_LENGTH:
+        quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _weights():
+    return ', '.join(str(weight) for weight in SEARCH_WEIGHTS.values())
+
+
+def matching(queryset, terms):
+    """``queryset`` narrowed to vendors matching every term, best match first"""
+    if connections[queryset.db].vendor != 'sqlite':
+        return contains_all(queryset, terms).order_by('-rating', 'id')
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match_expression(terms)],
+        select={'search_rank': f'bm25({FTS_TABLE}, {_weights()})'},
+        order_by=['search_rank', 'id'],
+    )
+
+
+def top_matches(queryset, terms, k):
+    """
+    The ``k`` best matches as a list. Without filters the index is ranked
+    on its own and only the top ``k`` rows are read from the vendor table,
+    which saves one row lookup per match; ties go to the lower id either way.
+    """
+    if connections[queryset.db].vendor != 'sqlite' or queryset.query.has_filters():
+        return list(matching(queryset, terms)[:k])
+    table = queryset.model._meta.db_table
+    sql = (
+        f'SELECT {table}.* FROM ('
+        f'SELECT rowid, bm25({FTS_TABLE}, {_weights()}) AS search_rank FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s ORDER BY search_rank, rowid LIMIT %s'
+        f') AS hits JOIN {table} ON {table}.id = hits.rowid ORDER BY hits.search_rank, hits.rowid'
+    )
+    return list(queryset.model.objects.db_manager(queryset.db).raw(sql, [match_expression(terms), k]))
+
+
+def contains_all(queryset, terms):
+    """Substring match of every term, as the admin search does: a full scan"""
+    for term in terms:
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(description__icontains=term) | Q(address__icontains=term)
+        )
+    return queryset
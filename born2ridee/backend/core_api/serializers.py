@@ -1,8 +1,28 @@
+import math
+
 from rest_framework import serializers
 from .models import Trip, Vendor, EmergencyService, Booking
 
 
-class TripSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """Limit output to the comma-separated ``?fields=`` of the request"""
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return
+        wanted = {name.strip() for name in requested.split(',')}
+        for name in list(self.fields):
+            if name not in wanted:
+                self.fields.pop(name)
+
+
+class TripSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Trip model"""
     
     class Meta:
@@ -15,15 +35,31 @@ class TripCreateSerializer(serializers.Serializer):
     """Serializer for creating a trip with fuel calculation"""
     origin = serializers.CharField(max_length=255)
     destination = serializers.CharField(max_length=255)
-    origin_lat = serializers.FloatField(default=0.0)
-    origin_lng = serializers.FloatField(default=0.0)
-    dest_lat = serializers.FloatField(default=0.0)
-    dest_lng = serializers.FloatField(default=0.0)
-    distance_km = serializers.FloatField()
+    origin_lat = serializers.FloatField(min_value=-90, max_value=90, default=0.0)
+    origin_lng = serializers.FloatField(min_value=-180, max_value=180, default=0.0)
+    dest_lat = serializers.FloatField(min_value=-90, max_value=90, default=0.0)
+    dest_lng = serializers.FloatField(min_value=-180, max_value=180, default=0.0)
+    distance_km = serializers.FloatField(required=False)
     vehicle_type = serializers.ChoiceField(choices=['bike', 'car'])
     stops_visited = serializers.ListField(child=serializers.DictField(), required=False, default=list)
 
 
+class RouteQuerySerializer(serializers.Serializer):
+    """Serializer for road route queries"""
+    origin_lat = serializers.FloatField(min_value=-90, max_value=90)
+    origin_lng = serializers.FloatField(min_value=-180, max_value=180)
+    dest_lat = serializers.FloatField(min_value=-90, max_value=90)
+    dest_lng = serializers.FloatField(min_value=-180, max_value=180)
+    metric = serializers.ChoiceField(choices=['distance', 'time'], default='distance')
+
+
+class PlaceQuerySerializer(serializers.Serializer):
+    """Serializer for place autocomplete queries"""
+    q = serializers.CharField(max_length=100)
+    k = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    kind = serializers.MultipleChoiceField(choices=['town', 'junction', 'landmark'], required=False)
+
+
 class FuelCalculationSerializer(serializers.Serializer):
     """Serializer for fuel cost calculation request"""
     distance_km = serializers.FloatField(min_value=0)
@@ -31,6 +67,70 @@ class FuelCalculationSerializer(serializers.Serializer):
     fuel_price = serializers.FloatField(min_value=0, default=104.0)  # Default petrol price
 
 
+class FloatArrayField(serializers.Field):
+    """
+    List of finite, non-negative floats validated in one pass.
+
+    Much cheaper than ``ListField(child=FloatField())`` for large batches,
+    which runs the full field machinery per element.
+    """
+    default_error_messages = {
+        'invalid': 'Expected a list of numbers.',
+        'negative': 'Values must be non-negative.',
+        'not_finite': 'Values must be finite.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            self.fail('invalid')
+        try:
+            values = [float(value) for value in data]
+        except (TypeError, ValueError):
+            self.fail('invalid')
+        if values and min(values) < 0:
+            self.fail('negative')
+        if not all(map(math.isfinite, values)):
+            self.fail('not_finite')
+        return values
+
+    def to_representation(self, value):
+        return value
+
+
+class FuelBatchSerializer(serializers.Serializer):
+    """Serializer for batch fuel cost calculation requests"""
+    MAX_ITEMS = 1000000
+    VEHICLE_TYPES = ('bike', 'car')
+
+    distance_km = FloatArrayField()
+    vehicle_type = serializers.JSONField()
+    fuel_price = serializers.JSONField(default=104.0)
+
+    def validate_vehicle_type(self, value):
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list) or not all(isinstance(item, str) and item in self.VEHICLE_TYPES for item in value):
+            raise serializers.ValidationError(f"Expected one of {', '.join(self.VEHICLE_TYPES)} or a list of them.")
+        return value
+
+    def validate_fuel_price(self, value):
+        scalar = not isinstance(value, list)
+        return FloatArrayField().run_validation([value] if scalar else value)
+
+    def validate(self, attrs):
+        """Broadcast single values and require equal lengths"""
+        count = len(attrs['distance_km'])
+        if count > self.MAX_ITEMS:
+            raise serializers.ValidationError(f'At most {self.MAX_ITEMS} items per batch.')
+        for name in ('vehicle_type', 'fuel_price'):
+            values = attrs[name]
+            if len(values) == 1 and count != 1:
+                attrs[name] = values * count
+            elif len(values) != count:
+                raise serializers.ValidationError({name: 'Must be a single value or match the length of distance_km.'})
+        return attrs
+
+
 class FuelCalculationResponseSerializer(serializers.Serializer):
     """Serializer for fuel cost calculation response"""
     distance_km = serializers.FloatField()
@@ -41,7 +141,90 @@ class FuelCalculationResponseSerializer(serializers.Serializer):
     total_fuel_cost = serializers.FloatField()
 
 
-class VendorSerializer(serializers.ModelSerializer):
+class PolylineField(serializers.Field):
+    """Route as a list of [lat, lng] pairs, or a "lat,lng;lat,lng" string"""
+    default_error_messages = {
+        'invalid': 'Expected a list of [lat, lng] pairs or "lat,lng;lat,lng".',
+        'too_short': 'Expected at least {min_points} points.',
+        'too_long': 'Expected at most {max_points} points.',
+        'out_of_range': 'Points need a lat within -90..90 and a lng within -180..180.',
+    }
+
+    def __init__(self, min_points=2, max_points=1000, **kwargs):
+        self.min_points = min_points
+        self.max_points = max_points
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [pair.split(',') for pair in data.split(';') if pair.strip()]
+        try:
+            points = [(float(lat), float(lng)) for lat, lng in data]
+        except (TypeError, ValueError):
+            self.fail('invalid')
+        if len(points) < self.min_points:
+            self.fail('too_short', min_points=self.min_points)
+        if len(points) > self.max_points:
+            self.fail('too_long', max_points=self.max_points)
+        # Also false for nan
+        if not all(-90 <= lat <= 90 and -180 <= lng <= 180 for lat, lng in points):
+            self.fail('out_of_range')
+        return points
+
+    def to_representation(self, value):
+        return [list(point) for point in value]
+
+
+class CorridorQuerySerializer(serializers.Serializer):
+    """Serializer for vendor search along a route corridor"""
+    polyline = PolylineField(required=False)
+    trip = serializers.PrimaryKeyRelatedField(queryset=Trip.objects.all(), required=False)
+    origin_lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    origin_lng = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    dest_lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    dest_lng = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    buffer_km = serializers.FloatField(min_value=0, max_value=50, default=5.0)
+    type = serializers.ChoiceField(choices=Vendor.VENDOR_TYPES, required=False)
+
+    MAX_ROUTE_KM = 5000
+
+    def validate(self, attrs):
+        """Resolve the route, falling back to a straight origin → destination line"""
+        trip = attrs.get('trip')
+        ends = ['origin_lat', 'origin_lng', 'dest_lat', 'dest_lng']
+        if 'polyline' in attrs:
+            pass
+        elif trip is not None:
+            attrs['polyline'] = [(trip.origin_lat, trip.origin_lng), (trip.dest_lat, trip.dest_lng)]
+        elif all(key in attrs for key in ends):
+            attrs['polyline'] = [(attrs['origin_lat'], attrs['origin_lng']), (attrs['dest_lat'], attrs['dest_lng'])]
+        else:
+            raise serializers.ValidationError('Provide a polyline, a trip, or origin and destination coordinates.')
+
+        # The corridor search walks the route in short pieces
+        from .spatial import haversine_km
+        points = attrs['polyline']
+        if sum(haversine_km(*a, *b) for a, b in zip(points, points[1:])) > self.MAX_ROUTE_KM:
+            raise serializers.ValidationError(f'Routes can be at most {self.MAX_ROUTE_KM} km long.')
+        return attrs
+
+
+class DistanceMatrixSerializer(serializers.Serializer):
+    """Serializer for origin × destination distance matrix requests"""
+    MAX_CELLS = 2500
+
+    origins = PolylineField(min_points=1, max_points=MAX_CELLS)
+    destinations = PolylineField(min_points=1, max_points=MAX_CELLS)
+    fuel_price = serializers.FloatField(min_value=0, default=104.0)
+
+    def validate(self, attrs):
+        cells = len(attrs['origins']) * len(attrs['destinations'])
+        if cells > self.MAX_CELLS:
+            raise serializers.ValidationError(f'At most {self.MAX_CELLS} origin/destination pairs per request.')
+        return attrs
+
+
+class VendorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Vendor model"""
     vendor_type_display = serializers.CharField(source='get_vendor_type_display', read_only=True)
     source_display = serializers.CharField(source='get_source_display', read_only=True)
@@ -51,7 +234,7 @@ class VendorSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Booking model"""
     vendor_name = serializers.CharField(source='vendor.name', read_only=True)
     
@@ -60,7 +243,7 @@ class BookingSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class EmergencyServiceSerializer(serializers.ModelSerializer):
+class EmergencyServiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for EmergencyService model"""
     service_type_display = serializers.CharField(source='get_service_type_display', read_only=True)
     
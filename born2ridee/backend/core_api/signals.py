@@ -0,0 +1,83 @@
+"""
+Signal handlers keeping caches and rollups in step with the database
+"""
+from django.db import connections
+from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import EmergencyService, Trip, Vendor
+from . import availability, response_cache, rollups, search
+from .packs import emergency_packs
+from .spatial import emergency_index, vendor_index
+
+
+@receiver(post_save, sender=Vendor)
+@receiver(post_delete, sender=Vendor)
+def invalidate_vendor_lists(sender, **kwargs):
+    response_cache.invalidate('vendors')
+
+
+@receiver(post_save, sender=Vendor)
+def move_vendor_in_index(sender, instance, created, update_fields=None, **kwargs):
+    """Move the vendor's point in the spatial index if its position or type changed"""
+    vendor_index.row_saved(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Vendor)
+def remove_vendor_from_index(sender, instance, **kwargs):
+    vendor_index.row_deleted(instance)
+
+
+@receiver(post_init, sender=Vendor)
+def remember_vendor_fields(sender, instance, **kwargs):
+    availability.remember(instance)
+    vendor_index.remember(instance)
+
+
+@receiver(post_save, sender=Vendor)
+def publish_vendor_availability(sender, instance, created, **kwargs):
+    """Push changed availability fields to the change feed"""
+    availability.vendor_saved(instance, created)
+
+
+@receiver(post_delete, sender=Vendor)
+def publish_vendor_removal(sender, instance, **kwargs):
+    availability.vendor_deleted(instance)
+
+
+@receiver(post_save, sender=EmergencyService)
+@receiver(post_delete, sender=EmergencyService)
+def invalidate_emergency_index(sender, **kwargs):
+    """Drop the emergency service index, its payloads, the offline packs and cached lists"""
+    emergency_index.invalidate()
+    emergency_packs.invalidate()
+    response_cache.invalidate('emergency')
+
+
+@receiver(post_init, sender=Trip)
+def remember_trip_totals(sender, instance, **kwargs):
+    rollups.remember(instance)
+
+
+@receiver(pre_save, sender=Trip)
+@receiver(pre_delete, sender=Trip)
+def load_stored_trip_totals(sender, instance, **kwargs):
+    rollups.load_stored(instance)
+
+
+@receiver(post_save, sender=Trip)
+def update_trip_rollups(sender, instance, created, **kwargs):
+    """Add a created trip to the analytics rollups, or move a changed one"""
+    rollups.trip_saved(instance, created)
+
+
+@receiver(post_delete, sender=Trip)
+def remove_trip_from_rollups(sender, instance, **kwargs):
+    rollups.trip_deleted(instance)
+
+
+@receiver(post_migrate)
+def install_search_index(sender, using, **kwargs):
+    """Restore the vendor search triggers if a table remake dropped them"""
+    if sender.name == 'core_api':
+        search.install(connections[using])
@@ -0,0 +1,544 @@
+"""
+In-process spatial indexes for nearest-vendor and nearest-service lookups
+"""
+import heapq
+import math
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .models import EmergencyService, Vendor
+from .serializers import EmergencyServiceSerializer
+
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def valid_point(lat, lng):
+    """True for a finite latitude in -90..90 and longitude in -180..180"""
+    return -90 <= lat <= 90 and -180 <= lng <= 180
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates in kilometers"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """
+    Uniform lat/lng grid over points.
+
+    Points are bucketed into square cells of ``cell_deg`` degrees. Queries
+    visit cells in expanding rings around the query point and stop as soon
+    as no unvisited cell can hold a closer point than the current k-th best.
+
+    A cell holding more than ``split ** 2`` points, as city centres do in a
+    large table, is also bucketed into ``split`` x ``split`` blocks. Nearest
+    lookups visit each ring's cells, and a crowded cell's blocks, closest
+    first and skip the ones that cannot beat the current k-th best instead
+    of measuring every point.
+
+    :meth:`insert` and :meth:`discard` change an index that is already
+    serving queries: they replace a cell's point list and blocks instead
+    of mutating them, so a concurrent query sees the cell either before or
+    after the change. Bounds only grow, which costs at most a few empty
+    ring visits after points leave the edge of the grid.
+    """
+
+    def __init__(self, cell_deg=0.1, split=8):
+        self.cell_deg = cell_deg
+        self.split = split
+        self.cells = {}
+        self.blocks = {}
+        self.size = 0
+        self._bounds = None
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg))
+
+    def _block(self, cell, point):
+        s = self.split
+        a = min(s - 1, max(0, int((point[1] / self.cell_deg - cell[0]) * s)))
+        b = min(s - 1, max(0, int((point[2] / self.cell_deg - cell[1]) * s)))
+        return a, b
+
+    def _add_to_block(self, cell, point):
+        self.blocks[cell].setdefault(self._block(cell, point), []).append(point)
+
+    def _extend_bounds(self, cell):
+        b = self._bounds
+        if b is None:
+            self._bounds = [cell[0], cell[0], cell[1], cell[1]]
+        else:
+            self._bounds = [min(b[0], cell[0]), max(b[1], cell[0]), min(b[2], cell[1]), max(b[3], cell[1])]
+
+    def _replace_cell(self, cell, points):
+        """Swap in a new point list for ``cell``, with fresh blocks if it is crowded"""
+        if len(points) > self.split ** 2:
+            blocks = {}
+            for point in points:
+                blocks.setdefault(self._block(cell, point), []).append(point)
+            self.blocks[cell] = blocks
+        else:
+            self.blocks.pop(cell, None)
+        if points:
+            self.cells[cell] = points
+        else:
+            self.cells.pop(cell, None)
+
+    def add(self, pk, lat, lng, kind=None):
+        """Insert a point; ``kind`` is an optional tag usable as a query filter"""
+        cell = self._cell(lat, lng)
+        point = (pk, lat, lng, kind)
+        points = self.cells.setdefault(cell, [])
+        points.append(point)
+        if cell in self.blocks:
+            self._add_to_block(cell, point)
+        elif len(points) > self.split ** 2:
+            self.blocks[cell] = {}
+            for point in points:
+                self._add_to_block(cell, point)
+        self.size += 1
+        self._extend_bounds(cell)
+
+    def insert(self, pk, lat, lng, kind=None):
+        """``add`` for a serving index; a point already stored for ``pk`` in that cell is replaced"""
+        cell = self._cell(lat, lng)
+        points = self.cells.get(cell, ())
+        kept = [point for point in points if point[0] != pk]
+        self._replace_cell(cell, kept + [(pk, lat, lng, kind)])
+        self.size += 1 - (len(points) - len(kept))
+        self._extend_bounds(cell)
+
+    def discard(self, pk, lat, lng):
+        """Remove the point stored for ``pk`` at ``lat``/``lng``; returns whether there was one"""
+        cell = self._cell(lat, lng)
+        points = self.cells.get(cell, ())
+        kept = [point for point in points if point[0] != pk]
+        if len(kept) == len(points):
+            return False
+        self._replace_cell(cell, kept)
+        self.size -= len(points) - len(kept)
+        return True
+
+    def _first_ring(self, ci, cj):
+        """Chebyshev distance from a cell to the nearest occupied row or column of the bounds"""
+        b = self._bounds
+        return max(0, b[0] - ci, ci - b[1], b[2] - cj, cj - b[3])
+
+    def _ring(self, ci, cj, r):
+        """
+        Yield the cells on the square ring at Chebyshev distance ``r`` that
+        lie within the bounds, so rings far from every point cost nothing
+        """
+        lo_i, hi_i, lo_j, hi_j = self._bounds
+        if r == 0:
+            if lo_i <= ci <= hi_i and lo_j <= cj <= hi_j:
+                yield (ci, cj)
+            return
+        j_range = range(max(cj - r, lo_j), min(cj + r, hi_j) + 1)
+        for i in (ci - r, ci + r):
+            if lo_i <= i <= hi_i:
+                for j in j_range:
+                    yield (i, j)
+        i_range = range(max(ci - r + 1, lo_i), min(ci + r - 1, hi_i) + 1)
+        for j in (cj - r, cj + r):
+            if lo_j <= j <= hi_j:
+                for i in i_range:
+                    yield (i, j)
+
+    def _covered_km(self, lat, lng, ci, cj, r):
+        """Lower bound on the distance to any point outside rings ``0..r``"""
+        lat_lo = (ci - r) * self.cell_deg
+        lat_hi = (ci + r + 1) * self.cell_deg
+        lng_lo = (cj - r) * self.cell_deg
+        lng_hi = (cj + r + 1) * self.cell_deg
+        dlat = min(lat - lat_lo, lat_hi - lat) * KM_PER_DEGREE
+        widest = min(89.9, max(abs(lat_lo), abs(lat_hi)))
+        dlng = min(lng - lng_lo, lng_hi - lng) * KM_PER_DEGREE * math.cos(math.radians(widest))
+        return min(dlat, dlng)
+
+    def _blocks_by_distance(self, lat, lng, cells):
+        """
+        ``(distance_km lower bound, points)`` for the occupied ``cells``,
+        closest first; crowded cells contribute one entry per block
+        """
+        ordered = []
+        for cell in cells:
+            points = self.cells.get(cell)
+            if points is None:
+                continue
+            lat_lo = cell[0] * self.cell_deg
+            lng_lo = cell[1] * self.cell_deg
+            widest = min(89.9, max(abs(lat), abs(lat_lo), abs(lat_lo + self.cell_deg)))
+            kx = KM_PER_DEGREE * math.cos(math.radians(widest))
+            blocks = self.blocks.get(cell)
+            if blocks is not None:
+                deg = self.cell_deg / self.split
+                boxes = [(lat_lo + a * deg, lng_lo + b * deg, block) for (a, b), block in blocks.items()]
+            else:
+                deg = self.cell_deg
+                boxes = [(lat_lo, lng_lo, points)]
+            for box_lat, box_lng, block in boxes:
+                dlat = max(0.0, box_lat - lat, lat - box_lat - deg) * KM_PER_DEGREE
+                dlng = max(0.0, box_lng - lng, lng - box_lng - deg) * kx
+                ordered.append((math.hypot(dlat, dlng), block))
+        ordered.sort(key=lambda entry: entry[0])
+        return ordered
+
+    def _exhausted(self, ci, cj, r):
+        b = self._bounds
+        return ci - r <= b[0] and ci + r >= b[1] and cj - r <= b[2] and cj + r >= b[3]
+
+    def nearest(self, lat, lng, k=10, radius_km=None, kinds=None):
+        """
+        Return up to ``k`` ``(distance_km, pk, kind)`` tuples ordered by distance.
+
+        ``radius_km`` caps the search distance and ``kinds`` restricts the
+        result to points tagged with one of the given kinds.
+        """
+        if not self.size or k <= 0:
+            return []
+        ci, cj = self._cell(lat, lng)
+        best = []  # max-heap of (-distance, pk, kind)
+        r = self._first_ring(ci, cj)
+        limit_km = math.inf if radius_km is None else radius_km
+        while True:
+            for bound, points in self._blocks_by_distance(lat, lng, self._ring(ci, cj, r)):
+                if bound > limit_km or (len(best) == k and bound > -best[0][0]):
+                    break
+                for pk, plat, plng, kind in points:
+                    if kinds is not None and kind not in kinds:
+                        continue
+                    d = haversine_km(lat, lng, plat, plng)
+                    if d > limit_km:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, pk, kind))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, pk, kind))
+            covered = self._covered_km(lat, lng, ci, cj, r)
+            if len(best) == k and -best[0][0] <= covered:
+                break
+            if radius_km is not None and covered >= radius_km:
+                break
+            if self._exhausted(ci, cj, r):
+                break
+            r += 1
+        return sorted((-nd, pk, kind) for nd, pk, kind in best)
+
+    def nearest_by_kind(self, lat, lng, kinds, radius_km=None):
+        """
+        Return ``{kind: (distance_km, pk)}`` with the closest point of each
+        requested kind, found in a single ring search.
+        """
+        best = {}
+        if not self.size:
+            return best
+        kinds = set(kinds)
+        ci, cj = self._cell(lat, lng)
+        r = self._first_ring(ci, cj)
+        while True:
+            for cell in self._ring(ci, cj, r):
+                for pk, plat, plng, kind in self.cells.get(cell, ()):
+                    if kind not in kinds:
+                        continue
+                    d = haversine_km(lat, lng, plat, plng)
+                    if radius_km is not None and d > radius_km:
+                        continue
+                    if kind not in best or d < best[kind][0]:
+                        best[kind] = (d, pk)
+            covered = self._covered_km(lat, lng, ci, cj, r)
+            if len(best) == len(kinds) and max(d for d, _ in best.values()) <= covered:
+                break
+            if radius_km is not None and covered >= radius_km:
+                break
+            if self._exhausted(ci, cj, r):
+                break
+            r += 1
+        return best
+
+    def in_bbox(self, lat_lo, lat_hi, lng_lo, lng_hi, kinds=None):
+        """Yield ``(pk, lat, lng, kind)`` for every point inside the box"""
+        if not self.size:
+            return
+        # Only cells inside the bounds can hold points, however wide the box
+        ci_lo, cj_lo = self._cell(lat_lo, lng_lo)
+        ci_hi, cj_hi = self._cell(lat_hi, lng_hi)
+        b = self._bounds
+        ci_lo, ci_hi, cj_lo, cj_hi = max(ci_lo, b[0]), min(ci_hi, b[1]), max(cj_lo, b[2]), min(cj_hi, b[3])
+        for ci in range(ci_lo, ci_hi + 1):
+            for cj in range(cj_lo, cj_hi + 1):
+                for point in self.cells.get((ci, cj), ()):
+                    _, plat, plng, kind = point
+                    if kinds is not None and kind not in kinds:
+                        continue
+                    if lat_lo <= plat <= lat_hi and lng_lo <= plng <= lng_hi:
+                        yield point
+
+    def within(self, lat, lng, radius_km, kinds=None, limit=None):
+        """
+        Return ``(distance_km, pk, kind)`` for every point within ``radius_km``,
+        unordered, or only the nearest ``limit`` of them.
+
+        Rings are visited as in :meth:`nearest`, stopping once ``limit``
+        points lie within the distance the visited rings cover, and the
+        nearest are selected once at the end. Distances use a local
+        equirectangular projection, as :meth:`corridor` does, which is
+        accurate to well under 1% at ranking radii.
+        """
+        found = []
+        if not self.size:
+            return found
+        kx = KM_PER_DEGREE * math.cos(math.radians(lat))
+        ci, cj = self._cell(lat, lng)
+        r = self._first_ring(ci, cj)
+        while True:
+            for cell in self._ring(ci, cj, r):
+                for pk, plat, plng, kind in self.cells.get(cell, ()):
+                    if kinds is not None and kind not in kinds:
+                        continue
+                    d = math.hypot((plat - lat) * KM_PER_DEGREE, (plng - lng) * kx)
+                    if d <= radius_km:
+                        found.append((d, pk, kind))
+            covered = self._covered_km(lat, lng, ci, cj, r)
+            if covered >= radius_km or self._exhausted(ci, cj, r):
+                break
+            if limit is not None and len(found) >= limit and sum(1 for hit in found if hit[0] <= covered) >= limit:
+                break
+            r += 1
+        if limit is not None and len(found) > limit:
+            found = heapq.nsmallest(limit, found)
+        return found
+
+    def corridor(self, polyline, buffer_km, kinds=None, step_km=10.0):
+        """
+        Return ``(along_km, offset_km, pk, kind)`` for points within
+        ``buffer_km`` of ``polyline``, ordered by position along the route.
+
+        The route is split into pieces of at most ``step_km`` so each piece's
+        buffered bounding box only touches a handful of grid cells. Distances
+        to each piece use a local equirectangular projection, which is
+        accurate to well under 1% at corridor widths.
+        """
+        found = {}
+        along_start = 0.0
+        for (lat1, lng1), (lat2, lng2) in zip(polyline, polyline[1:]):
+            pieces = max(1, math.ceil(haversine_km(lat1, lng1, lat2, lng2) / step_km))
+            for n in range(pieces):
+                a_lat = lat1 + (lat2 - lat1) * n / pieces
+                a_lng = lng1 + (lng2 - lng1) * n / pieces
+                b_lat = lat1 + (lat2 - lat1) * (n + 1) / pieces
+                b_lng = lng1 + (lng2 - lng1) * (n + 1) / pieces
+
+                kx = KM_PER_DEGREE * math.cos(math.radians((a_lat + b_lat) / 2))
+                ky = KM_PER_DEGREE
+                sx = (b_lng - a_lng) * kx
+                sy = (b_lat - a_lat) * ky
+                seg_len2 = sx * sx + sy * sy
+                seg_len = math.sqrt(seg_len2)
+
+                pad_lat = buffer_km / ky
+                widest = min(89.9, max(abs(a_lat), abs(b_lat)) + pad_lat)
+                pad_lng = buffer_km / (KM_PER_DEGREE * math.cos(math.radians(widest)))
+                candidates = self.in_bbox(
+                    min(a_lat, b_lat) - pad_lat, max(a_lat, b_lat) + pad_lat,
+                    min(a_lng, b_lng) - pad_lng, max(a_lng, b_lng) + pad_lng,
+                    kinds=kinds,
+                )
+                for pk, plat, plng, kind in candidates:
+                    px = (plng - a_lng) * kx
+                    py = (plat - a_lat) * ky
+                    t = (px * sx + py * sy) / seg_len2 if seg_len2 else 0.0
+                    t = min(1.0, max(0.0, t))
+                    offset = math.hypot(px - t * sx, py - t * sy)
+                    if offset > buffer_km:
+                        continue
+                    seen = found.get(pk)
+                    if seen is None or offset < seen[1]:
+                        found[pk] = (along_start + t * seg_len, offset, pk, kind)
+                along_start += seg_len
+        return sorted(found.values())
+
+
+class ModelIndex:
+    """
+    Lazily built :class:`GridIndex` over a model's latitude/longitude columns.
+
+    The app's signal handlers keep a built index in step with rows saved
+    or deleted in this process: :meth:`row_saved` and :meth:`row_deleted`
+    move the row's point after commit, and a save that leaves the position
+    and kind alone, such as an availability change, costs nothing. When a
+    row's old position is unknown, and for indexes with payloads, the
+    index is instead rebuilt on the next query after :meth:`invalidate`.
+
+    When ``serializer_class`` is given, every row is also serialized once
+    at build time into ``payloads`` so lookups can answer without touching
+    the database. With ``dense_rows``, a table with more rows than that
+    gets cells narrowed by ``sqrt(dense_rows / rows)``, so city cells stay
+    small at a million rows and sparse tables keep short ring searches.
+    """
+
+    def __init__(self, model, kind_field, cell_deg=0.1, serializer_class=None, dense_rows=None):
+        self.model = model
+        self.kind_field = kind_field
+        self.cell_deg = cell_deg
+        self.serializer_class = serializer_class
+        self.dense_rows = dense_rows
+        self._index = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, **kwargs):
+        self._generation += 1
+        self._index = None
+
+    def _position(self, instance):
+        """``(lat, lng, kind)`` of a model instance, or ``None`` if any was not loaded"""
+        values = instance.__dict__
+        fields = ('latitude', 'longitude', self.kind_field)
+        if all(name in values for name in fields):
+            return tuple(values[name] for name in fields)
+        return None
+
+    def remember(self, instance):
+        """Record the indexed fields as loaded, to find what a save moved"""
+        instance._indexed = self._position(instance)
+
+    def move(self, pk, old, new):
+        """
+        Move ``pk`` from ``old`` to ``new`` ``(lat, lng, kind)`` in the built
+        index; either may be ``None`` for a created or deleted row
+        """
+        with self._lock:
+            index = self._index
+            if index is None:
+                # A build in progress may have read the row before the change
+                self._generation += 1
+                return
+            if self.serializer_class is not None or (old is not None and not index.discard(pk, *old[:2])):
+                self.invalidate()
+                return
+            if new is not None:
+                index.insert(pk, *new)
+
+    def row_saved(self, instance, created, update_fields=None):
+        """Apply a saved row's change of position or kind to the index after commit"""
+        fields = {'latitude', 'longitude', self.kind_field}
+        if update_fields is not None and not fields & set(update_fields):
+            return
+        old = None if created else getattr(instance, '_indexed', None)
+        new = self._position(instance)
+        self.remember(instance)
+        if new is None or (not created and old is None):
+            transaction.on_commit(self.invalidate)
+            return
+        if old == new:
+            return
+        pk = instance.pk
+        transaction.on_commit(lambda: self.move(pk, old, new))
+
+    def row_deleted(self, instance):
+        """Remove a deleted row from the index after commit"""
+        old = getattr(instance, '_indexed', None) or self._position(instance)
+        if old is None:
+            transaction.on_commit(self.invalidate)
+            return
+        pk = instance.pk
+        transaction.on_commit(lambda: self.move(pk, old, None))
+
+    def cell_deg_for(self, rows):
+        """Cell size of the index over ``rows`` rows"""
+        if self.dense_rows and rows > self.dense_rows:
+            return self.cell_deg * math.sqrt(self.dense_rows / rows)
+        return self.cell_deg
+
+    def build(self):
+        cell_deg = self.cell_deg
+        if self.dense_rows:
+            cell_deg = self.cell_deg_for(self.model.objects.count())
+        index = GridIndex(cell_deg)
+        index.payloads = {}
+        if self.serializer_class is None:
+            rows = self.model.objects.values_list('pk', 'latitude', 'longitude', self.kind_field)
+            for pk, lat, lng, kind in rows.iterator(chunk_size=10000):
+                index.add(pk, lat, lng, kind)
+            return index
+        for obj in self.model.objects.all().iterator(chunk_size=10000):
+            index.add(obj.pk, obj.latitude, obj.longitude, getattr(obj, self.kind_field))
+            index.payloads[obj.pk] = self.serializer_class(obj).data
+        return index
+
+    def get(self):
+        index = self._index
+        if index is None:
+            with self._lock:
+                index = self._index
+                if index is None:
+                    generation = self._generation
+                    index = self.build()
+                    if generation == self._generation:
+                        self._index = index
+        return index
+
+    async def aget(self):
+        """``get()`` for async views; a missing index is built in the sync thread"""
+        index = self._index
+        if index is None:
+            index = await sync_to_async(self.get)()
+        return index
+
+    def use(self, index):
+        """Serve lookups from a prebuilt index, e.g. a synthetic one in benchmarks"""
+        with self._lock:
+            self._generation += 1
+            self._index = index
+
+    def nearest(self, lat, lng, k=10, radius_km=None, kinds=None):
+        return self.get().nearest(lat, lng, k=k, radius_km=radius_km, kinds=kinds)
+
+    def within(self, lat, lng, radius_km, kinds=None, limit=None):
+        return self.get().within(lat, lng, radius_km, kinds=kinds, limit=limit)
+
+    def corridor(self, polyline, buffer_km, kinds=None):
+        return self.get().corridor(polyline, buffer_km, kinds=kinds)
+
+
+vendor_index = ModelIndex(Vendor, 'vendor_type', dense_rows=20000)
+
+# Emergency services are sparse, so coarser cells keep ring searches short
+emergency_index = ModelIndex(
+    EmergencyService, 'service_type', cell_deg=0.25,
+    serializer_class=EmergencyServiceSerializer
+)
+
+
+def nearest_emergency_services(lat, lng, service_types=None, radius_km=None, index=None):
+    """
+    Return ``{service_type: payload}`` with the closest service of each type.
+
+    Payloads are the precomputed ``EmergencyServiceSerializer`` output plus
+    ``distance_km``; types with no service in range map to ``None``. Async
+    callers pass the ``index`` they got from ``emergency_index.aget()``.
+    """
+    if service_types is None:
+        service_types = [key for key, _ in EmergencyService.SERVICE_TYPES]
+    if index is None:
+        index = emergency_index.get()
+    best = index.nearest_by_kind(lat, lng, service_types, radius_km=radius_km)
+    result = {}
+    for service_type in service_types:
+        hit = best.get(service_type)
+        if hit is None:
+            result[service_type] = None
+            continue
+        distance, pk = hit
+        result[service_type] = {**index.payloads[pk], 'distance_km': round(distance, 3)}
+    return result
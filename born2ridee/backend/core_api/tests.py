@@ -1,3 +1,1596 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import runpy
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.models import F, Sum
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from born2ride import settings as project_settings
+
+from . import availability, database, datagen, metrics, rollups
+from .fastpath import FastListMixin
+from .loadtest import scratch_database
+from .models import (
+    Booking, EmergencyService, RoomNight, RouteCacheEntry, Trip, TripDailyRollup, TripRouteRollup, Vendor,
+)
+from .routing import get_graph
+from .packs import decode_pack, emergency_packs, pack_region
+from .places import PlaceIndex
+from .reservations import ACTIVE_STATUSES, RoomsUnavailable, booking_nights, reserve_nights
+from .route_cache import RouteCache, route_key
+from .serializers import BookingSerializer, EmergencyServiceSerializer
+from .spatial import GridIndex, emergency_index, haversine_km, vendor_index
+
+
+class QueryCountMixin:
+    """
+    Every read endpoint runs a fixed number of SQL queries, however many rows
+    the page holds. Subclasses repeat the checks at different dataset sizes,
+    so a per-row query (an N+1) shows up as a changed count.
+    """
+    size = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(vendors=cls.size * 3, emergency=cls.size, trips=cls.size, bookings=cls.size, seed=7)
+
+    def setUp(self):
+        # List responses are cached across requests and tests
+        cache.clear()
+
+    def assertQueries(self, count, url):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_trips(self):
+        self.assertQueries(1, reverse('trip-list') + '?page_size=500')
+        self.assertQueries(1, reverse('trip-detail', args=[Trip.objects.first().pk]))
+        self.assertQueries(1, reverse('trip-export'))
+
+    def test_vendors(self):
+        self.assertQueries(1, reverse('vendor-list') + '?page_size=500')
+        self.assertQueries(1, reverse('vendor-detail', args=[Vendor.objects.first().pk]))
+
+    def test_vendors_nearby(self):
+        url = reverse('vendor-nearby') + '?lat=11&lng=78&radius_km=1000&k=100'
+        # The first call builds the in-memory spatial index
+        self.client.get(url)
+        self.assertQueries(1, url)
+
+    def test_vendor_search(self):
+        self.assertQueries(1, reverse('vendor-search') + '?q=near&k=100')
+
+    def test_vendors_best(self):
+        url = reverse('vendor-list') + '?sort=best&lat=11&lng=78&radius_km=1000&k=100'
+        self.client.get(url)
+        # The candidates' scoring columns, then the rows of the best k
+        self.assertQueries(2, url)
+
+    def test_bookings(self):
+        self.assertQueries(1, reverse('booking-list') + '?page_size=500')
+        self.assertQueries(1, reverse('booking-detail', args=[Booking.objects.first().pk]))
+        self.assertQueries(1, reverse('booking-export'))
+
+    def test_emergency_services(self):
+        self.assertQueries(1, reverse('emergency-list') + '?page_size=500')
+        self.assertQueries(1, reverse('emergency-detail', args=[EmergencyService.objects.first().pk]))
+
+    def test_booking_list_matches_serializer(self):
+        response = self.assertQueries(1, reverse('booking-list') + '?page_size=500')
+        expected = BookingSerializer(Booking.objects.order_by('-id')[:500], many=True).data
+        self.assertEqual(json.loads(response.content)['results'], json.loads(json.dumps(expected)))
+
+
+class SingleRowQueryCountTests(QueryCountMixin, TestCase):
+    size = 1
+
+
+class PageQueryCountTests(QueryCountMixin, TestCase):
+    size = 40
+
+
+class MultiPageQueryCountTests(QueryCountMixin, TestCase):
+    size = 600
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite syntax')
+class QueryPlanTests(TestCase):
+    """
+    Every query behind the list, cursor, filter and windowed-export paths is
+    answered from an index. A plain ``SCAN`` of a table is only accepted for
+    a ``LIMIT`` query with no sort step, which walks the primary key in
+    order and stops after one page.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(vendors=600, emergency=200, trips=600, bookings=300, seed=7)
+
+    def setUp(self):
+        cache.clear()
+
+    def problems(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            steps = [row[3] for row in cursor.fetchall()]
+        return [
+            step for step in steps
+            if 'TEMP B-TREE' in step
+            or (step.startswith('SCAN ') and ' USING ' not in step and ' LIMIT ' not in sql)
+        ]
+
+    def assertIndexed(self, url):
+        """Check every query of ``url``; returns the decoded response body"""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+        self.assertEqual(response.status_code, 200, url)
+        self.assertTrue(queries.captured_queries, url)
+        for query in queries.captured_queries:
+            self.assertEqual(self.problems(query['sql']), [], f'{url}: {query["sql"]}')
+        return body
+
+    def assertPagesIndexed(self, url):
+        """The first page and the cursor page after it"""
+        page = json.loads(self.assertIndexed(url))
+        self.assertIsNotNone(page['next'], url)
+        self.assertIndexed(page['next'])
+
+    def test_trip_list(self):
+        self.assertPagesIndexed(reverse('trip-list'))
+
+    def test_vendor_lists(self):
+        url = reverse('vendor-list')
+        for query in ('', '?type=hotel', '?is_open=true', '?source=direct', '?type=food&is_open=true',
+                      '?type=food&is_open=false&source=direct'):
+            with self.subTest(query=query):
+                self.assertPagesIndexed(url + query + ('&' if query else '?') + 'page_size=10')
+
+    def test_booking_list(self):
+        self.assertPagesIndexed(reverse('booking-list') + '?page_size=10')
+
+    def test_emergency_lists(self):
+        url = reverse('emergency-list')
+        self.assertPagesIndexed(url + '?page_size=10')
+        self.assertPagesIndexed(url + '?type=hospital&page_size=10')
+
+    def test_details(self):
+        self.assertIndexed(reverse('trip-detail', args=[Trip.objects.first().pk]))
+        self.assertIndexed(reverse('vendor-detail', args=[Vendor.objects.first().pk]))
+        self.assertIndexed(reverse('booking-detail', args=[Booking.objects.first().pk]))
+        self.assertIndexed(reverse('emergency-detail', args=[EmergencyService.objects.first().pk]))
+
+    def test_windowed_exports(self):
+        for url in (
+            reverse('trip-export') + '?from=2026-01-01&to=2026-03-01',
+            reverse('booking-export') + '?from=2026-01-01',
+            reverse('booking-export') + '?status=pending',
+            reverse('booking-export') + '?status=confirmed&to=2026-06-30',
+        ):
+            with self.subTest(url=url):
+                self.assertIndexed(url)
+
+    def test_default_orderings(self):
+        for queryset in (Trip.objects.all()[:50], Vendor.objects.all()[:50], EmergencyService.objects.all()[:50]):
+            with self.subTest(model=queryset.model.__name__):
+                self.assertEqual(self.problems(str(queryset.query)), [])
+
+
+class GridIndexTests(unittest.TestCase):
+    """Ring searches agree with a brute-force scan, crowded cells included"""
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.index = GridIndex(0.05, split=4)
+        self.points = []
+        for pk in range(2000):
+            # Half the points crowd one town so its cells are split into blocks
+            spread = 0.01 if pk % 2 else 0.5
+            lat, lng = 11 + rng.gauss(0, spread), 78 + rng.gauss(0, spread)
+            self.points.append((pk, lat, lng))
+            self.index.add(pk, lat, lng, 'food' if pk % 3 else 'hotel')
+        self.assertTrue(self.index.blocks)
+
+    def brute_force(self, lat, lng, k, radius_km=None, kinds=None):
+        found = sorted(
+            (haversine_km(lat, lng, plat, plng), pk) for pk, plat, plng in self.points
+            if kinds is None or ('food' if pk % 3 else 'hotel') in kinds
+        )
+        return [pk for d, pk in found if radius_km is None or d <= radius_km][:k]
+
+    def test_nearest_matches_brute_force(self):
+        for lat, lng, k, radius_km, kinds in (
+            (11, 78, 25, None, None), (11.005, 77.995, 10, 2, None), (11.3, 78.4, 50, 30, {'hotel'}),
+            (12.5, 79.5, 5, None, None), (11, 78, 5, 0.001, None), (10.2, 77.1, 30, 100, {'food'}),
+        ):
+            with self.subTest(lat=lat, lng=lng, k=k):
+                found = self.index.nearest(lat, lng, k=k, radius_km=radius_km, kinds=kinds)
+                self.assertEqual([pk for _, pk, _ in found], self.brute_force(lat, lng, k, radius_km, kinds))
+
+    def test_far_away_query_skips_empty_rings(self):
+        # Rings out to 2000 km of 0.05 degree cells would be millions of cells without clipping to the data
+        self.assertEqual(self.index.nearest(25, 90, k=3, radius_km=1000), [])
+        self.assertEqual([pk for _, pk, _ in self.index.nearest(25, 90, k=3)], self.brute_force(25, 90, 3))
+
+    def test_cells_narrow_for_large_tables(self):
+        self.assertEqual(vendor_index.cell_deg_for(100), vendor_index.cell_deg)
+        self.assertAlmostEqual(vendor_index.cell_deg_for(vendor_index.dense_rows * 100), vendor_index.cell_deg / 10)
+
+    def test_insert_and_discard_match_brute_force(self):
+        rng = random.Random(4)
+        points = {pk: (lat, lng) for pk, lat, lng in self.points}
+        for pk in rng.sample(sorted(points), 600):
+            self.assertTrue(self.index.discard(pk, *points[pk]))
+            if pk % 4:
+                # Moves keep crowding the town, so blocks are rebuilt and dropped as cells change
+                points[pk] = (11 + rng.gauss(0, 0.01), 78 + rng.gauss(0, 0.01))
+                self.index.insert(pk, *points[pk], 'food' if pk % 3 else 'hotel')
+            else:
+                del points[pk]
+        self.assertFalse(self.index.discard(1, 45, 45))
+        self.index.insert(5000, 13, 80, 'hotel')
+        points[5000] = (13, 80)
+        self.points = [(pk, lat, lng) for pk, (lat, lng) in points.items()]
+        self.assertEqual(self.index.size, len(points))
+        for lat, lng, k, radius_km, kinds in (
+            (11, 78, 25, None, None), (11.3, 78.4, 50, 30, {'hotel'}), (13, 80, 3, None, None),
+        ):
+            with self.subTest(lat=lat, lng=lng, k=k):
+                found = self.index.nearest(lat, lng, k=k, radius_km=radius_km, kinds=kinds)
+                self.assertEqual([pk for _, pk, _ in found], self.brute_force(lat, lng, k, radius_km, kinds))
+
+
+class VendorIndexUpdateTests(TestCase):
+    """Saved and deleted vendors move in the built index instead of dropping it"""
+
+    def setUp(self):
+        self.vendor = Vendor.objects.create(
+            name='Lodge', address='NH 44', latitude=11, longitude=78, phone='1', vendor_type='hotel'
+        )
+        vendor_index.invalidate()
+        self.index = vendor_index.get()
+
+    def nearest(self, lat, lng):
+        return [pk for _, pk, _ in vendor_index.nearest(lat, lng, k=5)]
+
+    def test_availability_save_keeps_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor = Vendor.objects.get(pk=self.vendor.pk)
+            vendor.rooms_available = 3
+            vendor.is_open = False
+            vendor.save()
+        self.assertIs(vendor_index.get(), self.index)
+
+    def test_moves_creates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor = Vendor.objects.get(pk=self.vendor.pk)
+            vendor.latitude, vendor.longitude = 12, 79
+            vendor.save()
+        self.assertEqual(self.nearest(12, 79), [vendor.pk])
+        self.assertEqual(vendor_index.nearest(11, 78, k=5, radius_km=50), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor.vendor_type = 'food'
+            vendor.save()
+            other = Vendor.objects.create(
+                name='Dhaba', address='NH 44', latitude=11, longitude=78, phone='2', vendor_type='food'
+            )
+        self.assertEqual(vendor_index.nearest(12, 79, k=5, kinds={'food'})[0][1:], (vendor.pk, 'food'))
+        self.assertEqual(self.nearest(11, 78), [other.pk, vendor.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor.delete()
+        self.assertEqual(self.nearest(12, 79), [other.pk])
+        self.assertIs(vendor_index.get(), self.index)
+
+    def test_rolled_back_save_leaves_the_index(self):
+        with transaction.atomic():
+            Vendor.objects.filter(pk=self.vendor.pk).update(latitude=12)
+            vendor = Vendor.objects.get(pk=self.vendor.pk)
+            vendor.latitude = 13
+            vendor.save()
+            transaction.set_rollback(True)
+        self.assertEqual(self.nearest(11, 78), [self.vendor.pk])
+
+    def test_unknown_position_rebuilds(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            vendor = Vendor.objects.defer('latitude').get(pk=self.vendor.pk)
+            vendor.longitude = 79
+            vendor.save(update_fields=['longitude'])
+        self.assertIsNot(vendor_index.get(), self.index)
+        self.assertEqual(self.nearest(11, 79), [vendor.pk])
+
+
+class NearbyValidationTests(TestCase):
+    """Coordinates outside the globe are a 400, never a runaway search"""
+
+    def test_bad_coordinates(self):
+        for query in (
+            '?lat=1e300&lng=78', '?lat=11&lng=1e300', '?lat=nan&lng=78', '?lat=11&lng=inf', '?lat=91&lng=78',
+            '?lat=11&lng=-180.5', '?lat=11&lng=78&radius_km=nan', '?lat=11&lng=78&radius_km=inf',
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('vendor-nearby') + query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', json.loads(response.content))
+
+    def test_bad_emergency_coordinates(self):
+        for query in ('?lat=1e300&lng=78', '?lat=nan&lng=78', '?lat=11&lng=-inf', '?lat=11&lng=78&radius_km=nan'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('emergency-nearest') + query).status_code, 400)
+
+    def test_edges_of_the_globe(self):
+        for name in ('vendor-nearby', 'emergency-nearest'):
+            for query in ('?lat=90&lng=180', '?lat=-90&lng=-180'):
+                with self.subTest(name=name, query=query):
+                    self.assertEqual(self.client.get(reverse(name) + query).status_code, 200)
+
+
+class CorridorTests(TestCase):
+    """Vendors along a route come back in route order; bad routes are a 400"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ids = [
+            Vendor.objects.create(
+                name='Vendor', address='NH 44', latitude=lat, longitude=78.01, phone='1', vendor_type='food'
+            ).pk
+            for lat in (11.5, 11.1, 11.3)
+        ]
+        # Saves reach a built index on commit, which a TestCase never gets to
+        vendor_index.invalidate()
+
+    def test_vendors_in_route_order(self):
+        response = self.client.get(reverse('vendor-corridor') + '?polyline=11,78;12,78&buffer_km=2')
+        self.assertEqual(response.status_code, 200)
+        last, first, middle = self.ids
+        self.assertEqual([item['id'] for item in json.loads(response.content)['results']], [first, middle, last])
+
+    def test_bad_routes(self):
+        for query in (
+            '?polyline=11,78;12,1e10', '?polyline=11,78;nan,78', '?polyline=11,78;91,78', '?polyline=11,78',
+            '?polyline=' + ';'.join(['11,78'] * 1001), '?polyline=11,78;-11,-102',
+            '?origin_lat=1e300&origin_lng=78&dest_lat=12&dest_lng=78',
+        ):
+            with self.subTest(query=query[:40]):
+                self.assertEqual(self.client.get(reverse('vendor-corridor') + query).status_code, 400)
+
+
+class RoutingTests(TestCase):
+    """Road routing finds shortest paths and only overrides believable trip distances"""
+
+    def setUp(self):
+        cache.clear()
+        self.graph = get_graph()
+
+    def town(self, name):
+        return self.graph.coords[self.graph.names.index(name)]
+
+    def create_trip(self, origin, dest, **fields):
+        data = {
+            'origin': 'A', 'destination': 'B', 'vehicle_type': 'bike', 'origin_lat': origin[0],
+            'origin_lng': origin[1], 'dest_lat': dest[0], 'dest_lng': dest[1], **fields,
+        }
+        return self.client.post(reverse('trip-list'), data, content_type='application/json')
+
+    def test_bidirectional_search_matches_dijkstra(self):
+        nodes = range(0, len(self.graph), 4)
+        for metric in ('distance', 'time'):
+            for source in nodes:
+                for target in nodes:
+                    with self.subTest(metric=metric, source=source, target=target):
+                        found = self.graph.shortest_path(source, target, metric)
+                        self.assertAlmostEqual(found[0], self.graph.dijkstra(source, target, metric))
+                        self.assertEqual((found[1][0], found[1][-1]), (source, target))
+
+    def test_route_view(self):
+        (olat, olng), (dlat, dlng) = self.town('Chennai'), self.town('Madurai')
+        query = f'?origin_lat={olat}&origin_lng={olng}&dest_lat={dlat}&dest_lng={dlng}'
+        body = json.loads(self.client.get(reverse('route') + query).content)
+        self.assertEqual((body['via'][0], body['via'][-1]), ('Chennai', 'Madurai'))
+        self.assertGreater(body['distance_km'], haversine_km(olat, olng, dlat, dlng))
+        query = '?origin_lat=1e300&origin_lng=78&dest_lat=11&dest_lng=78'
+        self.assertEqual(self.client.get(reverse('route') + query).status_code, 400)
+
+    def test_trip_distance(self):
+        response = self.create_trip(self.town('Chennai'), self.town('Bangalore'), distance_km=1)
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(json.loads(response.content)['distance_km'], 300)
+
+        # 6 km apart, but the ends snap to towns on either side of a gap in the graph
+        response = self.create_trip((10.8353, 77.6971), (10.8733, 77.6596), distance_km=6)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content)['distance_km'], 6)
+        self.assertEqual(self.create_trip((10.8353, 77.6971), (10.8733, 77.6596)).status_code, 400)
+
+        for fields in ({'origin_lat': 1e300}, {'dest_lng': 181}, {'origin_lat': 'nan'}):
+            with self.subTest(fields=fields):
+                self.assertEqual(self.create_trip((11, 78), (12, 79), distance_km=10, **fields).status_code, 400)
+
+
+class DistanceMatrixTests(TestCase):
+    """Every origin × destination cell is routed; points off the globe are a 400"""
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, origins, destinations):
+        data = {'origins': origins, 'destinations': destinations}
+        return self.client.post(reverse('distance-matrix'), data, content_type='application/json')
+
+    def test_matrix(self):
+        graph = get_graph()
+        chennai, madurai, salem = (list(graph.coords[graph.names.index(name)]) for name in ('Chennai', 'Madurai', 'Salem'))
+        response = self.post([chennai, madurai], [salem, [0.5, 0.5]])
+        self.assertEqual(response.status_code, 200)
+        rows = json.loads(response.content)['rows']
+        self.assertEqual([len(row) for row in rows], [2, 2])
+        # Cache keys round the coordinates, which moves the access legs slightly
+        self.assertAlmostEqual(rows[0][0]['distance_km'], graph.route(*chennai, *salem)['distance_km'], delta=0.5)
+        self.assertIn('bike', rows[0][0]['fuel'])
+        # Off the road graph
+        self.assertEqual([rows[0][1], rows[1][1]], [None, None])
+
+    def test_bad_points(self):
+        for origins in ([[1e300, 1]], [['nan', 1]], [[11, 'inf']], [[11, 181]], [[11]], [], [[11, 78]] * 2501):
+            with self.subTest(origins=origins[:2]):
+                self.assertEqual(self.post(origins, [[12, 79]]).status_code, 400)
+        self.assertEqual(self.post([[11, 78]] * 51, [[12, 79]] * 50).status_code, 400)
+
+
+class RouteCacheTests(TestCase):
+    """Routes come from the LRU, then the table, then the graph, and expire after the TTL"""
+
+    CHENNAI, SALEM, MADURAI = (13.0827, 80.2707), (11.6643, 78.1460), (9.9252, 78.1198)
+
+    def lookup(self, route_cache, *pairs):
+        found, counts = route_cache.get_many(pairs)
+        return found, (counts['memory_hits'], counts['db_hits'], counts['misses'])
+
+    def test_tiers(self):
+        route_cache = RouteCache()
+        found, counts = self.lookup(route_cache, (self.CHENNAI, self.SALEM))
+        self.assertEqual(counts, (0, 0, 1))
+        route = found[route_key(self.CHENNAI, self.SALEM)]
+        routed = get_graph().route(*self.CHENNAI, *self.SALEM)
+        self.assertAlmostEqual(route['distance_km'], routed['distance_km'], delta=0.5)
+        self.assertEqual(RouteCacheEntry.objects.get().distance_km, route['distance_km'])
+        # Points within the rounding share the cached route
+        self.assertEqual(self.lookup(route_cache, ((13.08271, 80.27068), self.SALEM))[1], (1, 0, 0))
+        route_cache.clear_memory()
+        found, counts = self.lookup(route_cache, (self.CHENNAI, self.SALEM))
+        self.assertEqual((found[route_key(self.CHENNAI, self.SALEM)], counts), (route, (0, 1, 0)))
+        self.assertEqual(self.lookup(route_cache, (self.CHENNAI, self.SALEM))[1], (1, 0, 0))
+        self.assertEqual(route_cache.snapshot()['hit_rate'], 0.75)
+
+    def test_unroutable(self):
+        route_cache = RouteCache()
+        found, counts = self.lookup(route_cache, ((0.5, 0.5), self.SALEM))
+        self.assertEqual((list(found.values()), counts), ([None], (0, 0, 1)))
+        route_cache.clear_memory()
+        self.assertEqual(self.lookup(route_cache, ((0.5, 0.5), self.SALEM)), (found, (0, 1, 0)))
+
+    @override_settings(ROUTE_CACHE_LRU_SIZE=2)
+    def test_lru_eviction(self):
+        route_cache = RouteCache()
+        first, second, third = (self.CHENNAI, self.SALEM), (self.SALEM, self.MADURAI), (self.CHENNAI, self.MADURAI)
+        self.lookup(route_cache, first, second)
+        # Touching the first route makes the second the least recently used
+        self.assertEqual(self.lookup(route_cache, first)[1], (1, 0, 0))
+        self.lookup(route_cache, third)
+        self.assertEqual(route_cache.snapshot()['memory_entries'], 2)
+        self.assertEqual(self.lookup(route_cache, first, third)[1], (2, 0, 0))
+        self.assertEqual(self.lookup(route_cache, second)[1], (0, 1, 0))
+
+    @override_settings(ROUTE_CACHE_TTL=60)
+    def test_expiry(self):
+        route_cache = RouteCache()
+        self.lookup(route_cache, (self.CHENNAI, self.SALEM))
+        later = time.time() + 120
+        with mock.patch('core_api.route_cache.time.time', return_value=later):
+            # The memory entry is stale but the row is still fresh
+            self.assertEqual(self.lookup(route_cache, (self.CHENNAI, self.SALEM))[1], (0, 1, 0))
+            RouteCacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=120))
+            route_cache.clear_memory()
+            self.assertEqual(self.lookup(route_cache, (self.CHENNAI, self.SALEM))[1], (0, 0, 1))
+        # Recomputing replaced the expired row
+        self.assertEqual(RouteCacheEntry.objects.count(), 1)
+        self.assertGreater(RouteCacheEntry.objects.get().created_at, timezone.now() - timedelta(seconds=60))
+
+    @override_settings(ROUTE_CACHE_MAX_ROWS=2, ROUTE_CACHE_TRIM_EVERY=1, ROUTE_CACHE_TTL=60)
+    def test_trim(self):
+        route_cache = RouteCache()
+        pairs = [(self.CHENNAI, self.SALEM), (self.SALEM, self.MADURAI), (self.CHENNAI, self.MADURAI)]
+        for pair in pairs:
+            self.lookup(route_cache, pair)
+        keys = set(RouteCacheEntry.objects.values_list('key', flat=True))
+        self.assertEqual(keys, {route_key(*pair) for pair in pairs[1:]})
+        RouteCacheEntry.objects.filter(key=route_key(*pairs[1])).update(
+            created_at=timezone.now() - timedelta(seconds=120)
+        )
+        route_cache.trim()
+        self.assertEqual(list(RouteCacheEntry.objects.values_list('key', flat=True)), [route_key(*pairs[2])])
+
+
+class ResponseCacheTests(TestCase):
+    """Vendor lists are cached, revalidated with ETags and dropped on every availability change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.hotel = Vendor.objects.create(
+            name='Lodge', address='NH 44', latitude=11.0, longitude=78.0, phone='1', vendor_type='hotel',
+            base_price=2500, room_capacity=2, rooms_available=2,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def rooms(self):
+        response = self.client.get(reverse('vendor-list'))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['results'][0]['rooms_available']
+
+    def test_served_from_cache(self):
+        self.assertEqual(self.rooms(), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.rooms(), 2)
+        Vendor.objects.filter(pk=self.hotel.pk).update(rooms_available=0)
+        self.assertEqual(self.rooms(), 2)
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('vendor-list'))
+        etag, modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.client.get(reverse('vendor-list'), headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get(reverse('vendor-list'), headers={'If-Modified-Since': modified}).status_code, 304)
+        # Another query is another page with its own validator
+        self.assertEqual(
+            self.client.get(reverse('vendor-list') + '?type=food', headers={'If-None-Match': etag}).status_code, 200
+        )
+
+        hotel = Vendor.objects.get(pk=self.hotel.pk)
+        hotel.is_open = False
+        hotel.save()
+        self.assertEqual(self.client.get(reverse('vendor-list'), headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_bookings_invalidate(self):
+        self.assertEqual(self.rooms(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('booking-list'), {
+                'vendor': self.hotel.pk, 'customer_name': 'Asha', 'phone': '1',
+                'total_price': '2500', 'status': 'confirmed',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.rooms(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('booking-detail', args=[json.loads(response.content)['id']]))
+        self.assertEqual(self.rooms(), 2)
+
+
+class ReservationTests(TransactionTestCase):
+    """Hotel bookings hold one room per night and never overbook"""
+
+    def setUp(self):
+        self.hotel = Vendor.objects.create(
+            name='Lodge', address='NH 44', latitude=11.0, longitude=78.0, phone='1', vendor_type='hotel',
+            base_price=2500, room_capacity=2, rooms_available=2,
+        )
+
+    def book(self, check_in, check_out, **fields):
+        data = {
+            'vendor': self.hotel.pk, 'customer_name': 'Asha', 'phone': '1', 'total_price': '2500',
+            'check_in': f'{check_in}T14:00:00Z', 'check_out': f'{check_out}T10:00:00Z', **fields,
+        }
+        return self.client.post(reverse('booking-list'), data, content_type='application/json')
+
+    def booked(self):
+        nights = RoomNight.objects.filter(vendor=self.hotel, rooms_booked__gt=0).order_by('night')
+        return {night.night.isoformat(): night.rooms_booked for night in nights}
+
+    def test_reserve_and_overbook(self):
+        self.assertEqual(self.book('2030-01-01', '2030-01-03').status_code, 201)
+        self.assertEqual(self.book('2030-01-02', '2030-01-03').status_code, 201)
+        self.assertEqual(self.booked(), {'2030-01-01': 1, '2030-01-02': 2})
+        # One full night refuses the whole stay
+        response = self.book('2030-01-01', '2030-01-04')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.booked(), {'2030-01-01': 1, '2030-01-02': 2})
+        self.assertEqual(Booking.objects.count(), 2)
+        # Cancelled bookings hold no rooms
+        self.assertEqual(self.book('2030-01-02', '2030-01-03', status='cancelled').status_code, 201)
+
+    def test_cancel_releases_once(self):
+        booking = json.loads(self.book('2030-01-01', '2030-01-03').content)
+        url = reverse('booking-cancel', args=[booking['id']])
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.booked(), {})
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.booked(), {})
+
+        booking = json.loads(self.book('2030-01-01', '2030-01-02').content)
+        self.client.delete(reverse('booking-detail', args=[booking['id']]))
+        self.assertEqual(self.booked(), {})
+
+    def test_change_dates(self):
+        booking = json.loads(self.book('2030-01-01', '2030-01-03').content)
+        self.book('2030-01-05', '2030-01-06')
+        self.book('2030-01-05', '2030-01-06')
+        url = reverse('booking-detail', args=[booking['id']])
+        response = self.client.patch(url, {'check_in': '2030-01-02T14:00:00Z'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.booked(), {'2030-01-02': 1, '2030-01-05': 2})
+        # Moving onto a full night keeps the old reservation
+        response = self.client.patch(url, {
+            'check_in': '2030-01-05T14:00:00Z', 'check_out': '2030-01-06T10:00:00Z',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.booked(), {'2030-01-02': 1, '2030-01-05': 2})
+
+    def test_concurrent_bookings(self):
+        start = threading.Barrier(8)
+        results = []
+
+        def book(n):
+            # Two-night and one-night stays all compete for the second night
+            nights = [date(2030, 1, 1), date(2030, 1, 2)] if n % 2 else [date(2030, 1, 2)]
+            try:
+                start.wait()
+                reserve_nights(self.hotel.pk, nights)
+                results.append('booked')
+            except RoomsUnavailable:
+                results.append('full')
+            finally:
+                connection.close()
+
+        # The in-memory test database fails concurrent writers instead of making them wait
+        with scratch_database(connection):
+            self.setUp()
+            threads = [threading.Thread(target=book, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(sorted(results), ['booked'] * 2 + ['full'] * 6)
+            self.assertEqual(self.booked()['2030-01-02'], 2)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk the whole ordering once; forged cursors are a 404"""
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(25):
+            Vendor.objects.create(
+                name=f'Vendor {n}', address='NH 44', latitude=11.0, longitude=78.0, phone='1',
+                vendor_type='food', rating=[3.5, 4.0, 4.5][n % 3], is_open=n % 5 > 0,
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            body = json.loads(response.content)
+            ids += [item['id'] for item in body['results']]
+            url = body['next']
+        return ids
+
+    def test_pages_follow_the_ordering(self):
+        expected = list(Vendor.objects.order_by('-rating', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk(reverse('vendor-list') + '?page_size=4'), expected)
+        self.assertEqual(self.walk(reverse('vendor-list') + '?page_size=500'), expected)
+        self.assertEqual(
+            self.walk(reverse('vendor-list') + '?page_size=4&fields=id&is_open=true'),
+            list(Vendor.objects.filter(is_open=True).order_by('-rating', '-id').values_list('id', flat=True)),
+        )
+
+    def test_sparse_fields(self):
+        url = reverse('vendor-list') + '?page_size=2&fields=name, rating,bogus'
+        body = json.loads(self.client.get(url).content)
+        self.assertEqual([sorted(item) for item in body['results']], [['name', 'rating'], ['name', 'rating']])
+        self.assertIn('fields=', body['next'])
+        self.assertEqual(sorted(json.loads(self.client.get(body['next']).content)['results'][0]), ['name', 'rating'])
+
+    def test_invalid_cursors(self):
+        def encoded(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+        for cursor in (
+            encoded([None, None]), encoded([4.0]), encoded(['x', 1]), encoded([[4.0], {}]), encoded([True, 1]),
+            encoded({'rating': 4.0}), 'not-base64!', encoded('4.0,1'),
+        ):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('vendor-list') + f'?cursor={cursor}')
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(json.loads(response.content), {'detail': 'Invalid cursor'})
+        self.assertEqual(self.client.get(reverse('vendor-list') + f'?cursor={encoded([4.0, 10 ** 6])}').status_code, 200)
+
+
+class BulkTripTests(TestCase):
+    """Bulk uploads store the valid items of a JSON array or NDJSON stream"""
+
+    def trip(self, **fields):
+        return {'origin': 'A', 'destination': 'B', 'vehicle_type': 'bike', 'distance_km': 40, **fields}
+
+    def post(self, body, content_type='application/json'):
+        response = self.client.post(reverse('trip-bulk'), body, content_type=content_type)
+        return response.status_code, json.loads(response.content)
+
+    def test_json_array(self):
+        status_code, body = self.post([self.trip(), self.trip(vehicle_type='boat'), self.trip(vehicle_type='car')])
+        self.assertEqual(status_code, 201)
+        self.assertEqual((body['created'], body['failed'], body['errors'][0]['index']), (2, 1, 1))
+        self.assertEqual(Trip.objects.count(), 2)
+        self.assertEqual(Trip.objects.get(vehicle_type='car').fuel_liters, round(40 / 15, 2))
+
+    def test_ndjson(self):
+        lines = [json.dumps(self.trip()), '', '{"origin": ', json.dumps(self.trip(distance_km=None)), '3']
+        status_code, body = self.post('\n'.join(lines), 'application/x-ndjson')
+        self.assertEqual(status_code, 201)
+        self.assertEqual(body['created'], 1)
+        self.assertEqual([error['index'] for error in body['errors']], [2, 3, 4])
+
+    def test_not_a_list(self):
+        for payload in ('null', '"x"', '3', '{"origin": "A"}'):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload), (400, {'error': 'Expected a JSON array or NDJSON lines'}))
+        self.assertEqual(self.post([])[0], 201)
+        self.assertEqual(self.post([None, 'x'])[0], 400)
+        self.assertEqual(Trip.objects.count(), 0)
+
+
+class FuelBatchTests(TestCase):
+    """Batch fuel costs broadcast single values and reject malformed arrays"""
+
+    def post(self, **data):
+        response = self.client.post(reverse('calculate-fuel-batch'), data, content_type='application/json')
+        return response.status_code, json.loads(response.content)
+
+    def test_batch(self):
+        status_code, body = self.post(distance_km=[90, 30], vehicle_type='bike', fuel_price=100)
+        self.assertEqual(status_code, 200)
+        self.assertEqual((body['count'], body['vehicle_type']), (2, ['bike', 'bike']))
+        self.assertEqual(body['fuel_liters'], [2.0, round(30 / 45, 2)])
+        self.assertEqual(body['total_fuel_cost'], [200.0, round(30 / 45 * 100, 2)])
+
+        status_code, body = self.post(distance_km=[15, 45], vehicle_type=['car', 'bike'], fuel_price=[100, 90])
+        self.assertEqual((status_code, body['total_fuel_cost']), (200, [100.0, 90.0]))
+
+    def test_bad_batches(self):
+        for data in (
+            {'vehicle_type': [['bike']]}, {'vehicle_type': [{}]}, {'vehicle_type': [None]}, {'vehicle_type': 'boat'},
+            {'vehicle_type': 3}, {'vehicle_type': ['bike', 'car', 'car']}, {'distance_km': [1, -1]},
+            {'distance_km': [1, 'nan']}, {'distance_km': 5}, {'fuel_price': [[1]]}, {'fuel_price': [1, 2, 3]},
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(self.post(**{'distance_km': [10, 20], 'vehicle_type': 'car', **data})[0], 400)
+
+
+class DatabaseSettingsTests(unittest.TestCase):
+    """DB_PROFILE picks the database, and WAL stays off the repository's db.sqlite3"""
+
+    def load_settings(self, **environ):
+        kept = {key: value for key, value in os.environ.items() if not key.startswith(('DB_', 'SQLITE_'))}
+        with mock.patch.dict(os.environ, {**kept, **environ}, clear=True):
+            return runpy.run_path(project_settings.__file__)
+
+    def test_profiles(self):
+        default = self.load_settings()
+        self.assertEqual(default['DATABASES']['default']['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(default['DATABASES']['default']['NAME'], default['BASE_DIR'] / 'db.sqlite3')
+        self.assertEqual(default['SQLITE_PRAGMAS']['journal_mode'], 'delete')
+
+        scratch = self.load_settings(DB_NAME='/tmp/scratch.sqlite3')
+        self.assertEqual(scratch['DATABASES']['default']['NAME'], '/tmp/scratch.sqlite3')
+        self.assertEqual(scratch['SQLITE_PRAGMAS']['journal_mode'], 'wal')
+        self.assertEqual(self.load_settings(SQLITE_JOURNAL_MODE='wal')['SQLITE_PRAGMAS']['synchronous'], 'normal')
+
+        server = self.load_settings(DB_PROFILE='server', DB_HOST='db', DB_CONN_MAX_AGE='0')['DATABASES']['default']
+        self.assertEqual(server['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((server['NAME'], server['HOST'], server['CONN_MAX_AGE']), ('born2ride', 'db', 0))
+
+        with self.assertRaises(ValueError):
+            self.load_settings(DB_PROFILE='oracle')
+
+    def test_journal_mode_is_only_set_when_it_differs(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'db.sqlite3')
+            for journal_mode in ('delete', 'wal', 'delete'):
+                raw = sqlite3.connect(path)
+                with override_settings(SQLITE_PRAGMAS={'journal_mode': journal_mode, 'synchronous': 'full'}):
+                    database.tune_sqlite(None, SimpleNamespace(vendor='sqlite', connection=raw))
+                self.assertEqual(raw.execute('PRAGMA journal_mode').fetchone()[0], journal_mode)
+                raw.close()
+
+
+class EmergencyPackTests(TestCase):
+    """Offline packs decode to the services of the requested region"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def service(lat, lng, **fields):
+            return EmergencyService.objects.create(
+                phone='108', address='NH 44', latitude=lat, longitude=lng,
+                **{'name': 'Hospital', 'service_type': 'hospital', **fields}
+            )
+
+        cls.edge = service(11.0061, 78.0049, is_24x7=True)
+        cls.inside = service(11.5, 78.5, name='Clinic — தமிழ்', service_type='police')
+        cls.outside = service(12.5, 78.5)
+
+    def setUp(self):
+        emergency_packs.invalidate()
+
+    def pack(self, query=''):
+        response = self.client.get(reverse('emergency-pack') + query)
+        self.assertEqual(response.status_code, 200)
+        return decode_pack(response.content)
+
+    def test_round_trip(self):
+        services = {service['id']: service for service in self.pack()}
+        self.assertEqual(len(services), 3)
+        expected = EmergencyServiceSerializer(self.inside).data
+        self.assertEqual(services[self.inside.pk], {name: expected[name] for name in services[self.inside.pk]})
+        self.assertTrue(services[self.edge.pk]['is_24x7'])
+
+    def test_region_keeps_services_on_its_edges(self):
+        # Rounding 11.006 and 78.005 to two places would cut the edge service off
+        found = self.pack('?lat_min=11.006&lat_max=11.504&lng_min=78.0049&lng_max=78.5')
+        self.assertEqual(sorted(service['id'] for service in found), [self.edge.pk, self.inside.pk])
+        self.assertEqual(pack_region(11.006, 11.504, 78.0049, 78.5), (11.0, 11.51, 78.0, 78.5))
+
+    def test_bad_regions(self):
+        for lat_min in ('x', '-inf', 'nan'):
+            query = f'?lat_min={lat_min}&lat_max=12&lng_min=78&lng_max=79'
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('emergency-pack') + query).status_code, 400)
+        self.assertEqual(self.client.get(reverse('emergency-pack') + '?lat_min=11').status_code, 400)
+
+
+class TripRollupTests(TestCase):
+    """Analytics rollups follow trip creates, edits and deletes"""
+
+    def create(self, origin, vehicle_type, distance_km):
+        response = self.client.post(reverse('trip-list'), {
+            'origin': origin, 'destination': 'Madurai', 'vehicle_type': vehicle_type, 'distance_km': distance_km,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.content)['id']
+
+    def analytics(self, group):
+        response = self.client.get(reverse('trip-analytics') + f'?group={group}')
+        return [(row.get('vehicle_type') or row.get('origin'), row['trips'], row['distance_km'])
+                for row in json.loads(response.content)['results']]
+
+    def snapshot(self):
+        return [
+            sorted(TripDailyRollup.objects.values_list('day', 'vehicle_type', 'trips', 'distance_km')),
+            sorted(TripRouteRollup.objects.values_list('origin', 'vehicle_type', 'trips', 'distance_km')),
+        ]
+
+    def test_incremental_totals(self):
+        chennai = self.create('Chennai', 'bike', 450)
+        self.create('Chennai', 'bike', 460)
+        trichy = self.create('Trichy', 'car', 140)
+        self.assertEqual(self.analytics('vehicle'), [('bike', 2, 910.0), ('car', 1, 140.0)])
+        self.assertEqual(self.analytics('route'), [('Chennai', 2, 910.0), ('Trichy', 1, 140.0)])
+
+        url = reverse('trip-detail', args=[chennai])
+        self.client.patch(url, {'vehicle_type': 'car'}, content_type='application/json')
+        self.assertEqual(self.analytics('vehicle'), [('bike', 1, 460.0), ('car', 2, 590.0)])
+
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+        self.client.delete(reverse('trip-detail', args=[trichy]))
+        self.assertEqual(self.analytics('route'), [('Chennai', 2, 910.0)])
+
+    def test_deleting_the_last_trip_removes_its_rows(self):
+        trip = self.create('Chennai', 'bike', 450)
+        self.client.delete(reverse('trip-detail', args=[trip]))
+        self.assertEqual(self.snapshot(), [[], []])
+        for group in ('day', 'vehicle', 'route'):
+            with self.subTest(group=group):
+                self.assertEqual(self.analytics(group), [])
+
+    def assertMatchesRebuild(self):
+        incremental = self.snapshot()
+        rollups.rebuild()
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_model_saves_and_deletes(self):
+        # Saves outside the API, as the admin and scripts make them
+        trip = Trip.objects.create(
+            origin='Chennai', destination='Madurai', distance_km=450, vehicle_type='bike', fuel_cost=900,
+        )
+        Trip.objects.create(origin='Trichy', destination='Madurai', distance_km=140, vehicle_type='car', fuel_cost=700)
+        self.assertEqual(self.analytics('vehicle'), [('bike', 1, 450.0), ('car', 1, 140.0)])
+        self.assertMatchesRebuild()
+
+        trip = Trip.objects.get(pk=trip.pk)
+        trip.distance_km = 500
+        trip.save()
+        trip.save()
+        self.assertEqual(self.analytics('vehicle'), [('bike', 1, 500.0), ('car', 1, 140.0)])
+        # Fields that were never loaded are read from the stored row
+        partial = Trip.objects.only('vehicle_type').get(pk=trip.pk)
+        partial.vehicle_type = 'car'
+        partial.save()
+        self.assertEqual(self.analytics('vehicle'), [('car', 2, 640.0)])
+        self.assertMatchesRebuild()
+
+        Trip.objects.filter(origin='Trichy').delete()
+        Trip.objects.only('id').get(pk=trip.pk).delete()
+        self.assertEqual(self.snapshot(), [[], []])
+
+
+class ExportTests(TestCase):
+    """Exports stream every matching row as NDJSON or CSV"""
+
+    @classmethod
+    def setUpTestData(cls):
+        stops = [{'id': 7, 'name': 'Tea stall', 'lat': 11.2}]
+        cls.trips = [
+            Trip.objects.create(
+                origin='Chennai', destination='Madurai', distance_km=460, vehicle_type='bike', fuel_cost=1000,
+                fuel_liters=10,
+            ),
+            Trip.objects.create(
+                origin='Salem', destination='Trichy', distance_km=140, vehicle_type='car', fuel_cost=1200,
+                fuel_liters=9, stops_visited=stops,
+            ),
+        ]
+        Trip.objects.filter(pk=cls.trips[0].pk).update(created_at='2030-01-01T08:00:00Z')
+        Trip.objects.filter(pk=cls.trips[1].pk).update(created_at='2030-01-03T08:00:00Z')
+        workshop = Vendor.objects.create(
+            name='Garage', address='NH 44', latitude=11.0, longitude=78.0, phone='1', vendor_type='workshop',
+        )
+        cls.booking = Booking.objects.create(vendor=workshop, customer_name='Asha', phone='1', total_price='450.50')
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_trips_ndjson(self):
+        response, body = self.export('trip-export')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertIn('filename="trips.ndjson"', response['Content-Disposition'])
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [trip.pk for trip in self.trips])
+        self.assertEqual(rows[0]['stops_visited'], [])
+        self.assertEqual(rows[1]['stops_visited'], [{'id': 7, 'name': 'Tea stall', 'lat': 11.2}])
+        self.assertEqual(rows[1]['created_at'][:10], '2030-01-03')
+
+    def test_trips_csv(self):
+        response, body = self.export('trip-export', output='csv', vehicle_type='car')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        header, row = body.splitlines()
+        self.assertTrue(header.startswith('id,origin,destination,'))
+        self.assertIn('Salem,Trichy', row)
+        self.assertIn('"[{""id"": 7', row)
+
+    def test_date_window(self):
+        for params, expected in [
+            ({'from': '2030-01-02'}, [1]),
+            ({'to': '2030-01-01'}, [0]),
+            ({'from': '2030-01-01T09:00:00Z', 'to': '2030-01-03'}, [1]),
+            ({'from': '2030-01-04'}, []),
+        ]:
+            with self.subTest(params=params):
+                _, body = self.export('trip-export', **params)
+                ids = [json.loads(line)['id'] for line in body.splitlines()]
+                self.assertEqual(ids, [self.trips[i].pk for i in expected])
+
+    def test_bookings(self):
+        _, body = self.export('booking-export')
+        row = json.loads(body)
+        self.assertEqual((row['vendor_name'], row['vendor_type']), ('Garage', 'workshop'))
+        self.assertEqual((row['total_price'], row['check_in']), ('450.50', None))
+        _, body = self.export('booking-export', status='confirmed')
+        self.assertEqual(body, '')
+
+    def test_bad_parameters(self):
+        for name, params in [
+            ('trip-export', {'output': 'xml'}),
+            ('trip-export', {'from': 'yesterday'}),
+            ('booking-export', {'to': '2030-13-01'}),
+        ]:
+            with self.subTest(name=name, params=params):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', json.loads(response.content))
+
+
+class PlaceAutocompleteTests(TestCase):
+    """Autocomplete matches word-starts of names and aliases, most popular first"""
+
+    PLACES = [
+        ['Chennai', 13.0827, 80.2707, 'town', ['Madras']],
+        ['Madurai', 9.9252, 78.1198, 'town'],
+        ['Mandya', 12.5218, 76.8951, 'town'],
+        ['Mahabalipuram', 12.6208, 80.1945, 'town', ['Mamallapuram']],
+        ['Marina Beach', 13.05, 80.2824, 'landmark'],
+        ['Madurai Bypass Junction', 9.95, 78.08, 'junction'],
+    ]
+
+    def setUp(self):
+        self.index = PlaceIndex(self.PLACES)
+
+    def names(self, query, k=10, kinds=None):
+        return [place['name'] for place in self.index.search(query, k, kinds)]
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.names('MADU'), ['Madurai', 'Madurai Bypass Junction'])
+        self.assertEqual(self.names('beach'), ['Marina Beach'])
+        self.assertEqual(self.names('bypass jun'), ['Madurai Bypass Junction'])
+        self.assertEqual(self.names('madras'), ['Chennai'])
+        # Mahabalipuram matches by name and by alias but is listed once, and
+        # Chennai, matched only through an alias, comes after the name matches
+        self.assertEqual(self.names('ma'), [
+            'Mandya', 'Madurai', 'Marina Beach', 'Mahabalipuram', 'Madurai Bypass Junction', 'Chennai',
+        ])
+        self.assertEqual(self.names('  ,. '), [])
+        self.assertEqual(self.names('mx'), [])
+
+    def test_ranking(self):
+        # Without trips: places whose name starts with the prefix, shortest first
+        self.assertEqual(self.names('m')[:3], ['Mandya', 'Madurai', 'Marina Beach'])
+        self.assertEqual(self.names('madr'), ['Chennai'])
+        self.index.set_popularity({'Madurai, Tamil Nadu': 3, 'MARINA BEACH': 5, 'Nowhere': 9, 'madurai': 1})
+        results = self.index.search('ma')
+        self.assertEqual([(place['name'], place['popularity']) for place in results[:3]],
+                         [('Marina Beach', 5), ('Madurai', 4), ('Mandya', 0)])
+        self.assertEqual(results[0]['kind'], 'landmark')
+
+    def test_limits(self):
+        self.assertEqual(self.names('ma', k=2), ['Mandya', 'Madurai'])
+        self.assertEqual(self.names('ma', kinds={'junction', 'landmark'}), ['Marina Beach', 'Madurai Bypass Junction'])
+        self.assertEqual(self.names('madras', kinds={'landmark'}), [])
+
+    @override_settings(PLACE_POPULARITY_TTL=0)
+    def test_endpoint(self):
+        TripRouteRollup.objects.create(origin='Chennai', destination='Madurai', vehicle_type='bike', trips=2)
+        TripRouteRollup.objects.create(origin='Salem', destination='Madurai', vehicle_type='car', trips=1)
+        response = self.client.get(reverse('place-autocomplete'), {'q': 'ma', 'k': 2, 'kind': 'town,landmark'})
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.content)
+        self.assertEqual(body['query'], 'ma')
+        self.assertEqual([(place['name'], place['popularity']) for place in body['results']],
+                         [('Madurai', 3), ('Chennai', 2)])
+        for params in ({'q': ''}, {'q': 'ma', 'k': 0}, {'q': 'ma', 'k': 51}, {'q': 'ma', 'kind': 'lake'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(reverse('place-autocomplete'), params).status_code, 400)
+
+
+class FastListParityTests(TestCase):
+    """The fast list path renders the same bytes as the DRF serializers"""
+
+    @classmethod
+    def setUpTestData(cls):
+        hotel = Vendor.objects.create(
+            name='Lodge \u2028 Annexe', vendor_type='hotel', source='mmt', address='NH 44', latitude=11.0,
+            longitude=78.0, phone='1', rating=4.25, base_price=Decimal('2499.50'), room_capacity=3,
+        )
+        # Default base_price and source, and a latitude printed in exponent notation, which keeps the page off orjson
+        Vendor.objects.create(
+            name='Dhaba', vendor_type='food', address='NH 44', latitude=1e-05, longitude=78.5, phone='2',
+        )
+        EmergencyService.objects.create(
+            name='GH', service_type='hospital', phone='108', address='Salem', latitude=11.66, longitude=78.15,
+        )
+        EmergencyService.objects.create(
+            name='Tow', service_type='roadside', phone='9', address='NH 44', latitude=11.2, longitude=78.2,
+            is_24x7=False,
+        )
+        Trip.objects.create(
+            origin='Chennai', destination='Madurai', distance_km=462.5, vehicle_type='bike', fuel_cost=1203.75,
+            fuel_liters=11.5625, stops_visited=[{'name': 'Trichy', 'lat': 10.79}],
+        )
+        Trip.objects.create(origin='Salem', destination='Erode', distance_km=0.00005, vehicle_type='car', fuel_cost=0)
+        # No dates, so check_in and check_out are null
+        Booking.objects.create(vendor=hotel, customer_name='Asha', phone='1', total_price=Decimal('4999.00'))
+        Booking.objects.create(
+            vendor=hotel, customer_name='Ravi', phone='2', total_price=Decimal('2499.50'), status='confirmed',
+            check_in=timezone.now(), check_out=timezone.now() + timedelta(days=2),
+        )
+
+    def get(self, url):
+        cache.clear()
+        return self.client.get(url)
+
+    def get_fast(self, url):
+        """The response, and whether a ``ValuesPlan`` served it"""
+        plans = []
+        get_values_plan = FastListMixin.get_values_plan
+
+        def spy(view):
+            plans.append(get_values_plan(view))
+            return plans[-1]
+
+        with mock.patch.object(FastListMixin, 'get_values_plan', spy):
+            response = self.get(url)
+        return response, plans != [] and None not in plans
+
+    def assertSameBytes(self, name, query):
+        url = reverse(name) + query
+        fast, planned = self.get_fast(url)
+        self.assertTrue(planned)
+        with mock.patch.object(FastListMixin, 'get_values_plan', return_value=None):
+            slow = self.get(url)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, slow.content)
+
+    def test_same_bytes(self):
+        for name, queries in (
+            ('vendor-list', ['', '?type=hotel', '?fields=id,base_price,vendor_type_display,source_display']),
+            ('emergency-list', ['', '?fields=service_type_display,is_24x7']),
+            ('trip-list', ['', '?page_size=1', '?fields=id,stops_visited,created_at']),
+            ('booking-list', ['', '?fields=vendor_name,check_in,check_out,total_price']),
+        ):
+            for query in queries:
+                with self.subTest(name=name, query=query):
+                    self.assertSameBytes(name, query)
+
+    @override_settings(TIME_ZONE='UTC')
+    def test_same_bytes_in_utc(self):
+        # Datetimes end in Z instead of an offset
+        for name in ('trip-list', 'booking-list'):
+            with self.subTest(name=name):
+                self.assertSameBytes(name, '')
+
+
+class LoadTestHarnessTests(TestCase):
+    """The in-process load test serves a scratch database and leaves the configured one alone"""
+
+    def tearDown(self):
+        # The run filled the process-wide caches from the scratch data
+        cache.clear()
+        vendor_index.invalidate()
+        emergency_index.invalidate()
+        emergency_packs.invalidate()
+
+    def test_in_process_run(self):
+        default = connections['default']
+        configured = default.settings_dict
+        before = dict(configured)
+        Trip.objects.create(
+            origin='A', destination='B', distance_km=10, vehicle_type='bike', fuel_cost=1, fuel_liters=1,
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'result.json')
+            call_command(
+                'loadtest', requests=40, duration=0, concurrency=2, vendors=40, emergency=10, trips=20,
+                bookings=5, output=output, stdout=io.StringIO(), stderr=io.StringIO(),
+            )
+            with open(output, encoding='utf-8') as fh:
+                result = json.load(fh)
+        self.assertEqual(result['overall']['requests'], 40)
+        self.assertEqual(result['overall']['errors'], 0)
+        self.assertEqual(result['dataset']['vendors'], 40)
+        # Back on the test database, through the same connection and settings
+        self.assertIs(connections['default'], default)
+        self.assertIs(default.settings_dict, configured)
+        self.assertEqual(configured, before)
+        self.assertEqual((Trip.objects.count(), Vendor.objects.count()), (1, 0))
+
+
+class DataGeneratorTests(TestCase):
+    """The generator writes the requested counts and the same rows for the same seed"""
+
+    COUNTS = {'vendors': 80, 'emergency': 20, 'trips': 60, 'bookings': 40}
+
+    def setUp(self):
+        # Dates are drawn back from the current time; hold it still
+        self.now = timezone.now()
+
+    def generate(self, seed, **counts):
+        with mock.patch('django.utils.timezone.now', return_value=self.now):
+            return datagen.generate(**{**self.COUNTS, **counts}, seed=seed)
+
+    def snapshot(self):
+        """Generated rows without their ids, bookings pointing at vendors by position"""
+        vendor_ids = list(Vendor.objects.order_by('id').values_list('id', flat=True))
+        position = {pk: n for n, pk in enumerate(vendor_ids)}
+        return {
+            'vendors': list(Vendor.objects.order_by('id').values_list(
+                'name', 'vendor_type', 'description', 'latitude', 'longitude', 'rating', 'rooms_available',
+                'base_price', 'source',
+            )),
+            'emergency': list(EmergencyService.objects.order_by('id').values_list(
+                'name', 'service_type', 'phone', 'latitude', 'longitude', 'is_24x7',
+            )),
+            'trips': list(Trip.objects.order_by('id').values_list(
+                'origin', 'destination', 'distance_km', 'vehicle_type', 'fuel_cost', 'created_at',
+            )),
+            'bookings': [
+                (position[vendor_id], *rest) for vendor_id, *rest in Booking.objects.order_by('id').values_list(
+                    'vendor_id', 'customer_name', 'check_in', 'check_out', 'total_price', 'status', 'created_at',
+                )
+            ],
+            'room_nights': sorted(
+                (position[vendor_id], night, rooms)
+                for vendor_id, night, rooms in RoomNight.objects.values_list('vendor_id', 'night', 'rooms_booked')
+            ),
+        }
+
+    def test_deterministic(self):
+        self.generate(seed=3)
+        first = self.snapshot()
+        # Generating again replaces the rows with identical ones
+        self.generate(seed=3)
+        self.assertEqual(self.snapshot(), first)
+        self.generate(seed=4)
+        other = self.snapshot()
+        self.assertNotEqual(other['vendors'], first['vendors'])
+        self.assertNotEqual(other['trips'], first['trips'])
+
+    def test_counts(self):
+        self.assertEqual(self.generate(seed=3), self.COUNTS)
+        models = {'vendors': Vendor, 'emergency': EmergencyService, 'trips': Trip, 'bookings': Booking}
+        self.assertEqual({name: model.objects.count() for name, model in models.items()}, self.COUNTS)
+        self.assertEqual(TripDailyRollup.objects.aggregate(total=Sum('trips'))['total'], self.COUNTS['trips'])
+        # Room nights hold one room per night of every active hotel stay, never beyond capacity
+        nights = sum(
+            len(booking_nights(booking.check_in, booking.check_out))
+            for booking in Booking.objects.filter(vendor__vendor_type='hotel', status__in=ACTIVE_STATUSES)
+        )
+        self.assertEqual(RoomNight.objects.aggregate(total=Sum('rooms_booked'))['total'] or 0, nights)
+        self.assertFalse(RoomNight.objects.filter(rooms_booked__gt=F('vendor__room_capacity')).exists())
+
+        appended = datagen.generate(vendors=5, trips=7, seed=9, append=True)
+        self.assertEqual(appended, {'vendors': 5, 'emergency': 0, 'trips': 7, 'bookings': 0})
+        self.assertEqual((Vendor.objects.count(), Trip.objects.count()), (85, 67))
+        self.assertEqual(datagen.generate(bookings=10, seed=9)['bookings'], 0)
+        self.assertEqual(Booking.objects.count(), 0)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('generate_data', vendors=10, emergency=2, trips=5, bookings=3, seed=1, stdout=out)
+        self.assertIn('Generated 10 vendors, 2 emergency, 5 trips, 3 bookings', out.getvalue())
+        self.assertEqual(Vendor.objects.count(), 10)
+        with self.assertRaises(CommandError):
+            call_command('generate_data', trips=-1, stdout=io.StringIO())
+
+
+@override_settings(METRICS_TOKEN='s3cret', METRICS_SAMPLE_RATE=1.0)
+class MetricsTests(TestCase):
+    """Requests land in per-view histograms, scraped with the metrics token"""
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def scrape(self, token='s3cret'):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'} if token else {}
+        return self.client.get(reverse('metrics'), **headers)
+
+    def samples(self):
+        response = self.scrape()
+        self.assertEqual(response['Content-Type'], metrics.PROMETHEUS_CONTENT_TYPE)
+        lines = response.content.decode().splitlines()
+        return dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram((1, 5, 10))
+        for value in (0.5, 1, 3, 10, 50):
+            histogram.observe(value)
+        # A value on a bound falls in that bound's bucket, as le="bound" includes it
+        self.assertEqual(histogram.counts, [2, 1, 1, 1])
+        self.assertEqual((histogram.count, histogram.total), (5, 64.5))
+
+        registry = metrics.Registry()
+        registry.observe('vendor-"list"', 'GET', (0.02, 3, None, 500))
+        registry.observe('vendor-"list"', 'GET', (0.2, 0, None, 5000))
+        lines = registry.render()
+        labels = 'view="vendor-\\"list\\"",method="GET"'
+        for line in [
+            f'born2ride_http_request_duration_seconds_bucket{{{labels},le="0.01"}} 0',
+            f'born2ride_http_request_duration_seconds_bucket{{{labels},le="0.025"}} 1',
+            f'born2ride_http_request_duration_seconds_bucket{{{labels},le="0.25"}} 2',
+            f'born2ride_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2',
+            f'born2ride_http_request_duration_seconds_sum{{{labels}}} 0.220000',
+            f'born2ride_http_request_sql_queries_bucket{{{labels},le="0"}} 1',
+            f'born2ride_http_request_sql_queries_bucket{{{labels},le="3"}} 2',
+            f'born2ride_http_request_sql_duration_seconds_count{{{labels}}} 0',
+            f'born2ride_http_response_size_bytes_bucket{{{labels},le="1000"}} 1',
+        ]:
+            self.assertIn(line, lines)
+
+    def test_requests_recorded(self):
+        Vendor.objects.create(name='Mess', address='NH 44', latitude=11.0, longitude=78.0, phone='1')
+        for _ in range(2):
+            self.assertEqual(self.client.get(reverse('vendor-list')).status_code, 200)
+        self.client.post(reverse('calculate-fuel'), {'distance_km': 10, 'vehicle_type': 'bike'})
+        self.client.get('/api/no-such-route/')
+        samples = self.samples()
+        vendors = 'view="vendor-list",method="GET"'
+        self.assertEqual(samples[f'born2ride_http_request_duration_seconds_count{{{vendors}}}'], '2')
+        self.assertEqual(samples[f'born2ride_http_request_sql_queries_bucket{{{vendors},le="+Inf"}}'], '2')
+        # The second list came from the response cache without SQL
+        self.assertEqual(samples[f'born2ride_http_request_sql_queries_bucket{{{vendors},le="0"}}'], '1')
+        self.assertEqual(
+            samples['born2ride_http_request_duration_seconds_count{view="calculate-fuel",method="POST"}'], '1'
+        )
+        self.assertEqual(samples['born2ride_http_request_duration_seconds_count{view="unmatched",method="GET"}'], '1')
+        self.assertIn('born2ride_route_cache_hit_ratio', samples)
+
+    def test_gate(self):
+        self.assertEqual(self.scrape(token=None).status_code, 401)
+        response = self.scrape(token='guess')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        self.assertEqual(self.scrape().status_code, 200)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.scrape().status_code, 404)
+
+
+class VendorSearchTests(TestCase):
+    """Full-text vendor search ranks, prefix-matches, filters and stays in sync"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def vendor(name, description='', address='Main Road, Salem', **fields):
+            return Vendor.objects.create(
+                name=name, description=description, address=address, latitude=11.6, longitude=78.1,
+                phone='1', **{'vendor_type': 'food', **fields}
+            )
+
+        cls.named = vendor('Filter Coffee House', 'Tiffin centre')
+        cls.described = vendor('Amma Mess', 'Meals and filter coffee', rating=4.9)
+        cls.closed = vendor('Kumbakonam Coffee', 'Degree coffee', is_open=False)
+        cls.workshop = vendor('Speed Puncture Shop', 'Tubeless tyres', 'NH 44, Trichy', vendor_type='workshop')
+
+    def search(self, query):
+        response = self.client.get(reverse('vendor-search') + query)
+        self.assertEqual(response.status_code, 200, query)
+        return [item['id'] for item in json.loads(response.content)['results']]
+
+    def test_ranking(self):
+        # A name match outranks a higher-rated description match
+        self.assertEqual(self.search('?q=filter+coffee'), [self.named.pk, self.described.pk])
+
+    def test_prefix_and_address(self):
+        self.assertEqual(self.search('?q=punct'), [self.workshop.pk])
+        self.assertEqual(self.search('?q=TRICHY'), [self.workshop.pk])
+        self.assertEqual(self.search('?q=coff&is_open=false'), [self.closed.pk])
+        self.assertEqual(self.search('?q=coffee&type=workshop'), [])
+
+    def test_index_follows_writes(self):
+        Vendor.objects.filter(pk=self.workshop.pk).update(name='Ganesh Tyre Works')
+        self.assertEqual(self.search('?q=puncture'), [])
+        self.assertEqual(self.search('?q=ganesh'), [self.workshop.pk])
+        self.named.delete()
+        self.assertEqual(self.search('?q=filter'), [self.described.pk])
+
+    def test_bad_queries(self):
+        for query in ('', '?q=', '?q=%22*)(', '?q=coffee&k=many'):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('vendor-search') + query).status_code, 400)
+
+
+class VendorRankingTests(TestCase):
+    """?sort=best weighs distance, rating, price and availability"""
+
+    @classmethod
+    def setUpTestData(cls):
+        def vendor(km_north, **fields):
+            return Vendor.objects.create(
+                name='Vendor', address='NH 44', latitude=11.0 + km_north / 111.2, longitude=78.0, phone='1',
+                **{'vendor_type': 'food', **fields}
+            )
+
+        cls.near = vendor(2, rating=4.5)
+        cls.far = vendor(40, rating=4.9)
+        cls.closed = vendor(1, rating=4.9, is_open=False)
+        cls.full = vendor(1, vendor_type='hotel', base_price=1000, rooms_available=0)
+        cls.free = vendor(1, vendor_type='hotel', base_price=3000, rooms_available=5)
+        # Saves reach a built index on commit, which a TestCase never gets to
+        vendor_index.invalidate()
+
+    def setUp(self):
+        cache.clear()
+
+    def best(self, query, name='vendor-list'):
+        response = self.client.get(reverse(name) + '?sort=best&lat=11&lng=78&radius_km=50' + query)
+        self.assertEqual(response.status_code, 200, query)
+        return [item['id'] for item in json.loads(response.content)['results']]
+
+    def test_nearby_beats_better_rated_far_away(self):
+        expected = [self.near.pk, self.closed.pk, self.far.pk]
+        self.assertEqual(self.best('&type=food'), expected)
+        self.assertEqual(self.best('&type=food', name='vendor-nearby'), expected)
+        self.assertEqual(self.best('&type=food&is_open=true'), [self.near.pk, self.far.pk])
+        self.assertEqual(self.best('&type=food&k=1'), [self.near.pk])
+
+    def test_weights(self):
+        # Equal ratings go to the nearer vendor
+        self.assertEqual(self.best('&type=food&weights=distance:0,open:0'), [self.closed.pk, self.far.pk, self.near.pk])
+        self.assertEqual(self.best('&type=hotel'), [self.free.pk, self.full.pk])
+        self.assertEqual(self.best('&type=hotel&weights=rooms:0,price:1'), [self.full.pk, self.free.pk])
+
+    def test_bad_queries(self):
+        for query in (
+            '?sort=cheapest&lat=11&lng=78', '?sort=best', '?sort=best&lat=11&lng=78&weights=speed:1',
+            '?sort=best&lat=11&lng=78&weights=rating:-1', '?sort=best&lat=1e300&lng=78', '?sort=best&lat=11&lng=nan',
+            '?sort=best&lat=11&lng=78&weights=distance:0,rating:0,price:0,open:0,rooms:0',
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(reverse('vendor-list') + query).status_code, 400)
+
+
+class AsyncViewTests(TestCase):
+    """The async read views serve the same bodies as their DRF counterparts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        datagen.generate(vendors=120, emergency=60, trips=1, bookings=1, seed=7)
+
+    def setUp(self):
+        cache.clear()
+
+    def assertSameBody(self, sync_url, async_url):
+        expected, actual = self.client.get(sync_url), self.client.get(async_url)
+        self.assertEqual(actual.status_code, expected.status_code, async_url)
+        body = json.loads(actual.content)
+        if isinstance(body, dict) and body.get('next'):
+            # Cursor links point back at the view that served the page
+            body['next'] = body['next'].replace(async_url.split('?')[0], sync_url.split('?')[0])
+        self.assertEqual(body, json.loads(expected.content), async_url)
+
+    def test_parity(self):
+        pk = EmergencyService.objects.first().pk
+        for name, query in (
+            ('vendor-list', '?page_size=20'),
+            ('vendor-list', '?type=hotel&is_open=true&fields=name,rating'),
+            ('vendor-nearby', '?lat=11&lng=78&radius_km=500&k=15'),
+            ('vendor-nearby', '?lat=north&lng=78'),
+            ('vendor-list', '?sort=best&lat=11&lng=78&radius_km=300&k=15'),
+            ('vendor-nearby', '?sort=best&lat=11&lng=78&type=hotel&is_open=true&weights=price:1'),
+            ('vendor-list', '?sort=best&lat=11&lng=78&weights=speed:1'),
+            ('emergency-list', '?type=hospital&page_size=5'),
+            ('emergency-nearest', '?lat=11&lng=78'),
+            ('emergency-nearest', '?lat=1e300&lng=78'),
+        ):
+            with self.subTest(name=name, query=query):
+                self.assertSameBody(reverse(name) + query, reverse(f'async-{name}') + query)
+        self.assertSameBody(reverse('emergency-detail', args=[pk]), reverse('async-emergency-detail', args=[pk]))
+        self.assertSameBody(reverse('emergency-detail', args=[0]), reverse('async-emergency-detail', args=[0]))
+
+
+class ChangeFeedTests(TransactionTestCase):
+    """Availability changes reach matching change-feed subscribers after commit"""
+
+    def setUp(self):
+        self.hotel = Vendor.objects.create(
+            name='Hotel', vendor_type='hotel', address='NH45', latitude=11.0, longitude=78.0,
+            phone='1', rooms_available=2, room_capacity=2,
+        )
+
+    def collect(self, change, **filters):
+        """Frames a subscriber with ``filters`` receives while ``change()`` runs"""
+        async def run():
+            subscription = availability.feed.subscribe(**filters)
+            try:
+                await sync_to_async(change)()
+                await asyncio.sleep(0)
+                frames = []
+                while not subscription.queue.empty():
+                    frames.append(subscription.queue.get_nowait())
+                return frames
+            finally:
+                availability.feed.unsubscribe(subscription)
+
+        return [
+            json.loads(frame.split(b'data: ')[1]) if b'event: vendor' in frame else 'reset'
+            for frame in asyncio.run(run())
+        ]
+
+    def test_saves_publish_changed_fields(self):
+        def change():
+            vendor = Vendor.objects.get(pk=self.hotel.pk)
+            vendor.description = 'Renovated'
+            vendor.save()
+            vendor.is_open = False
+            vendor.availability_status = 'Busy'
+            vendor.save()
+
+        self.assertEqual(
+            self.collect(change),
+            [{'id': self.hotel.pk, 'availability_status': 'Busy', 'is_open': False}],
+        )
+
+    def test_bookings_publish_rooms(self):
+        def book():
+            response = self.client.post(reverse('booking-list'), {
+                'vendor': self.hotel.pk, 'customer_name': 'Asha', 'phone': '1',
+                'total_price': '2500', 'status': 'confirmed',
+            }, content_type='application/json')
+            self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(self.collect(book), [{'id': self.hotel.pk, 'rooms_available': 1}])
+
+    def test_filters(self):
+        def toggle():
+            vendor = Vendor.objects.get(pk=self.hotel.pk)
+            vendor.is_open = not vendor.is_open
+            vendor.save()
+
+        self.assertEqual(self.collect(toggle, kinds={'food'}), [])
+        self.assertEqual(self.collect(toggle, bbox=(12, 77, 13, 79)), [])
+        self.assertEqual(len(self.collect(toggle, kinds={'hotel', 'food'}, bbox=(10, 77, 12, 79))), 1)
+
+    def test_rolled_back_changes_are_not_published(self):
+        def change():
+            with transaction.atomic():
+                vendor = Vendor.objects.get(pk=self.hotel.pk)
+                vendor.is_open = False
+                vendor.save()
+                transaction.set_rollback(True)
+
+        self.assertEqual(self.collect(change), [])
+
+    def test_replay_after_reconnect(self):
+        self.assertEqual(self.collect(lambda: None, last_event_id='stale-1'), ['reset'])
+
+        def close():
+            vendor = Vendor.objects.get(pk=self.hotel.pk)
+            vendor.is_open = False
+            vendor.save()
+
+        before = f'{availability.feed.epoch}-{availability.feed._recent[-1][0]}'
+        close()
+        self.assertEqual(
+            self.collect(lambda: None, last_event_id=before),
+            [{'id': self.hotel.pk, 'is_open': False}],
+        )
+
+    def test_stream(self):
+        async def run():
+            response = await AsyncClient().get(reverse('vendor-changes') + '?type=hotel&bbox=10,77,12,79')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            stream = aiter(response.streaming_content)
+            self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+            await sync_to_async(Vendor.objects.filter(pk=self.hotel.pk).update)(rooms_available=0)
+            await sync_to_async(availability.rooms_changed)(self.hotel.pk)
+            return await asyncio.wait_for(anext(stream), 5)
+
+        frame = asyncio.run(run())
+        self.assertIn(f'"id":{self.hotel.pk},"rooms_available":0'.encode(), frame)
+
+    def test_bad_filters(self):
+        async def run(query):
+            response = await AsyncClient().get(reverse('vendor-changes') + query)
+            return response.status_code, json.loads(response.content)
+
+        self.assertEqual(asyncio.run(run('?type=boat')), (400, {'error': 'Unknown vendor type: boat'}))
+        self.assertEqual(asyncio.run(run('?bbox=12,77,10,79'))[0], 400)
+        # WSGI has no loop to push on
+        self.assertEqual(self.client.get(reverse('vendor-changes')).status_code, 501)
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import async_views, views
+from .metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r'trips', views.TripViewSet, basename='trip')
@@ -10,6 +11,20 @@ router.register(r'emergency', views.EmergencyServiceViewSet, basename='emergency
 
 urlpatterns = [
     path('', views.api_overview, name='api-overview'),
+    # Before the router, whose vendor-detail route would match 'changes'
+    path('vendors/changes/', async_views.vendor_changes, name='vendor-changes'),
     path('', include(router.urls)),
     path('calculate-fuel/', views.CalculateFuelView.as_view(), name='calculate-fuel'),
+    path('calculate-fuel/batch/', views.CalculateFuelBatchView.as_view(), name='calculate-fuel-batch'),
+    path('route/', views.RouteView.as_view(), name='route'),
+    path('places/autocomplete/', views.PlaceAutocompleteView.as_view(), name='place-autocomplete'),
+    path('distance-matrix/', views.DistanceMatrixView.as_view(), name='distance-matrix'),
+    path('distance-matrix/stats/', views.distance_matrix_stats, name='distance-matrix-stats'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('async/vendors/', async_views.vendor_list, name='async-vendor-list'),
+    path('async/vendors/nearby/', async_views.vendor_nearby, name='async-vendor-nearby'),
+    path('async/emergency/', async_views.emergency_list, name='async-emergency-list'),
+    path('async/emergency/nearest/', async_views.emergency_nearest, name='async-emergency-nearest'),
+    path('async/emergency/<int:pk>/', async_views.emergency_detail, name='async-emergency-detail'),
+    path('analytics/trips/', views.TripAnalyticsView.as_view(), name='trip-analytics'),
 ]
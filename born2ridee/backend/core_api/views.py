@@ -1,15 +1,33 @@
+import math
+import operator
+
 from rest_framework import viewsets, status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
+from rest_framework.parsers import JSONParser
 from rest_framework.response import Response
+from rest_framework.utils.mediatypes import media_type_matches
 from rest_framework.views import APIView
-from django.db.models import Q
-from .models import Trip, Vendor, EmergencyService, Booking
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.http import HttpResponse, HttpResponseNotModified
+from . import exports, ranking, reservations, rollups
+from .models import Trip, TripDailyRollup, TripRouteRollup, Vendor, EmergencyService, Booking
 from .serializers import (
     TripSerializer, TripCreateSerializer,
     VendorSerializer, EmergencyServiceSerializer,
     FuelCalculationSerializer, FuelCalculationResponseSerializer,
-    BookingSerializer
+    BookingSerializer, CorridorQuerySerializer, FuelBatchSerializer,
+    RouteQuerySerializer, DistanceMatrixSerializer, PlaceQuerySerializer
 )
+from .parsers import NDJSONParser
+from .fastpath import FastListMixin
+from .places import autocomplete
+from .response_cache import CachedListMixin, cached_response
+from .search import parse_terms, top_matches
+from .packs import PACK_VERSION, emergency_packs, pack_region
+from .route_cache import route_cache, route_key
+from .routing import get_graph, plausible
+from .spatial import nearest_emergency_services, valid_point, vendor_index
 
 
 # Fuel mileage constants (km per liter)
@@ -21,6 +39,47 @@ VEHICLE_MILEAGE = {
 # Default fuel price (INR per liter)
 DEFAULT_FUEL_PRICE = 104.0
 
+# Upper bound on k for nearest-neighbour lookups
+MAX_NEARBY_RESULTS = 100
+
+COORDINATE_ERROR = 'lat must be within -90..90 and lng within -180..180'
+
+# Upper bound on vendors returned along a route corridor
+MAX_CORRIDOR_RESULTS = 500
+
+# Upper bound on k for full-text vendor search
+MAX_SEARCH_RESULTS = 100
+
+# Trips written per bulk_create call during bulk ingestion
+BULK_TRIP_CHUNK_SIZE = 500
+
+# Returned when a trip has neither a distance nor routable coordinates
+MISSING_DISTANCE_ERROR = {'distance_km': ['Required when no road route can be computed from the coordinates.']}
+
+# Busiest routes returned by the analytics endpoint
+MAX_ANALYTICS_ROUTES = 100
+
+# Export columns mapped to the lookups they are read from
+TRIP_EXPORT_FIELDS = {
+    name: name for name in [
+        'id', 'origin', 'destination', 'origin_lat', 'origin_lng', 'dest_lat', 'dest_lng',
+        'distance_km', 'vehicle_type', 'fuel_cost', 'fuel_liters', 'created_at', 'stops_visited',
+    ]
+}
+BOOKING_EXPORT_FIELDS = {
+    'id': 'id',
+    'vendor': 'vendor_id',
+    'vendor_name': 'vendor__name',
+    'vendor_type': 'vendor__vendor_type',
+    'customer_name': 'customer_name',
+    'phone': 'phone',
+    'check_in': 'check_in',
+    'check_out': 'check_out',
+    'total_price': 'total_price',
+    'status': 'status',
+    'created_at': 'created_at',
+}
+
 
 def calculate_fuel_cost(distance_km, vehicle_type, fuel_price=DEFAULT_FUEL_PRICE):
     """Calculate fuel cost based on distance and vehicle type"""
@@ -35,10 +94,153 @@ def calculate_fuel_cost(distance_km, vehicle_type, fuel_price=DEFAULT_FUEL_PRICE
     }
 
 
-class TripViewSet(viewsets.ModelViewSet):
+def calculate_fuel_costs(distances, vehicle_types, fuel_prices):
+    """
+    Batch form of calculate_fuel_cost over equal-length sequences.
+    
+    Returns the same keys as the scalar function, each holding a list, and
+    performs the same float operations in the same order so every element
+    rounds exactly as calculate_fuel_cost would.
+    """
+    mileages = [VEHICLE_MILEAGE.get(vehicle_type, 15) for vehicle_type in vehicle_types]
+    fuel_liters = list(map(operator.truediv, distances, mileages))
+    total_costs = list(map(operator.mul, fuel_liters, fuel_prices))
+    return {
+        'mileage_kmpl': mileages,
+        'fuel_liters': [round(value, 2) for value in fuel_liters],
+        'fuel_price_per_liter': list(fuel_prices),
+        'total_fuel_cost': [round(value, 2) for value in total_costs],
+    }
+
+
+def route_trip(data):
+    """
+    Route a trip's endpoints over the road graph; None without usable
+    coordinates or when the route is implausibly long for them
+    """
+    origin = (data.get('origin_lat', 0), data.get('origin_lng', 0))
+    dest = (data.get('dest_lat', 0), data.get('dest_lng', 0))
+    if origin == (0, 0) or dest == (0, 0):
+        return None
+    route = get_graph().route(*origin, *dest)
+    if route is None or not plausible(route['distance_km'], *origin, *dest):
+        return None
+    return route
+
+
+def build_trip(data):
+    """Build an unsaved Trip from validated TripCreateSerializer data"""
+    fuel_data = calculate_fuel_cost(
+        data['distance_km'],
+        data['vehicle_type']
+    )
+    return Trip(
+        origin=data['origin'],
+        destination=data['destination'],
+        origin_lat=data.get('origin_lat', 0),
+        origin_lng=data.get('origin_lng', 0),
+        dest_lat=data.get('dest_lat', 0),
+        dest_lng=data.get('dest_lng', 0),
+        distance_km=data['distance_km'],
+        vehicle_type=data['vehicle_type'],
+        fuel_cost=fuel_data['total_fuel_cost'],
+        fuel_liters=fuel_data['fuel_liters'],
+        stops_visited=data.get('stops_visited', [])
+    )
+
+
+def bulk_create_trips(validated):
+    """Compute fuel for a batch of validated trips and insert them in one transaction"""
+    trips = [build_trip(data) for data in validated]
+    with transaction.atomic():
+        # bulk_create sends no post_save, so the rollups are recorded here
+        trips = Trip.objects.bulk_create(trips, batch_size=BULK_TRIP_CHUNK_SIZE)
+        rollups.record_trips(trips)
+    return trips
+
+
+def filter_vendors(queryset, params):
+    """Apply the vendor list's ?type=, ?is_open= and ?source= filters"""
+    vendor_type = params.get('type', None)
+    is_open = params.get('is_open', None)
+    source = params.get('source', None)
+    
+    if vendor_type:
+        queryset = queryset.filter(vendor_type=vendor_type)
+    if is_open is not None:
+        queryset = queryset.filter(is_open=is_open.lower() == 'true')
+    if source:
+        queryset = queryset.filter(source=source)
+    
+    return queryset
+
+
+def filter_emergency_services(queryset, params):
+    """Apply the emergency list's ?type= filter"""
+    service_type = params.get('type', None)
+    if service_type:
+        queryset = queryset.filter(service_type=service_type)
+    return queryset
+
+
+def parse_nearby(params):
+    """Keyword arguments for ``vendor_index.nearest``; raises ``ValueError``"""
+    try:
+        lat = float(params['lat'])
+        lng = float(params['lng'])
+        radius_km = float(params.get('radius_km', 25))
+        k = int(params.get('k', 20))
+    except (KeyError, ValueError):
+        raise ValueError('lat and lng are required; radius_km and k must be numeric')
+    if not valid_point(lat, lng):
+        raise ValueError(COORDINATE_ERROR)
+    if not 0 <= radius_km < math.inf:
+        raise ValueError('radius_km must be a non-negative number')
+    vendor_type = params.get('type', None)
+    return {
+        'lat': lat, 'lng': lng, 'radius_km': radius_km,
+        'k': max(1, min(k, MAX_NEARBY_RESULTS)),
+        'kinds': {vendor_type} if vendor_type else None,
+    }
+
+
+def parse_ranking(params):
+    """Keyword arguments for ``ranking.best_vendors`` from ?sort=best; raises ``ValueError``"""
+    if params['sort'] != 'best':
+        raise ValueError(f"Unknown sort: {params['sort']}; use best")
+    query = parse_nearby(params)
+    query['weights'] = ranking.parse_weights(params.get('weights'))
+    return query
+
+
+def parse_emergency_nearest(params):
+    """Keyword arguments for ``nearest_emergency_services``; raises ``ValueError``"""
+    try:
+        lat = float(params['lat'])
+        lng = float(params['lng'])
+        radius_km = float(params['radius_km']) if 'radius_km' in params else None
+    except (KeyError, ValueError):
+        raise ValueError('lat and lng are required and must be numeric')
+    if not valid_point(lat, lng):
+        raise ValueError(COORDINATE_ERROR)
+    if radius_km is not None and not 0 <= radius_km < math.inf:
+        raise ValueError('radius_km must be a non-negative number')
+    
+    valid_types = [key for key, _ in EmergencyService.SERVICE_TYPES]
+    service_types = valid_types
+    if params.get('type'):
+        service_types = params['type'].split(',')
+        unknown = [t for t in service_types if t not in valid_types]
+        if unknown:
+            raise ValueError(f"Unknown service type: {', '.join(unknown)}")
+    return {'lat': lat, 'lng': lng, 'service_types': service_types, 'radius_km': radius_km}
+
+
+class TripViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet for Trip CRUD operations"""
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
+    keyset_ordering = ('-id',)
     
     def create(self, request, *args, **kwargs):
         """Create a trip with automatic fuel calculation"""
@@ -46,90 +248,317 @@ class TripViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
         
-        # Calculate fuel cost
-        fuel_data = calculate_fuel_cost(
-            data['distance_km'],
-            data['vehicle_type']
-        )
+        # Prefer the road distance over whatever estimate the client sent
+        route = route_trip(data)
+        if route is not None:
+            data['distance_km'] = route['distance_km']
+        elif 'distance_km' not in data:
+            return Response(MISSING_DISTANCE_ERROR, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create trip with calculated values
-        trip = Trip.objects.create(
-            origin=data['origin'],
-            destination=data['destination'],
-            origin_lat=data.get('origin_lat', 0),
-            origin_lng=data.get('origin_lng', 0),
-            dest_lat=data.get('dest_lat', 0),
-            dest_lng=data.get('dest_lng', 0),
-            distance_km=data['distance_km'],
-            vehicle_type=data['vehicle_type'],
-            fuel_cost=fuel_data['total_fuel_cost'],
-            fuel_liters=fuel_data['fuel_liters'],
-            stops_visited=data.get('stops_visited', [])
-        )
+        trip = build_trip(data)
+        with transaction.atomic():
+            # The rollups follow in the post_save handler
+            trip.save()
         
         response_serializer = TripSerializer(trip)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+    
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+    
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, NDJSONParser])
+    def bulk(self, request):
+        """
+        Create many trips from a JSON array or an NDJSON stream.
+        
+        Items are validated one at a time and written with bulk_create in
+        chunks, so an NDJSON upload is stored while it is still being read.
+        Invalid items are reported by index and do not stop the others.
+        """
+        data = request.data
+        if media_type_matches(NDJSONParser.media_type, request.content_type):
+            # NDJSONParser yields 1-based line numbers; report 0-based item indexes
+            items = ((number - 1, item, error) for number, item, error in data)
+        elif isinstance(data, list):
+            items = ((index, item, None) for index, item in enumerate(data))
+        else:
+            return Response({'error': 'Expected a JSON array or NDJSON lines'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        created = 0
+        errors = []
+        chunk = []
+        for index, item, parse_error in items:
+            if parse_error:
+                errors.append({'index': index, 'errors': {'non_field_errors': [parse_error]}})
+                continue
+            serializer = TripCreateSerializer(data=item)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            data = serializer.validated_data
+            # Uploaded trips are completed rides, so only fill in missing distances
+            if 'distance_km' not in data:
+                route = route_trip(data)
+                if route is None:
+                    errors.append({'index': index, 'errors': MISSING_DISTANCE_ERROR})
+                    continue
+                data['distance_km'] = route['distance_km']
+            chunk.append(data)
+            if len(chunk) >= BULK_TRIP_CHUNK_SIZE:
+                created += len(bulk_create_trips(chunk))
+                chunk = []
+        if chunk:
+            created += len(bulk_create_trips(chunk))
+        
+        response_status = status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'failed': len(errors), 'errors': errors}, status=response_status)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream trips as NDJSON or CSV, filtered by ?from=, ?to= and ?vehicle_type="""
+        params = request.query_params
+        try:
+            queryset = exports.filter_created(Trip.objects.order_by('id'), params)
+            if params.get('vehicle_type'):
+                queryset = queryset.filter(vehicle_type=params['vehicle_type'])
+            return exports.export_rows(
+                queryset, TRIP_EXPORT_FIELDS, params.get(exports.OUTPUT_QUERY_PARAM, 'ndjson'),
+                json_columns={'stops_visited'}, filename='trips'
+            )
+        except exports.ExportError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class VendorViewSet(viewsets.ReadOnlyModelViewSet):
+class VendorViewSet(CachedListMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for Vendor read operations"""
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
+    keyset_ordering = ('-rating', '-id')
+    response_cache_scope = 'vendors'
+    response_cache_params = ('type', 'is_open', 'source', 'fields', 'page_size', 'cursor')
     
     def get_queryset(self):
         """Filter vendors by type if provided"""
-        queryset = Vendor.objects.all()
-        vendor_type = self.request.query_params.get('type', None)
-        is_open = self.request.query_params.get('is_open', None)
-        source = self.request.query_params.get('source', None)
+        return filter_vendors(Vendor.objects.all(), self.request.query_params)
+    
+    def list(self, request, *args, **kwargs):
+        if 'sort' in request.query_params:
+            return self.ranked(request)
+        return super().list(request, *args, **kwargs)
+    
+    def ranked(self, request):
+        """The k best vendors around ?lat=&lng= by ``ranking`` score, best first"""
+        try:
+            query = parse_ranking(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        ranked = ranking.best_vendors(self.get_queryset(), **query)
+        
+        vendors = Vendor.objects.in_bulk([pk for _, _, pk in ranked])
+        context = self.get_serializer_context()
+        results = []
+        for score, distance, pk in ranked:
+            vendor = vendors.get(pk)
+            if vendor is None:
+                continue
+            item = VendorSerializer(vendor, context=context).data
+            item['distance_km'] = round(distance, 3)
+            item['score'] = round(score, 4)
+            results.append(item)
+        
+        return Response({'count': len(results), 'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Return the k nearest vendors to a point, closest first, or the best with ?sort=best"""
+        if 'sort' in request.query_params:
+            return self.ranked(request)
+        try:
+            query = parse_nearby(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        hits = vendor_index.nearest(**query)
         
-        if vendor_type:
-            queryset = queryset.filter(vendor_type=vendor_type)
-        if is_open is not None:
-            queryset = queryset.filter(is_open=is_open.lower() == 'true')
-        if source:
-            queryset = queryset.filter(source=source)
+        vendors = Vendor.objects.in_bulk([pk for _, pk, _ in hits])
+        context = self.get_serializer_context()
+        results = []
+        for distance, pk, _ in hits:
+            vendor = vendors.get(pk)
+            if vendor is None:
+                continue
+            item = VendorSerializer(vendor, context=context).data
+            item['distance_km'] = round(distance, 3)
+            results.append(item)
         
-        return queryset
+        return Response({'count': len(results), 'results': results})
+    
+    @action(detail=False, methods=['get', 'post'])
+    def corridor(self, request):
+        """Return vendors within buffer_km of a route, ordered along the route"""
+        data = request.data if request.method == 'POST' else request.query_params
+        serializer = CorridorQuerySerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        query = serializer.validated_data
+        
+        vendor_type = query.get('type')
+        kinds = {vendor_type} if vendor_type else None
+        hits = vendor_index.corridor(query['polyline'], query['buffer_km'], kinds=kinds)
+        truncated = len(hits) > MAX_CORRIDOR_RESULTS
+        hits = hits[:MAX_CORRIDOR_RESULTS]
+        
+        vendors = Vendor.objects.in_bulk([pk for _, _, pk, _ in hits])
+        context = self.get_serializer_context()
+        results = []
+        for along, offset, pk, _ in hits:
+            vendor = vendors.get(pk)
+            if vendor is None:
+                continue
+            item = VendorSerializer(vendor, context=context).data
+            item['distance_along_km'] = round(along, 3)
+            item['distance_from_route_km'] = round(offset, 3)
+            results.append(item)
+        
+        return Response({'count': len(results), 'truncated': truncated, 'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Vendors matching every word of ?q=, best match first, with the list filters"""
+        terms = parse_terms(request.query_params.get('q', ''))
+        if not terms:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            k = int(request.query_params.get('k', 20))
+        except ValueError:
+            return Response({'error': 'k must be numeric'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        def build():
+            vendors = top_matches(self.get_queryset(), terms, max(1, min(k, MAX_SEARCH_RESULTS)))
+            results = self.get_serializer(vendors, many=True).data
+            return Response({'count': len(results), 'results': results})
+        
+        # Ranking reads every match, so repeated searches come from the cache
+        return cached_response(
+            request, self.response_cache_scope, ('q', 'k', 'type', 'is_open', 'source', 'fields'), build
+        )
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(FastListMixin, viewsets.ModelViewSet):
     """ViewSet for Booking operations"""
-    queryset = Booking.objects.all()
+    # vendor_name reads vendor.name, so detail responses join the vendor
+    queryset = Booking.objects.select_related('vendor')
     serializer_class = BookingSerializer
+    keyset_ordering = ('-id',)
     
     def create(self, request, *args, **kwargs):
-        vendor_id = request.data.get('vendor')
+        """Create a booking, atomically reserving a room on each night for hotels"""
         try:
-            vendor = Vendor.objects.get(id=vendor_id)
-            if vendor.vendor_type == 'hotel' and vendor.rooms_available <= 0:
-                return Response({'error': 'No rooms available'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Reduce room count if it's a hotel
-            if vendor.vendor_type == 'hotel':
-                vendor.rooms_available -= 1
-                vendor.save()
-                
-        except Vendor.DoesNotExist:
+            vendor_exists = Vendor.objects.filter(id=request.data.get('vendor')).exists()
+        except (TypeError, ValueError):
+            vendor_exists = False
+        if not vendor_exists:
             return Response({'error': 'Vendor not found'}, status=status.HTTP_404_NOT_FOUND)
-            
-        return super().create(request, *args, **kwargs)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            reservations.create_booking(serializer)
+        except reservations.RoomsUnavailable:
+            return Response({'error': 'No rooms available'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+    
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except reservations.RoomsUnavailable:
+            return Response({'error': 'No rooms available'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    def perform_update(self, serializer):
+        reservations.update_booking(serializer)
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            reservations.cancel_booking(instance)
+            instance.delete()
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream bookings as NDJSON or CSV, filtered by ?from=, ?to=, ?status= and ?vendor_type="""
+        params = request.query_params
+        try:
+            queryset = exports.filter_created(Booking.objects.order_by('id'), params)
+            if params.get('status'):
+                queryset = queryset.filter(status=params['status'])
+            if params.get('vendor_type'):
+                queryset = queryset.filter(vendor__vendor_type=params['vendor_type'])
+            return exports.export_rows(
+                queryset, BOOKING_EXPORT_FIELDS, params.get(exports.OUTPUT_QUERY_PARAM, 'ndjson'),
+                filename='bookings'
+            )
+        except exports.ExportError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a booking and release its rooms"""
+        booking = self.get_object()
+        if not reservations.cancel_booking(booking):
+            return Response({'error': 'Booking is already cancelled'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(booking).data)
 
 
-class EmergencyServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class EmergencyServiceViewSet(CachedListMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for EmergencyService read operations"""
     queryset = EmergencyService.objects.all()
     serializer_class = EmergencyServiceSerializer
+    keyset_ordering = ('service_type', 'name', 'id')
+    response_cache_scope = 'emergency'
+    response_cache_params = ('type', 'fields', 'page_size', 'cursor')
     
     def get_queryset(self):
         """Filter emergency services by type if provided"""
-        queryset = EmergencyService.objects.all()
-        service_type = self.request.query_params.get('type', None)
-        
-        if service_type:
-            queryset = queryset.filter(service_type=service_type)
+        return filter_emergency_services(EmergencyService.objects.all(), self.request.query_params)
+    
+    @action(detail=False, methods=['get'])
+    def nearest(self, request):
+        """Return the closest service of every type (or of ?type=) to a point"""
+        try:
+            query = parse_emergency_nearest(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(nearest_emergency_services(**query))
+    
+    @action(detail=False, methods=['get'])
+    def pack(self, request):
+        """Download services in a region as a compact binary pack for offline use"""
+        params = request.query_params
+        bounds = ['lat_min', 'lat_max', 'lng_min', 'lng_max']
+        region = None
+        if any(key in params for key in bounds):
+            try:
+                region = pack_region(*(float(params[key]) for key in bounds))
+            except (KeyError, ValueError, OverflowError):
+                return Response(
+                    {'error': 'lat_min, lat_max, lng_min and lng_max must all be numeric'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
         
-        return queryset
+        pack = emergency_packs.get(region)
+        if pack.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(pack.data, content_type='application/octet-stream')
+        response['ETag'] = pack.etag
+        response['X-Pack-Version'] = str(PACK_VERSION)
+        response['X-Content-SHA256'] = pack.sha256
+        response['Cache-Control'] = 'no-cache'
+        return response
 
 
 class CalculateFuelView(APIView):
@@ -155,6 +584,151 @@ class CalculateFuelView(APIView):
         return Response(response_data, status=status.HTTP_200_OK)
 
 
+class TripAnalyticsView(APIView):
+    """
+    Trip totals read from the rollup tables.
+    
+    ?group=day (default), vehicle or route; ?from= and ?to= (dates) limit
+    the day range for day and vehicle grouping; ?vehicle_type= filters all.
+    """
+    
+    def get(self, request):
+        params = request.query_params
+        group = params.get('group', 'day')
+        measures = {measure: Sum(measure) for measure in rollups.MEASURES}
+        
+        if group == 'route':
+            queryset = TripRouteRollup.objects.all()
+        elif group in ('day', 'vehicle'):
+            queryset = TripDailyRollup.objects.all()
+            try:
+                if params.get('from'):
+                    queryset = queryset.filter(day__gte=exports.parse_bound(params['from']).date())
+                if params.get('to'):
+                    queryset = queryset.filter(day__lte=exports.parse_bound(params['to']).date())
+            except exports.ExportError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            return Response({'error': 'group must be day, vehicle or route'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if params.get('vehicle_type'):
+            queryset = queryset.filter(vehicle_type=params['vehicle_type'])
+        
+        keys = {'day': ['day'], 'vehicle': ['vehicle_type'], 'route': ['origin', 'destination']}[group]
+        rows = queryset.order_by().values(*keys).annotate(**measures).order_by(*keys)
+        if group == 'route':
+            rows = rows.order_by('-trips', *keys)[:MAX_ANALYTICS_ROUTES]
+        
+        results = []
+        for row in rows:
+            for measure in ('distance_km', 'fuel_liters', 'fuel_cost'):
+                row[measure] = round(row[measure] or 0, 2)
+            results.append(row)
+        return Response({'group': group, 'results': results})
+
+
+class RouteView(APIView):
+    """API endpoint for road distance and driving time between two points"""
+    
+    def get(self, request):
+        serializer = RouteQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        route = get_graph().route(
+            data['origin_lat'], data['origin_lng'], data['dest_lat'], data['dest_lng'], data['metric']
+        )
+        if route is None:
+            return Response({'error': 'No road route between these points'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(route, status=status.HTTP_200_OK)
+
+
+class PlaceAutocompleteView(APIView):
+    """API endpoint for place suggestions from the offline gazetteer"""
+    
+    def get(self, request):
+        params = request.query_params.copy()
+        if 'kind' in params:
+            params.setlist('kind', [kind for value in params.getlist('kind') for kind in value.split(',')])
+        serializer = PlaceQuerySerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        results = autocomplete(data['q'], data['k'], data.get('kind'))
+        return Response({'query': data['q'], 'results': results}, status=status.HTTP_200_OK)
+
+
+class CalculateFuelBatchView(APIView):
+    """
+    API endpoint to calculate fuel cost for many distance/vehicle pairs.
+    
+    vehicle_type and fuel_price may be single values applied to every
+    distance; the response holds one array per field, index-aligned with
+    distance_km.
+    """
+    
+    def post(self, request):
+        serializer = FuelBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        results = calculate_fuel_costs(data['distance_km'], data['vehicle_type'], data['fuel_price'])
+        return Response({
+            'count': len(data['distance_km']),
+            'distance_km': data['distance_km'],
+            'vehicle_type': data['vehicle_type'],
+            **results
+        }, status=status.HTTP_200_OK)
+
+
+class DistanceMatrixView(APIView):
+    """
+    API endpoint for road distance, driving time and fuel for every
+    origin × destination pair.
+    
+    Routes come from the two-tier route cache; rows are index-aligned with
+    origins and columns with destinations, and unroutable cells are null.
+    """
+    
+    def post(self, request):
+        serializer = DistanceMatrixSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        pairs = [(origin, dest) for origin in data['origins'] for dest in data['destinations']]
+        routes, counts = route_cache.get_many(pairs)
+        
+        rows = []
+        for origin in data['origins']:
+            row = []
+            for dest in data['destinations']:
+                route = routes[route_key(origin, dest)]
+                if route is None:
+                    row.append(None)
+                    continue
+                row.append({
+                    **route,
+                    'fuel': {
+                        vehicle: calculate_fuel_cost(route['distance_km'], vehicle, data['fuel_price'])
+                        for vehicle in VEHICLE_MILEAGE
+                    },
+                })
+            rows.append(row)
+        
+        return Response({
+            'origins': [list(point) for point in data['origins']],
+            'destinations': [list(point) for point in data['destinations']],
+            'rows': rows,
+            'cache': counts,
+        }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def distance_matrix_stats(request):
+    """Route cache counters since the process started"""
+    return Response(route_cache.snapshot())
+
+
 @api_view(['GET'])
 def api_overview(request):
     """API overview endpoint"""
@@ -164,9 +738,33 @@ def api_overview(request):
         'endpoints': {
             'vendors': '/api/vendors/',
             'vendors_by_type': '/api/vendors/?type=food|hotel|workshop',
+            'vendors_nearby': '/api/vendors/nearby/?lat=&lng=&radius_km=&k=',
+            'vendors_best': '/api/vendors/?sort=best&lat=&lng=&radius_km=&k=&weights=',
+            'vendors_corridor': '/api/vendors/corridor/?trip=|polyline=lat,lng;lat,lng&buffer_km=',
+            'vendors_search': '/api/vendors/search/?q=&k=&type=&is_open=&source=',
             'bookings': '/api/bookings/',
             'emergency_services': '/api/emergency/',
+            'emergency_nearest': '/api/emergency/nearest/?lat=&lng=&type=',
+            'emergency_pack': '/api/emergency/pack/?lat_min=&lat_max=&lng_min=&lng_max=',
             'trips': '/api/trips/',
+            'trips_bulk': '/api/trips/bulk/ (JSON array or application/x-ndjson)',
+            'trips_export': '/api/trips/export/?output=ndjson|csv&from=&to=&vehicle_type=',
+            'bookings_export': '/api/bookings/export/?output=ndjson|csv&from=&to=&status=&vendor_type=',
+            'pagination': '?page_size=&cursor= (follow the next link)',
+            'sparse_fieldsets': '?fields=id,name,...',
             'calculate_fuel': '/api/calculate-fuel/',
+            'calculate_fuel_batch': '/api/calculate-fuel/batch/',
+            'route': '/api/route/?origin_lat=&origin_lng=&dest_lat=&dest_lng=&metric=distance|time',
+            'places_autocomplete': '/api/places/autocomplete/?q=&k=&kind=town,junction,landmark',
+            'distance_matrix': '/api/distance-matrix/ (POST origins, destinations as [[lat, lng], ...])',
+            'distance_matrix_stats': '/api/distance-matrix/stats/',
+            'metrics': '/api/metrics/ (Prometheus text format, bearer METRICS_TOKEN)',
+            'async_vendors': '/api/async/vendors/ (async twin of /api/vendors/, for ASGI)',
+            'async_vendors_nearby': '/api/async/vendors/nearby/?lat=&lng=&radius_km=&k=',
+            'async_emergency_services': '/api/async/emergency/',
+            'async_emergency_detail': '/api/async/emergency/<id>/',
+            'async_emergency_nearest': '/api/async/emergency/nearest/?lat=&lng=&type=',
+            'vendor_changes': '/api/vendors/changes/?type=&bbox=min_lat,min_lng,max_lat,max_lng (SSE, for ASGI)',
+            'trip_analytics': '/api/analytics/trips/?group=day|vehicle|route&from=&to=&vehicle_type=',
         }
     })
@@ -243,6 +243,8 @@ def seed_data():
     ]
     
     for v_data in vendors:
+        # Seeded hotels start empty, so every listed room is bookable each night
+        v_data.setdefault('room_capacity', v_data.get('rooms_available', 0))
         Vendor.objects.create(**v_data)
     
     print(f"Successfully seeded {len(vendors)} vendors.")
@@ -34,6 +34,20 @@ const API = {
         }
     },
 
+    /**
+     * GET a paginated list endpoint, following `next` links until the end
+     * @param {string} endpoint - List endpoint, optionally with query params
+     */
+    async getAll(endpoint) {
+        let page = await this.get(endpoint);
+        const results = [...page.results];
+        while (page.next) {
+            page = await this.get(page.next.slice(page.next.indexOf('/api') + 4));
+            results.push(...page.results);
+        }
+        return results;
+    },
+
     /**
      * Make a POST request
      */
@@ -71,7 +85,7 @@ const API = {
      * Get all trips
      */
     async getTrips() {
-        return this.get('/trips/');
+        return this.getAll('/trips/');
     },
 
     /**
@@ -97,6 +111,36 @@ const API = {
         });
     },
 
+    /**
+     * Get road distance and driving time between two points
+     * @param {string} metric - 'distance' (shortest) or 'time' (fastest)
+     */
+    async getRoute(originLat, originLng, destLat, destLng, metric = 'distance') {
+        return this.get(`/route/?origin_lat=${originLat}&origin_lng=${originLng}&dest_lat=${destLat}&dest_lng=${destLng}&metric=${metric}`);
+    },
+
+    /**
+     * Suggest towns, junctions and landmarks for a typed prefix
+     * @param {string} query - Typed text
+     * @param {number} k - Maximum number of suggestions
+     */
+    async autocompletePlaces(query, k = 10) {
+        return this.get(`/places/autocomplete/?q=${encodeURIComponent(query)}&k=${k}`);
+    },
+
+    /**
+     * Get distance, duration and fuel for every origin/destination pair
+     * @param {Array} origins - [[lat, lng], ...]
+     * @param {Array} destinations - [[lat, lng], ...]
+     */
+    async getDistanceMatrix(origins, destinations, fuelPrice = 104.0) {
+        return this.post('/distance-matrix/', {
+            origins: origins,
+            destinations: destinations,
+            fuel_price: fuelPrice,
+        });
+    },
+
     // ============ VENDOR ENDPOINTS ============
 
     /**
@@ -105,9 +149,50 @@ const API = {
      */
     async getVendors(type = null) {
         const endpoint = type ? `/vendors/?type=${type}` : '/vendors/';
+        return this.getAll(endpoint);
+    },
+
+    /**
+     * Get the k nearest vendors to a point, closest first
+     * @param {number} lat - Rider latitude
+     * @param {number} lng - Rider longitude
+     * @param {object} options - Optional { type, radiusKm, k, sort: 'best' to rank by distance, rating, price and availability }
+     */
+    async getNearbyVendors(lat, lng, { type = null, radiusKm = 25, k = 20, sort = null } = {}) {
+        let endpoint = `/vendors/nearby/?lat=${lat}&lng=${lng}&radius_km=${radiusKm}&k=${k}`;
+        if (type) endpoint += `&type=${type}`;
+        if (sort) endpoint += `&sort=${sort}`;
         return this.get(endpoint);
     },
 
+    /**
+     * Get vendors within a buffer of a route, ordered along the route
+     * @param {Array} polyline - List of [lat, lng] pairs
+     * @param {object} options - Optional { type, bufferKm }
+     */
+    async getCorridorVendors(polyline, { type = null, bufferKm = 5 } = {}) {
+        const body = { polyline, buffer_km: bufferKm };
+        if (type) body.type = type;
+        return this.post('/vendors/corridor/', body);
+    },
+
+    /**
+     * Stream availability changes (rooms_available, availability_status,
+     * is_open) as they happen; returns the EventSource, close() it to stop
+     * @param {function} onChange - Called with { id, ...changedFields }
+     * @param {function} onReset - Called when changes were missed and the list should be re-fetched
+     * @param {object} options - Optional { type, bbox: [minLat, minLng, maxLat, maxLng] }
+     */
+    subscribeVendorChanges(onChange, onReset, { type = null, bbox = null } = {}) {
+        const params = new URLSearchParams();
+        if (type) params.set('type', type);
+        if (bbox) params.set('bbox', bbox.join(','));
+        const source = new EventSource(`${API_BASE_URL}/vendors/changes/?${params}`);
+        source.addEventListener('vendor', event => onChange(JSON.parse(event.data)));
+        source.addEventListener('reset', () => onReset());
+        return source;
+    },
+
     /**
      * Get food vendors
      */
@@ -137,6 +222,18 @@ const API = {
      */
     async getEmergencyServices(type = null) {
         const endpoint = type ? `/emergency/?type=${type}` : '/emergency/';
+        return this.getAll(endpoint);
+    },
+
+    /**
+     * Get the closest service of every type to a point in one call
+     * @param {number} lat - Rider latitude
+     * @param {number} lng - Rider longitude
+     * @param {string} type - Optional comma-separated service types
+     */
+    async getNearestEmergencyServices(lat, lng, type = null) {
+        let endpoint = `/emergency/nearest/?lat=${lat}&lng=${lng}`;
+        if (type) endpoint += `&type=${type}`;
         return this.get(endpoint);
     },
 